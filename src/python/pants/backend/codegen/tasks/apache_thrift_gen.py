@@ -6,50 +6,27 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from collections import defaultdict, namedtuple
-import errno
+import multiprocessing
 import os
 import re
-import subprocess
 
-from twitter.common import log
 from twitter.common.collections import OrderedSet
 
 from pants.backend.codegen.targets.java_thrift_library import JavaThriftLibrary
 from pants.backend.codegen.targets.python_thrift_library import PythonThriftLibrary
 from pants.backend.codegen.tasks.code_gen import CodeGen
+from pants.backend.codegen.tasks.codegen_runner import CodegenRunner
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.backend.python.targets.python_library import PythonLibrary
 from pants.base.address import SyntheticAddress
 from pants.base.build_environment import get_buildroot
 from pants.base.exceptions import TaskError
 from pants.base.target import Target
-from pants.thrift_util import calculate_compile_roots, select_thrift_binary
-from pants.util.dirutil import safe_mkdir
-
-
-def _copytree(from_base, to_base):
-  def abort(error):
-    raise TaskError('Failed to copy from %s to %s: %s' % (from_base, to_base, error))
-
-  # TODO(John Sirois): Consider adding a unit test and lifting this to common/dirutils or similar
-  def safe_link(src, dst):
-    try:
-      os.link(src, dst)
-    except OSError as e:
-      if e.errno != errno.EEXIST:
-        raise e
-
-  for dirpath, dirnames, filenames in os.walk(from_base, topdown=True, onerror=abort):
-    to_path = os.path.join(to_base, os.path.relpath(dirpath, from_base))
-    for dirname in dirnames:
-      safe_mkdir(os.path.join(to_path, dirname))
-    for filename in filenames:
-      safe_link(os.path.join(dirpath, filename), os.path.join(to_path, filename))
+from pants.thrift_util import calculate_compile_roots, find_includes, select_thrift_binary
 
 
 class ApacheThriftGen(CodeGen):
   GenInfo = namedtuple('GenInfo', ['gen', 'deps'])
-  ThriftSession = namedtuple('ThriftSession', ['outdir', 'cmd', 'process'])
 
   @classmethod
   def setup_parser(cls, option_group, args, mkflag):
@@ -77,6 +54,8 @@ class ApacheThriftGen(CodeGen):
 
     self.thrift_binary = select_thrift_binary(self.context.config,
                                               version=self.context.options.thrift_version)
+    self.workers = self.context.config.getint('thrift-gen', 'workers',
+                                              default=multiprocessing.cpu_count())
 
     self.defaults = JavaThriftLibrary.Defaults(self.context.config)
 
@@ -145,38 +124,26 @@ class ApacheThriftGen(CodeGen):
       args.append('-strict')
     if self.verbose:
       args.append('-verbose')
-    for base in bases:
+    for base in sorted(bases):
       args.extend(('-I', base))
 
-    sessions = []
-    for source in sources:
-      self.context.log.info('Generating thrift for %s\n' % source)
-      # Create a unique session dir for this thrift root.  Sources may be full paths but we only
-      # need the path relative to the build root to ensure uniqueness.
-      # TODO(John Sirois): file paths should be normalized early on and uniformly, fix the need to
-      # relpath here at all.
-      relsource = os.path.relpath(source, get_buildroot())
-      outdir = os.path.join(self.session_dir, '.'.join(relsource.split(os.path.sep)))
-      safe_mkdir(outdir)
-
-      cmd = args[:]
-      cmd.extend(('-o', outdir))
-      cmd.append(source)
-      log.debug('Executing: %s' % ' '.join(cmd))
-      sessions.append(self.ThriftSession(outdir, cmd, subprocess.Popen(cmd)))
-
-    result = 0
-    for session in sessions:
-      if result != 0:
-        session.process.kill()
-      else:
-        result = session.process.wait()
-        if result != 0:
-          self.context.log.error('Failed: %s' % ' '.join(session.cmd))
-        else:
-          _copytree(session.outdir, self.combined_dir)
-    if result != 0:
-      raise TaskError('%s ... exited non-zero (%i)' % (self.thrift_binary, result))
+    def create_cmd(source, outdir):
+      return args + ['-o', outdir, source]
+
+    def includes(source):
+      try:
+        return find_includes(bases, source)
+      except ValueError as e:
+        raise TaskError(e)
+
+    # NB: The selected binary's path includes its version.
+    runner = CodegenRunner(self.session_dir,
+                           compiler_version=self.thrift_binary,
+                           concurrency=self.workers,
+                           includes=includes)
+    generated = runner.generate(sorted(sources), create_cmd, self.combined_dir)
+    for source in generated:
+      self.context.log.info('Generated thrift for %s\n' % source)
 
   def createtarget(self, lang, gentarget, dependees):
     if lang == 'java':
@@ -0,0 +1,165 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from hashlib import sha1
+import json
+from multiprocessing.pool import ThreadPool
+import os
+import subprocess
+import tempfile
+import threading
+import uuid
+
+from twitter.common import log
+
+from pants.base.exceptions import TaskError
+from pants.util.dirutil import safe_mkdir, safe_rmtree
+
+
+def link_tree(from_base, to_base):
+  """Hard links the files under `from_base` into `to_base`, replacing any already there.
+
+  Each file is linked to a temporary name and renamed into place, so readers of `to_base` see
+  either the old file or the new one but never a missing or partially written one.
+  """
+  for dirpath, _, filenames in os.walk(from_base):
+    to_path = os.path.join(to_base, os.path.relpath(dirpath, from_base))
+    safe_mkdir(to_path)
+    for filename in filenames:
+      src = os.path.join(dirpath, filename)
+      dst = os.path.join(to_path, filename)
+      if os.path.exists(dst) and os.path.samefile(src, dst):
+        continue
+      tmp = '%s.%s.tmp' % (dst, uuid.uuid4().hex)
+      os.link(src, tmp)
+      os.rename(tmp, dst)
+
+
+class CodegenRunner(object):
+  """Runs a code generator over sources one compiler process per source, a bounded number at once.
+
+  Each source is generated into a directory of its own under the runner's workdir, keyed by the
+  compiler command line along with the contents of the source and of the files it transitively
+  includes.  Generated directories are only moved into place once the compiler succeeds, and
+  sources whose key is already present are not generated again.  Only the latest key of each source
+  is kept; the directories of the keys it supersedes are removed once the outputs are linked.
+  """
+
+  def __init__(self, workdir, compiler_version, concurrency, includes=None):
+    """
+    :param string workdir: The directory to keep the generated output of each source in.
+    :param string compiler_version: Identifies the compiler; it is mixed into each source's key.
+    :param int concurrency: The maximum number of compiler processes to run at once.
+    :param includes: An optional callable that returns the paths of the files a source includes.
+    """
+    self._workdir = workdir
+    self._compiler_version = compiler_version
+    self._concurrency = max(1, concurrency)
+    self._includes = includes
+
+  def generate(self, sources, create_cmd, output_dir):
+    """Generates code for each of `sources` and links the results into `output_dir`.
+
+    :param list sources: The source files to generate code for.
+    :param create_cmd: A callable taking a source and the directory to generate it into and
+      returning the compiler command line.
+    :param string output_dir: The directory to link all generated files into.
+    :returns: The list of sources that were generated, as opposed to found already generated.
+    :raises: :class:`pants.base.exceptions.TaskError` if the compiler fails for any source, in
+      which case nothing is linked into `output_dir`.
+    """
+    digests = {}
+    gendirs = []
+    stale = []
+    for source in sources:
+      gendir = os.path.join(self._source_dir(source), self._key(source, create_cmd, digests))
+      gendirs.append(gendir)
+      if not os.path.isdir(gendir):
+        stale.append((source, gendir))
+
+    if stale:
+      failures = self._run(stale, create_cmd)
+      if failures:
+        raise TaskError('Code generation failed for %d of %d sources:\n\t%s' % (
+            len(failures), len(stale), '\n\t'.join('%s ... exited non-zero (%i)' % (
+                ' '.join(cmd), result) for cmd, result in failures)))
+
+    for gendir in gendirs:
+      link_tree(gendir, output_dir)
+    for gendir in gendirs:
+      self._prune(gendir)
+    return [source for source, _ in stale]
+
+  def _source_dir(self, source):
+    return os.path.join(self._workdir, sha1(source.encode('utf-8')).hexdigest())
+
+  def _prune(self, gendir):
+    """Removes the directories of the keys `gendir` supersedes, along with any left by failed runs."""
+    source_dir, key = os.path.split(gendir)
+    for name in os.listdir(source_dir):
+      if name != key:
+        safe_rmtree(os.path.join(source_dir, name))
+
+  def _run(self, stale, create_cmd):
+    failed = threading.Event()
+
+    def generate(source_and_gendir):
+      source, gendir = source_and_gendir
+      if failed.is_set():
+        return None  # Don't start any more compilers once one has failed.
+      safe_mkdir(os.path.dirname(gendir))
+      tmpdir = tempfile.mkdtemp(dir=os.path.dirname(gendir))
+      cmd = create_cmd(source, tmpdir)
+      log.debug('Executing: %s' % ' '.join(cmd))
+      result = subprocess.call(cmd)
+      if result != 0:
+        failed.set()
+        safe_rmtree(tmpdir)
+        return cmd, result
+      try:
+        os.rename(tmpdir, gendir)
+      except OSError:
+        # The same source, listed twice, got there first.
+        if not os.path.isdir(gendir):
+          raise
+        safe_rmtree(tmpdir)
+      return None
+
+    pool = ThreadPool(processes=min(self._concurrency, len(stale)))
+    try:
+      # We need to specify a timeout explicitly, because otherwise python ignores SIGINT when
+      # waiting on a condition variable, so we won't be able to ctrl-c out.
+      results = pool.map_async(generate, stale, chunksize=1).get(timeout=1000000000)
+    finally:
+      pool.close()
+      pool.join()
+    return filter(None, results)
+
+  def _key(self, source, create_cmd, digests):
+    hasher = sha1()
+    hasher.update(self._compiler_version.encode('utf-8'))
+    hasher.update(json.dumps(create_cmd(source, '')).encode('utf-8'))
+    for path in sorted(self._closure(source)):
+      digest = digests.get(path)
+      if digest is None:
+        with open(path, 'rb') as fp:
+          digest = sha1(fp.read()).hexdigest()
+        digests[path] = digest
+      hasher.update(path.encode('utf-8'))
+      hasher.update(digest)
+    return hasher.hexdigest()
+
+  def _closure(self, source):
+    closure = set([source])
+    if self._includes:
+      pending = [source]
+      while pending:
+        for include in self._includes(pending.pop()):
+          if include not in closure:
+            closure.add(include)
+            pending.append(include)
+    return closure
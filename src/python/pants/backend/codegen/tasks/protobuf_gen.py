@@ -7,15 +7,17 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 
 from collections import defaultdict
 from hashlib import sha1
+import json
+import multiprocessing
 import os
 import re
-import subprocess
+import tempfile
 
-from twitter.common import log
 from twitter.common.collections import OrderedDict, OrderedSet, maybe_list
 
 from pants.backend.codegen.targets.java_protobuf_library import JavaProtobufLibrary
 from pants.backend.codegen.tasks.code_gen import CodeGen
+from pants.backend.codegen.tasks.codegen_runner import CodegenRunner
 from pants.backend.jvm.targets.jar_library import JarLibrary
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.backend.python.targets.python_library import PythonLibrary
@@ -25,7 +27,7 @@ from pants.base.exceptions import TaskError
 from pants.base.target import Target
 from pants.binary_util import BinaryUtil
 from pants.fs.archive import ZIP
-from pants.util.dirutil import safe_mkdir
+from pants.util.dirutil import safe_mkdir, safe_open, safe_rmtree
 
 # Override with protobuf-gen -> supportdir
 _PROTOBUF_GEN_SUPPORTDIR_DEFAULT='bin/protobuf'
@@ -39,6 +41,82 @@ _PROTOBUF_GEN_JAVADEPS_DEFAULT='3rdparty:protobuf-{version}'
 # Override with in protobuf-gen -> pythondeps (Accepts a list)
 _PROTOBUF_GEN_PYTHONDEPS_DEFAULT = []
 
+class JarExtractionIndex(object):
+  """Extracts jars to directories named for their contents, remembering what it extracted.
+
+  The content hash of each jar is recorded against its real path, size and modification time in
+  an index kept alongside the extracted directories, so a jar that has not changed since it was
+  last seen is mapped straight to its extracted directory without reading it.
+  """
+
+  def __init__(self, workdir):
+    """
+    :param string workdir: The directory to extract jars under and keep the index in.
+    """
+    self._workdir = workdir
+    self._index_path = os.path.join(workdir, 'index.json')
+    self._index = None
+    self._dirty = False
+
+  def _entries(self):
+    if self._index is None:
+      self._index = {}
+      if os.path.exists(self._index_path):
+        try:
+          with open(self._index_path, 'r') as fp:
+            self._index = json.load(fp)
+        except ValueError:
+          pass  # A corrupt index is just rebuilt.
+    return self._index
+
+  def extract(self, jar_path):
+    """Returns the directory holding the contents of the given jar, extracting it if needed.
+
+    :param string jar_path: The path of the jar to extract.
+    :returns: A tuple of the directory and whether the jar needed extracting.
+    """
+    realpath = os.path.realpath(jar_path)
+    stat = os.stat(realpath)
+    entries = self._entries()
+    entry = entries.get(realpath)
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime]:
+      digest = entry[2]
+    else:
+      hasher = sha1()
+      with open(realpath, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(64 * 1024), b''):
+          hasher.update(chunk)
+      digest = hasher.hexdigest()
+      entries[realpath] = [stat.st_size, stat.st_mtime, digest]
+      self._dirty = True
+
+    outdir = os.path.join(self._workdir, digest)
+    if os.path.isdir(outdir):
+      return outdir, False
+
+    safe_mkdir(self._workdir)
+    tmpdir = tempfile.mkdtemp(dir=self._workdir)
+    try:
+      ZIP.extract(realpath, tmpdir)
+      os.rename(tmpdir, outdir)
+    except OSError:
+      # Another run extracted the same jar first.
+      if not os.path.isdir(outdir):
+        raise
+    finally:
+      safe_rmtree(tmpdir)
+    return outdir, True
+
+  def save(self):
+    """Writes out the index if jars not seen before were extracted."""
+    if self._dirty:
+      tmp = '%s.%s.tmp' % (self._index_path, os.getpid())
+      with safe_open(tmp, 'w') as fp:
+        json.dump(self._entries(), fp)
+      os.rename(tmp, self._index_path)
+      self._dirty = False
+
+
 class ProtobufGen(CodeGen):
   @classmethod
   def setup_parser(cls, option_group, args, mkflag):
@@ -54,9 +132,17 @@ class ProtobufGen(CodeGen):
     self.protoc_version = self.context.config.get('protobuf-gen', 'version',
                                                   default=_PROTOBUF_VERSION_DEFAULT)
     self.plugins = self.context.config.getlist('protobuf-gen', 'plugins', default=[])
+    self.workers = self.context.config.getint('protobuf-gen', 'workers',
+                                              default=multiprocessing.cpu_count())
 
     self.java_out = os.path.join(self.workdir, 'gen-java')
     self.py_out = os.path.join(self.workdir, 'gen-py')
+    self.session_dir = os.path.join(self.workdir, 'sessions')
+    self.extracted_jars = JarExtractionIndex(os.path.join(self.workdir, 'extracted'))
+
+    # The target base and sources of each gen target in build graph order, computed when first
+    # needed.
+    self._sources_by_gentarget = None
 
     self.gen_langs = set(self.context.options.protobuf_gen_langs)
     for lang in ('java', 'python'):
@@ -115,10 +201,8 @@ class ProtobufGen(CodeGen):
 
   def _extract_jar(self, jar_path):
     """Extracts the jar to a subfolder of workdir/extracted and returns the path to it."""
-    with open(jar_path, 'rb') as f:
-      outdir = os.path.join(self.workdir, 'extracted', sha1(f.read()).hexdigest())
-    if not os.path.exists(outdir):
-      ZIP.extract(jar_path, outdir)
+    outdir, extracted = self.extracted_jars.extract(jar_path)
+    if extracted:
       self.context.log.debug('Extracting jar at {jar_path}.'.format(jar_path=jar_path))
     else:
       self.context.log.debug('Jar already extracted at {jar_path}.'.format(jar_path=jar_path))
@@ -128,6 +212,7 @@ class ProtobufGen(CodeGen):
     for target in proto_targets:
       for path in self._jars_to_directories(target):
         yield os.path.relpath(path, get_buildroot())
+    self.extracted_jars.save()
 
   def _same_contents(self, a, b):
     with open(a, 'r') as f:
@@ -182,35 +267,40 @@ class ProtobufGen(CodeGen):
       raise TaskError('Unrecognized protobuf gen lang: %s' % lang)
 
     safe_mkdir(output_dir)
-    gen = '%s=%s' % (gen_flag, output_dir)
-
-    args = [self.protobuf_binary, gen]
 
-    if self.plugins:
+    def create_cmd(source, outdir):
+      args = [self.protobuf_binary, '%s=%s' % (gen_flag, outdir)]
       for plugin in self.plugins:
         # TODO(Eric Ayers) Is it a good assumption that the generated source output dir is
         # acceptable for all plugins?
-        args.append("--%s_protobuf_out=%s" % (plugin, output_dir))
-
-    for base in bases:
-      args.append('--proto_path=%s' % base)
-
-    args.extend(sources)
-    log.debug('Executing: %s' % '\\\n  '.join(args))
-    process = subprocess.Popen(args)
-    result = process.wait()
-    if result != 0:
-      raise TaskError('%s ... exited non-zero (%i)' % (self.protobuf_binary, result))
+        args.append("--%s_protobuf_out=%s" % (plugin, outdir))
+      for base in bases:
+        args.append('--proto_path=%s' % base)
+      args.append(source)
+      return args
+
+    # Each source is generated by a protoc of its own, so that they run in parallel and unchanged
+    # sources are not generated again. NB: The selected binary's path includes its version.
+    runner = CodegenRunner(self.session_dir,
+                           compiler_version=self.protobuf_binary,
+                           concurrency=self.workers,
+                           includes=lambda source: find_imports(bases, source))
+    runner.generate(list(sources), create_cmd, output_dir)
 
   def _calculate_sources(self, targets):
+    if self._sources_by_gentarget is None:
+      # NB: Gen targets are never added by this task, so this is only computed once.
+      self._sources_by_gentarget = OrderedDict(
+          (target, (target.target_base, target.sources_relative_to_buildroot()))
+          for target in self.context.build_graph.targets(self.is_gentarget))
+
     walked_targets = set()
     for target in targets:
       walked_targets.update(t for t in target.closure() if self.is_gentarget(t))
 
     sources_by_base = OrderedDict()
-    for target in self.context.build_graph.targets():
+    for target, (base, sources) in self._sources_by_gentarget.items():
       if target in walked_targets:
-        base, sources = target.target_base, target.sources_relative_to_buildroot()
         if base not in sources_by_base:
           sources_by_base[base] = OrderedSet()
         sources_by_base[base].update(sources)
@@ -276,6 +366,28 @@ SERVICE_PARSER = re.compile(r'^\s*(service)\s+([^\s{]+).*')
 TYPE_PARSER = re.compile(r'^\s*(enum|message)\s+([^\s{]+).*')
 
 
+IMPORT_PARSER = re.compile(r'^\s*import\s+(?:public\s+|weak\s+)?"([^"]+)"\s*;')
+
+
+def find_imports(bases, source):
+  """Returns the paths of the protos imported by the given source that can be found in `bases`.
+
+  :param bases: The proto paths to look for imports in.
+  :param string source: The proto source file to scan for imports.
+  """
+  imports = set()
+  with open(source, 'r') as protobuf:
+    for line in protobuf:
+      match = IMPORT_PARSER.match(line)
+      if match:
+        for base in bases:
+          path = os.path.join(base, match.group(1))
+          if os.path.exists(path):
+            imports.add(path)
+            break
+  return imports
+
+
 def camelcase(string):
   """Convert snake casing where present to camel casing"""
   return ''.join(word.capitalize() for word in re.split('[-_]', string))
@@ -6,7 +6,6 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from collections import defaultdict
-from copy import copy
 
 from twitter.common.collections import OrderedSet
 
@@ -77,19 +76,23 @@ class CheckExclusives(Task):
   def execute(self):
     targets = self.context.targets()
     # compute transitive exclusives
-    for t in targets:
-      t._propagate_exclusives()
-    # Check for exclusives collision.
+    Target.propagate_exclusives(targets)
+    # Check for exclusives collision; targets share equal exclusives maps, so each distinct map need
+    # only be checked once, but every target holding a colliding map is reported.
+    collisions_by_map = {}
     for t in targets:
       excl = t.get_all_exclusives()
-      for key in excl:
-        if len(excl[key]) > 1:
-          msg = 'target %s has more than one exclusives tag for key %s: %s' % \
-                (t.address.reference(), key, list(excl[key]))
-          if self.context.options.exclusives_error_on_collision:
-            raise TaskError(msg)
-          else:
-            print('Warning: %s' % msg)
+      collisions = collisions_by_map.get(id(excl))
+      if collisions is None:
+        collisions = [(key, list(excl[key])) for key in excl if len(excl[key]) > 1]
+        collisions_by_map[id(excl)] = collisions
+      for key, values in collisions:
+        msg = 'target %s has more than one exclusives tag for key %s: %s' % \
+              (t.address.reference(), key, values)
+        if self.context.options.exclusives_error_on_collision:
+          raise TaskError(msg)
+        else:
+          print('Warning: %s' % msg)
 
     if self.context.products.is_required_data('exclusives_groups'):
       mapping = ExclusivesMapping(self.context)
@@ -185,7 +188,7 @@ class ExclusivesMapping(object):
     target_key = []
     for k in self.conflicting_exclusives:
       excl = target.exclusives if isinstance(target, Target) else target.declared_exclusives
-      if len(excl[k]) > 0:
+      if len(excl.get(k, ())) > 0:
         target_key.append("%s=%s" % (k, list(excl[k])[0]))
       else:
         target_key.append("%s=<none>" % k)
@@ -197,16 +200,16 @@ class ExclusivesMapping(object):
 
   def _populate_target_maps(self, targets):
     """Populates maps of exclusive keys to targets, and vice versa."""
-    all_targets = set()
-    workqueue = copy(targets)
-    while len(workqueue) > 0:
-      t = workqueue.pop()
-      if t not in all_targets:
-        all_targets.add(t)
-        workqueue += t.dependencies
+    all_targets = self.context.build_graph.transitive_subgraph_of_addresses(
+      [t.address for t in targets])
 
+    # Targets share equal exclusives maps, so compute each map's key just once.
+    keys_by_exclusives = {}
     for t in all_targets:
-      key = self._get_exclusives_key(t)
+      excl_id = id(t.exclusives)
+      key = keys_by_exclusives.get(excl_id)
+      if key is None:
+        key = keys_by_exclusives[excl_id] = self._get_exclusives_key(t)
       if key == '':
         raise TaskError('Invalid empty group key')
       if key not in self._group_classpaths:
@@ -8,10 +8,12 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 from abc import abstractmethod, abstractproperty
 from collections import defaultdict
 import os
+import threading
 
 from pants.backend.core.tasks.check_exclusives import ExclusivesMapping
 from pants.backend.core.tasks.task import TaskBase, Task
 from pants.base.build_graph import sort_targets
+from pants.base.worker_pool import Work, WorkerPool
 from pants.base.workunit import WorkUnit
 from pants.goal.mkflag import Mkflag
 
@@ -61,6 +63,10 @@ class GroupMember(TaskBase):
     This chunk or targets' dependencies are guaranteed to have been processed in a prior
     ``execute_chunk`` round by some group member - possibly this one.
 
+    A group member is only ever asked to execute one chunk at a time, in the order its chunks were
+    presented to ``prepare_execute``, but when the group is configured with a ``parallelism``
+    above 1 this may be concurrent with another member executing an independent chunk.
+
     :param list targets: A list of targets that should be processed together (ie: 1 chunk)
     """
 
@@ -117,7 +123,7 @@ class GroupIterator(object):
             for k in range(j, i, -1):
               previous_target = sorted_targets[k - 1]
               mismatching_types = current_type != discriminator(previous_target)
-              not_a_dependency = look_ahead_target not in previous_target.closure()
+              not_a_dependency = not previous_target.depends_on(look_ahead_target)
               if mismatching_types and not_a_dependency:
                 sorted_targets[k] = sorted_targets[k - 1]
                 sorted_targets[k - 1] = look_ahead_target
@@ -210,6 +216,10 @@ class GroupTask(Task):
   input targets such that its product dependencies are met.  Group members only need claim the
   targets they own in their `select` implementation and the group task will figure out the rest
   from the dependency relationships between the targets selected by the groups members.
+
+  Chunks that do not depend on each other may be executed concurrently by different group members,
+  up to the ``parallelism`` configured in the config section named for the group; by default
+  chunks are executed one at a time.
   """
 
   _GROUPS = dict()
@@ -298,7 +308,7 @@ class GroupTask(Task):
       self._group_members.append(group_member)
 
   def execute(self):
-    with self.context.new_workunit(name=self.group_name, labels=[WorkUnit.GROUP]):
+    with self.context.new_workunit(name=self.group_name, labels=[WorkUnit.GROUP]) as workunit:
       for group_member in self._group_members:
         group_member.pre_execute()
 
@@ -337,10 +347,96 @@ class GroupTask(Task):
       for group_member, chunks in chunks_by_member.items():
         group_member.prepare_execute(chunks)
 
-      # chunk zig zag
-      for group_member, chunk in ordered_chunks:
-        group_member.execute_chunk(chunk)
+      parallelism = self.context.config.getint(self.group_name, 'parallelism', default=1)
+      if parallelism > 1 and len(ordered_chunks) > 1:
+        self._execute_chunks_concurrently(workunit, ordered_chunks, parallelism)
+      else:
+        # chunk zig zag
+        for group_member, chunk in ordered_chunks:
+          group_member.execute_chunk(chunk)
 
       # finalize
       for group_member in self._group_members:
         group_member.post_execute()
+
+  @staticmethod
+  def chunk_dependencies(ordered_chunks):
+    """Returns the indexes of the chunks each of the given chunks must be executed after.
+
+    A chunk depends on each prior chunk containing a target in the closure of one of its targets
+    and on the prior chunk of the same group member, so that each member executes its chunks one
+    at a time and in order.
+
+    :param list ordered_chunks: A list of ``(GroupMember, [chunk Targets])`` tuples ordered least
+      dependent to most dependent.
+    :returns: A list of sets of chunk indexes, one per chunk.
+    """
+    chunk_by_target = {}
+    for index, (_, chunk) in enumerate(ordered_chunks):
+      for target in chunk:
+        chunk_by_target[target] = index
+
+    dependencies = []
+    previous_chunk_by_member = {}
+    for index, (group_member, chunk) in enumerate(ordered_chunks):
+      closure = set()
+      # Visiting the most dependent targets first lets their closures cover the rest of the chunk.
+      for target in reversed(chunk):
+        if target not in closure:
+          closure.update(target.closure())
+      chunk_dependencies = set(chunk_by_target[target] for target in closure
+                               if chunk_by_target.get(target, index) < index)
+      if group_member in previous_chunk_by_member:
+        chunk_dependencies.add(previous_chunk_by_member[group_member])
+      previous_chunk_by_member[group_member] = index
+      dependencies.append(chunk_dependencies)
+    return dependencies
+
+  def _execute_chunks_concurrently(self, workunit, ordered_chunks, parallelism):
+    """Executes chunks on a pool of `parallelism` workers as soon as their dependencies are done.
+
+    If a chunk fails no further chunks are started, and the first failure is re-raised once the
+    chunks already executing are done.
+    """
+    dependencies = self.chunk_dependencies(ordered_chunks)
+    self.context.log.debug('::: chunk dependencies:\n\t%s' % '\n\t'.join(
+        '%d <- %s' % (index, sorted(deps)) for index, deps in enumerate(dependencies)))
+
+    pending = set(range(len(ordered_chunks)))
+    running = set()
+    done = set()
+    failures = []
+    cond = threading.Condition()
+
+    def execute_chunk(index):
+      group_member, chunk = ordered_chunks[index]
+      try:
+        group_member.execute_chunk(chunk)
+      except Exception as e:
+        with cond:
+          failures.append(e)
+        raise
+      finally:
+        with cond:
+          running.discard(index)
+          if not failures:
+            done.add(index)
+          cond.notify()
+
+    pool = WorkerPool(workunit, self.context.run_tracker, parallelism)
+    try:
+      with cond:
+        while (pending and not failures) or running:
+          ready = [] if failures else sorted(index for index in pending
+                                             if dependencies[index] <= done)
+          for index in ready:
+            pending.remove(index)
+            running.add(index)
+            pool.submit_async_work(Work(execute_chunk, [(index,)]))
+          # NB: A timeout is needed, otherwise python ignores SIGINT while waiting on a condition.
+          cond.wait(timeout=1000000000)
+    finally:
+      pool.shutdown()
+
+    if failures:
+      raise failures[0]
@@ -8,6 +8,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 from abc import abstractmethod
 from contextlib import contextmanager
 import itertools
+import multiprocessing
 import os
 import sys
 import threading
@@ -82,6 +83,10 @@ class TaskBase(AbstractClass):
     self._build_invalidator_dir = os.path.join(
         context.config.get('tasks', 'build_invalidator', default=default_invalidator_root),
         suffix_type)
+    self._fingerprint_workers = context.config.getint('tasks', 'fingerprint_workers',
+                                                      default=multiprocessing.cpu_count())
+    self._build_invalidator_store = context.config.get('tasks', 'build_invalidator_store',
+                                                       default='log')
 
   def prepare(self, round_manager):
     """Prepares a task for execution.
@@ -119,9 +124,14 @@ class TaskBase(AbstractClass):
 
   def _create_artifact_cache(self, spec, action):
     if len(spec) > 0:
-      pants_workdir = self.context.config.getdefault('pants_workdir')
+      config = self.context.config
+      pants_workdir = config.getdefault('pants_workdir')
       my_name = self.__class__.__name__
-      return create_artifact_cache(self.context.log, pants_workdir, spec, my_name, action)
+      local_max_size_mb = config.getint('artifact-cache', 'local_max_size_mb', default=0)
+      return create_artifact_cache(self.context.log, pants_workdir, spec, my_name, action,
+                                   local_layout=config.get('artifact-cache', 'local_layout',
+                                                           default='tarball'),
+                                   local_max_size=local_max_size_mb * 1024 * 1024 or None)
     else:
       return None
 
@@ -161,7 +171,8 @@ class TaskBase(AbstractClass):
 
   def invalidate(self):
     """Invalidates all targets for this task."""
-    BuildInvalidator(self._build_invalidator_dir).force_invalidate_all()
+    BuildInvalidator(self._build_invalidator_dir,
+                     store=self._build_invalidator_store).force_invalidate_all()
 
   def create_cache_manager(self, invalidate_dependents, fingerprint_strategy=None):
     """Creates a cache manager that can be used to invalidate targets on behalf of this task.
@@ -177,7 +188,10 @@ class TaskBase(AbstractClass):
     return InvalidationCacheManager(self._cache_key_generator,
                                     self._build_invalidator_dir,
                                     invalidate_dependents,
-                                    fingerprint_strategy=fingerprint_strategy)
+                                    fingerprint_strategy=fingerprint_strategy,
+                                    fingerprint_workers=self._fingerprint_workers,
+                                    invalidator_store=self._build_invalidator_store,
+                                    build_graph=self.context.build_graph)
 
   @contextmanager
   def invalidated(self,
@@ -271,9 +285,13 @@ class TaskBase(AbstractClass):
         self.context.log.info(*msg_elements)
 
     # Yield the result, and then mark the targets as up to date.
-    yield invalidation_check
-    for vt in invalidation_check.invalid_vts:
-      vt.update()  # In case the caller doesn't update.
+    try:
+      yield invalidation_check
+      for vt in invalidation_check.invalid_vts:
+        vt.update()  # In case the caller doesn't update.
+    finally:
+      # Persist whatever the caller marked as updated, even if it then failed.
+      cache_manager.flush()
 
   def check_artifact_cache_for(self, invalidation_check):
     """Decides which VTS to check the artifact cache for.
@@ -303,11 +321,18 @@ class TaskBase(AbstractClass):
     cached_vts = []
     uncached_vts = OrderedSet(vts)
 
+    artifact_cache = self.get_artifact_cache()
     with self.context.new_workunit(name='check', labels=[WorkUnit.MULTITOOL]) as parent:
-      res = self.context.submit_foreground_work_and_wait(
-        Work(lambda vt: bool(self.get_artifact_cache().use_cached_files(vt.cache_key)),
-             [(vt, ) for vt in vts], 'fetch'), workunit_parent=parent)
-    for vt, was_in_cache in zip(vts, res):
+      # Probe for all the keys in one go, so that only artifacts known to be cached are fetched.
+      # Errors probing for a key just report it missing.
+      present = artifact_cache.has_many([vt.cache_key for vt in vts])
+      candidates = [vt for vt, has in zip(vts, present) if has]
+      res = []
+      if candidates:
+        res = self.context.submit_foreground_work_and_wait(
+          Work(lambda vt: bool(artifact_cache.use_cached_files(vt.cache_key)),
+               [(vt, ) for vt in candidates], 'fetch'), workunit_parent=parent)
+    for vt, was_in_cache in zip(candidates, res):
       if was_in_cache:
         cached_vts.append(vt)
         uncached_vts.discard(vt)
@@ -13,6 +13,10 @@ from pants.base.build_environment import get_buildroot
 
 
 class FilesetRelPathWrapper(object):
+  # Globs are evaluated lazily, when the resulting Fileset is iterated, so using them in a BUILD
+  # file does not prevent its parse results from being cached.
+  pure = True
+
   def __init__(self, parse_context):
     self.rel_path = parse_context.rel_path
 
@@ -23,7 +27,7 @@ class FilesetRelPathWrapper(object):
       if(self._is_glob_dir_outside_root(glob, root)):
         raise ValueError('Invalid glob %s, points outside BUILD file root dir %s' % (glob, root))
 
-    return self.wrapped_fn(root=root, *args, **kwargs)
+    return Fileset(_LazyGlobs(type(self), root, args, kwargs))
 
   def _is_glob_dir_outside_root(self, glob, root):
     # The assumption is that a correct glob starts with the root,
@@ -57,3 +61,20 @@ class ZGlobs(FilesetRelPathWrapper):
   Uses ``BUILD`` file's directory as the "working directory".
   """
   wrapped_fn = Fileset.zglobs
+
+
+class _LazyGlobs(object):
+  """Evaluates a wrapper's globs on demand.
+
+  Unlike the closures Fileset creates, this can be pickled, which allows BUILD file parse results
+  containing globs to be cached.
+  """
+
+  def __init__(self, wrapper_type, root, args, kwargs):
+    self._wrapper_type = wrapper_type
+    self._root = root
+    self._args = args
+    self._kwargs = kwargs
+
+  def __call__(self):
+    return self._wrapper_type.wrapped_fn(root=self._root, *self._args, **self._kwargs)()
@@ -8,6 +8,8 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 from collections import defaultdict, namedtuple
 from contextlib import contextmanager
 import errno
+import hashlib
+import json
 import os
 import pkgutil
 import re
@@ -24,13 +26,17 @@ from pants.base.target import Target
 from pants.ivy.bootstrapper import Bootstrapper
 from pants.ivy.ivy import Ivy
 from pants.java import util
-from pants.util.dirutil import safe_mkdir, safe_open
+from pants.util.dirutil import safe_mkdir, safe_open, safe_rmtree
 
 
 IvyModuleRef = namedtuple('IvyModuleRef', ['org', 'name', 'rev'])
 IvyArtifact = namedtuple('IvyArtifact', ['path', 'classifier'])
 IvyModule = namedtuple('IvyModule', ['ref', 'artifacts', 'callers'])
 
+# A target whose jars are to be mapped, along with what goes into resolving them.
+_MapjarsPlan = namedtuple('_MapjarsPlan',
+                          ['target', 'mapdir', 'confs', 'templates', 'excludes', 'fingerprint'])
+
 
 class IvyInfo(object):
   def __init__(self):
@@ -48,6 +54,15 @@ class IvyUtils(object):
   IVY_TEMPLATE_PACKAGE_NAME = __name__
   IVY_TEMPLATE_PATH = os.path.join('tasks', 'templates', 'ivy_resolve', 'ivy.mustache')
 
+  # The manifest of the jars last retrieved for a target, kept in its mapped jars directory.
+  MAPJARS_MANIFEST = 'mapjars.json'
+
+  # Bump to invalidate all mapjars manifests, eg when their format or fingerprint inputs change.
+  MAPJARS_VERSION = 1
+
+  # Revisions ivy resolves to whatever is latest in the repository: ranges and latest.* revisions.
+  _DYNAMIC_REV = re.compile(r'^latest\.|[\[\]\(\)+,]')
+
   """Useful methods related to interaction with ivy."""
   def __init__(self, config, options, log):
     self._log = log
@@ -98,9 +113,11 @@ class IvyUtils(object):
       replace = replace_url if re.match(r'^\w+://.+', rev_or_url) else replace_rev
       return (org, name), replace
     self._overrides = {}
+    self._override_specs = []
     # TODO(pl): See above comment wrt options
     if hasattr(options, 'ivy_resolve_overrides') and options.ivy_resolve_overrides:
       self._overrides.update(parse_override(o) for o in options.ivy_resolve_overrides)
+      self._override_specs = sorted(options.ivy_resolve_overrides)
 
   @staticmethod
   def _generate_exclude_template(exclude):
@@ -245,6 +262,9 @@ class IvyUtils(object):
         excludes=excludes,
         overrides=overrides)
 
+    self._write_ivy(template_data, ivyxml)
+
+  def _write_ivy(self, template_data, ivyxml):
     safe_mkdir(os.path.dirname(ivyxml))
     with open(ivyxml, 'w') as output:
       generator = Generator(pkgutil.get_data(__name__, self._template_path),
@@ -344,6 +364,49 @@ class IvyUtils(object):
       objects.
     """
     mapdir = os.path.join(self.mapto_dir(), target.id)
+    entries = self._retrieve_jars(mapdir, target, Bootstrapper.default_ivy(executor),
+                                  workunit_factory, jars=jars)
+    self._map_entries(genmap, target, mapdir, entries)
+
+  def mapjars_batched(self, genmap, targets, executor, workunit_factory=None):
+    """Resolves jars for each of the targets as mapjars does, but with as few ivy runs as possible.
+
+    Targets whose jar dependencies are unchanged since they were last mapped are mapped from the
+    manifest recorded then without running ivy at all.  The rest are resolved together in one ivy
+    module holding a set of configurations per target, so that a single ivy run retrieves the jars
+    of all of them.  Targets that cannot share a module with the others, because they depend on a
+    different version of a common jar or force different jars, are resolved in further modules.
+
+    :param genmap: The jar_dependencies ProductMapping entry for the required products.
+    :param targets: The targets whose jar dependencies are being retrieved.
+    """
+    stale = []
+    for target in targets:
+      plan = self._plan_mapjars(target)
+      entries = self._load_mapped(plan)
+      if entries is None:
+        stale.append(plan)
+      else:
+        self._map_entries(genmap, target, plan.mapdir, entries)
+    if not stale:
+      return
+
+    ivy = Bootstrapper.default_ivy(executor)
+    batchable = []
+    for plan in stale:
+      # An artifact names the configuration of the module it is declared in, and a combined module
+      # renames those configurations, so these targets are resolved in a module of their own.
+      if any(artifact.conf for template in plan.templates for artifact in template.artifacts):
+        entries = self._retrieve_jars(plan.mapdir, plan.target, ivy, workunit_factory)
+        self._record_mapped(plan, entries)
+        self._map_entries(genmap, plan.target, plan.mapdir, entries)
+      else:
+        batchable.append(plan)
+
+    for index, batch in enumerate(self._batch_mapjars(batchable)):
+      self._mapjars_batch(genmap, batch, index, ivy, workunit_factory)
+
+  def _retrieve_jars(self, mapdir, target, ivy, workunit_factory, jars=None):
     safe_mkdir(mapdir, clean=True)
     ivyargs = [
       '-retrieve', '%s/[organisation]/[artifact]/[conf]/'
@@ -354,11 +417,16 @@ class IvyUtils(object):
                   [target],
                   ivyargs,
                   confs=target.payload.configurations,
-                  ivy=Bootstrapper.default_ivy(executor),
+                  ivy=ivy,
                   workunit_factory=workunit_factory,
                   workunit_name='map-jars',
                   jars=jars)
+    return self._scan_mapdir(mapdir)
 
+  @staticmethod
+  def _scan_mapdir(mapdir):
+    """Returns the (org, name, conf, filename) of each artifact retrieved under mapdir."""
+    entries = []
     for org in os.listdir(mapdir):
       orgdir = os.path.join(mapdir, org)
       if os.path.isdir(orgdir):
@@ -368,18 +436,237 @@ class IvyUtils(object):
             for conf in os.listdir(artifactdir):
               confdir = os.path.join(artifactdir, conf)
               for f in os.listdir(confdir):
-                if self.is_mappable_artifact(org, name, f):
-                  # TODO(John Sirois): kill the org and (org, name) exclude mappings in favor of a
-                  # conf whitelist
-                  genmap.add(org, confdir).append(f)
-                  genmap.add((org, name), confdir).append(f)
+                entries.append((org, name, conf, f))
+    return entries
+
+  def _map_entries(self, genmap, target, mapdir, entries):
+    for org, name, conf, f in entries:
+      if self.is_mappable_artifact(org, name, f):
+        confdir = os.path.join(mapdir, org, name, conf)
+        # TODO(John Sirois): kill the org and (org, name) exclude mappings in favor of a
+        # conf whitelist
+        genmap.add(org, confdir).append(f)
+        genmap.add((org, name), confdir).append(f)
+
+        genmap.add(target, confdir).append(f)
+        genmap.add((target, conf), confdir).append(f)
+        genmap.add((org, name, conf), confdir).append(f)
+
+  def _plan_mapjars(self, target):
+    jars, excludes = self._calculate_classpath([target])
+    confs = list(target.payload.configurations or ['default'])
+    templates = [self._generate_jar_template(jar, confs) for jar in jars]
+
+    # What a mutable or dynamic revision resolves to can change from run to run, so targets with
+    # such jars are always resolved afresh.
+    fingerprint = None
+    if not any(self._is_mutable(jar) or self._is_dynamic(jar) for jar in jars):
+      fingerprint = hashlib.sha1(json.dumps([
+        self.MAPJARS_VERSION,
+        confs,
+        self._args,
+        self._transitive,
+        self._override_specs,
+        sorted(jar.cache_key() for jar in jars),
+        sorted((exclude.org, exclude.name) for exclude in excludes),
+      ]).encode('utf-8')).hexdigest()
+
+    return _MapjarsPlan(target=target,
+                        mapdir=os.path.join(self.mapto_dir(), target.id),
+                        confs=confs,
+                        templates=templates,
+                        excludes=excludes,
+                        fingerprint=fingerprint)
 
-                  genmap.add(target, confdir).append(f)
-                  genmap.add((target, conf), confdir).append(f)
-                  genmap.add((org, name, conf), confdir).append(f)
+  @classmethod
+  def _is_dynamic(cls, jar):
+    return (not jar.rev or cls._DYNAMIC_REV.search(jar.rev)
+            or any(artifact.url for artifact in jar.artifacts))
 
+  def _load_mapped(self, plan):
+    """Returns the entries last retrieved for the planned target if still valid, else None."""
+    if plan.fingerprint is None:
+      return None
+    try:
+      with open(os.path.join(plan.mapdir, self.MAPJARS_MANIFEST), 'rb') as fp:
+        manifest = json.load(fp)
+    except (IOError, ValueError):
+      return None
+    if not isinstance(manifest, dict) or manifest.get('fingerprint') != plan.fingerprint:
+      return None
+
+    entries = [tuple(entry) for entry in manifest.get('entries', [])]
+    # The retrieved jars are symlinks into the ivy cache, which may have been cleaned since.
+    for org, name, conf, f in entries:
+      if not os.path.exists(os.path.join(plan.mapdir, org, name, conf, f)):
+        return None
+    return entries
+
+  def _record_mapped(self, plan, entries):
+    if plan.fingerprint is not None:
+      with safe_open(os.path.join(plan.mapdir, self.MAPJARS_MANIFEST), 'wb') as fp:
+        json.dump(dict(fingerprint=plan.fingerprint, entries=entries), fp)
+
+  @staticmethod
+  def _dependency_key(template):
+    return repr(sorted((key, value) for key, value in template.items()
+                       if key not in ('configurations', 'configurations?')))
+
+  def _batch_mapjars(self, plans):
+    """Groups planned targets into batches that can each be resolved in a single ivy module.
+
+    A module holds one dependency per jar, so targets can only share one if they agree on each jar
+    they have in common.  Overrides apply to every configuration of a module, so they must also
+    agree on which jars are forced.
+    """
+    batches = []
+    for plan in plans:
+      dependencies = dict(((template.org, template.module), self._dependency_key(template))
+                          for template in plan.templates)
+      forced = frozenset((template.org, template.module, template.version)
+                         for template in plan.templates if template.force)
+      for batch_dependencies, batch_forced, batch in batches:
+        if forced == batch_forced and all(batch_dependencies.get(coordinate, key) == key
+                                          for coordinate, key in dependencies.items()):
+          batch_dependencies.update(dependencies)
+          batch.append(plan)
+          break
+      else:
+        batches.append((dependencies, forced, [plan]))
+    return [batch for _, _, batch in batches]
+
+  def _mapjars_batch(self, genmap, batch, index, ivy, workunit_factory):
+    workdir = os.path.join(self.mapto_dir(), '.batch', str(index))
+    safe_mkdir(workdir, clean=True)
+    stagedir = os.path.join(workdir, 'retrieve')
+
+    # Each target gets its own copy of its configurations, namespaced by its position in the batch,
+    # so that ivy resolves each target's configurations just as it would in a module of its own.
+    confs = []
+    dependencies = OrderedDict()
+    excludes = []
+    staged = []
+    for position, plan in enumerate(batch):
+      namespaced = {}
+      for conf in plan.confs:
+        namespaced[conf] = 't%d_%s' % (position, conf)
+        confs.append(namespaced[conf])
+        staged.append((plan, conf, namespaced[conf]))
+
+      for template in plan.templates:
+        # A dependency with no configurations of its own maps all the target's configurations.
+        mappings = ([TemplateData(name=namespaced[conf], mapped=conf)
+                     for conf in template.configurations] or
+                    [TemplateData(name=namespaced[conf], mapped='*') for conf in plan.confs])
+        coordinate = (template.org, template.module)
+        dependency = dependencies.get(coordinate)
+        if dependency:
+          dependencies[coordinate] = dependency.extend(
+              conf_mappings=dependency.conf_mappings + mappings)
+        else:
+          dependencies[coordinate] = template.extend(configurations=[], conf_mappings=mappings)
+
+      excludes.extend(TemplateData(org=exclude.org,
+                                   name=exclude.name,
+                                   conf=','.join(namespaced[conf] for conf in plan.confs))
+                      for exclude in sorted(plan.excludes))
+
+    overrides = [self._generate_override_template(dependency)
+                 for dependency in dependencies.values() if dependency.force]
+    template_data = TemplateData(
+        org='internal',
+        module='mapjars-%d' % index,
+        version='latest.integration',
+        publications=None,
+        configurations=confs,
+        dependencies=list(dependencies.values()),
+        excludes=excludes,
+        overrides=overrides)
+
+    ivyxml = os.path.join(workdir, 'ivy.xml')
+    ivyargs = [
+      '-retrieve', '%s/[conf]/[organisation]/[artifact]/'
+                   '[organisation]-[artifact]-[revision](-[classifier]).[ext]' % stagedir,
+      '-symlink',
+    ]
+    with self._resolve_lock(ivy, template_data.org, template_data.module):
+      self._write_ivy(template_data, ivyxml)
+      self._run_ivy(ivy, ivyxml, confs, ivyargs, workunit_factory, 'map-jars')
+
+    # Move each target's jars into the layout mapjars retrieves to.
+    for plan in batch:
+      safe_mkdir(plan.mapdir, clean=True)
+    for plan, conf, namespaced_conf in staged:
+      confdir = os.path.join(stagedir, namespaced_conf)
+      if os.path.isdir(confdir):
+        for org in os.listdir(confdir):
+          for name in os.listdir(os.path.join(confdir, org)):
+            artifactdir = os.path.join(plan.mapdir, org, name)
+            safe_mkdir(artifactdir)
+            os.rename(os.path.join(confdir, org, name), os.path.join(artifactdir, conf))
+    safe_rmtree(workdir)
+
+    for plan in batch:
+      entries = self._scan_mapdir(plan.mapdir)
+      self._record_mapped(plan, entries)
+      self._map_entries(genmap, plan.target, plan.mapdir, entries)
+
+  # Protects the ivy.xml symlink in the shared ivy workdir.
   ivy_lock = threading.RLock()
 
+  # Serializes ivy runs against a cache that does not lock its artifacts itself.
+  ivy_cache_lock = threading.RLock()
+
+  # The lock strategies under which ivy locks the artifacts it writes into its cache.
+  LOCKING_CACHE_STRATEGIES = frozenset(['artifact-lock', 'artifact-lock-nio'])
+
+  _module_locks = defaultdict(threading.RLock)
+  _module_locks_lock = threading.Lock()
+
+  _cache_locking_by_settings = {}
+
+  @classmethod
+  @contextmanager
+  def module_lock(cls, org, name):
+    """Serializes ivy runs of the module org#name in this process.
+
+    Ivy keeps the resolved descriptor and reports for a module in the ivy cache under the module's
+    name, so runs of the same module must not overlap; runs of different modules may.
+    """
+    with cls._module_locks_lock:
+      lock = cls._module_locks[(org, name)]
+    with lock:
+      yield
+
+  @classmethod
+  def cache_locks_artifacts(cls, ivy_settings):
+    """Returns whether the ivy cache configured by the given ivysettings.xml locks its artifacts.
+
+    Unless it does, concurrent ivy runs can download the same artifact into the cache at once and
+    leave it corrupt.  Ivy's built in settings, used when `ivy_settings` is None, do not lock.
+    """
+    if not ivy_settings:
+      return False
+    locking = cls._cache_locking_by_settings.get(ivy_settings)
+    if locking is None:
+      try:
+        caches = xml.etree.ElementTree.parse(ivy_settings).find('caches')
+      except (IOError, xml.etree.ElementTree.ParseError):
+        caches = None
+      locking = caches is not None and caches.get('lockStrategy') in cls.LOCKING_CACHE_STRATEGIES
+      cls._cache_locking_by_settings[ivy_settings] = locking
+    return locking
+
+  @contextmanager
+  def _resolve_lock(self, ivy, org, name):
+    """Held around an ivy run of the module org#name against the cache of the given ivy."""
+    with self.module_lock(org, name):
+      if self.cache_locks_artifacts(ivy.ivy_settings):
+        yield
+      else:
+        with self.ivy_cache_lock:
+          yield
+
   def exec_ivy(self,
                target_workdir,
                targets,
@@ -403,36 +690,44 @@ class IvyUtils(object):
     else:
       excludes = set()
 
+    confs_to_resolve = confs or ['default']
+    org, name = self.identify(targets)
+    with self._resolve_lock(ivy, org, name):
+      self._generate_ivy(targets, jars, excludes, ivyxml, confs_to_resolve)
+      self._run_ivy(ivy, ivyxml, confs_to_resolve, args, workunit_factory, workunit_name,
+                    symlink_ivyxml=symlink_ivyxml)
+
+  def _run_ivy(self, ivy, ivyxml, confs, args, workunit_factory, workunit_name,
+               symlink_ivyxml=False):
+    """Runs ivy against the given ivy.xml; the caller must hold the lock for the module it holds."""
     ivy_args = ['-ivy', ivyxml]
 
-    confs_to_resolve = confs or ['default']
     ivy_args.append('-confs')
-    ivy_args.extend(confs_to_resolve)
+    ivy_args.extend(confs)
 
     ivy_args.extend(args)
     if not self._transitive:
       ivy_args.append('-notransitive')
     ivy_args.extend(self._args)
 
-    def safe_link(src, dest):
-      if os.path.exists(dest):
-        os.unlink(dest)
-      os.symlink(src, dest)
+    runner = ivy.runner(jvm_options=self._jvm_options, args=ivy_args)
+    try:
+      result = util.execute_runner(runner,
+                                   workunit_factory=workunit_factory,
+                                   workunit_name=workunit_name)
+
+      if symlink_ivyxml:
+        self.link_ivyxml(ivyxml)
 
+      if result != 0:
+        raise TaskError('Ivy returned %d' % result)
+    except runner.executor.Error as e:
+      raise TaskError(e)
+
+  def link_ivyxml(self, ivyxml):
+    """Symlinks the shared ivy workdir's ivy.xml to the given one (useful for IDEs that read it)."""
+    ivyxml_symlink = os.path.join(self._workdir, 'ivy.xml')
     with IvyUtils.ivy_lock:
-      self._generate_ivy(targets, jars, excludes, ivyxml, confs_to_resolve)
-      runner = ivy.runner(jvm_options=self._jvm_options, args=ivy_args)
-      try:
-        result = util.execute_runner(runner,
-                                     workunit_factory=workunit_factory,
-                                     workunit_name=workunit_name)
-
-        # Symlink to the current ivy.xml file (useful for IDEs that read it).
-        if symlink_ivyxml:
-          ivyxml_symlink = os.path.join(self._workdir, 'ivy.xml')
-          safe_link(ivyxml, ivyxml_symlink)
-
-        if result != 0:
-          raise TaskError('Ivy returned %d' % result)
-      except runner.executor.Error as e:
-        raise TaskError(e)
+      if os.path.lexists(ivyxml_symlink):
+        os.unlink(ivyxml_symlink)
+      os.symlink(ivyxml, ivyxml_symlink)
@@ -78,3 +78,8 @@ class ScalaLibrary(ExportableJvmLibrary):
     for java_source_target in self.java_sources:
       target_set.update(java_source_target.closure())
     return target_set
+
+  def depends_on(self, target):
+    # Overrides the default implementation to look in the closures of java_sources as well
+    return (super(ScalaLibrary, self).depends_on(target) or
+            any(java_source_target.depends_on(target) for java_source_target in self.java_sources))
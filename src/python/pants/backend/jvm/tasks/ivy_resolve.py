@@ -71,6 +71,10 @@ class IvyResolve(NailgunTask, IvyTaskMixin, JvmToolTaskMixin):
     self._cachedir = self._ivy_bootstrapper.ivy_cache_dir
     self._confs = self.context.config.getlist(self._CONFIG_SECTION, 'confs', default=['default'])
     self._classpath_dir = os.path.join(self.workdir, 'mapped')
+    # Whether to map the jar_dependencies of all targets in as few ivy runs as possible or with an
+    # ivy run per target.
+    self._batch_mapjars = self.context.config.getbool(self._CONFIG_SECTION, 'batch_mapjars',
+                                                      default=True)
 
     self._outdir = self.context.options.ivy_resolve_outdir or os.path.join(self.workdir, 'reports')
     self._open = self.context.options.ivy_resolve_open
@@ -120,19 +124,23 @@ class IvyResolve(NailgunTask, IvyTaskMixin, JvmToolTaskMixin):
     # (I think this well be covered by the computed transitive dependencies of
     # A and B. But before pushing this change, review this comment, and make sure that this is
     # working correctly.)
-    for group_key in groups.get_group_keys():
-      # Narrow the groups target set to just the set of targets that we're supposed to build.
-      # Normally, this shouldn't be different from the contents of the group.
-      group_targets = groups.get_targets_for_group_key(group_key) & set(targets)
-
-      # NOTE(pl): The symlinked ivy.xml (for IDEs, particularly IntelliJ) in the presence of
-      # multiple exclusives groups will end up as the last exclusives group run.  I'd like to
-      # deprecate this eventually, but some people rely on it, and it's not clear to me right now
-      # whether telling them to use IdeaGen instead is feasible.
-      classpath = self.ivy_resolve(group_targets,
-                                   executor=executor,
-                                   symlink_ivyxml=True,
-                                   workunit_name='ivy-resolve')
+    group_keys = groups.get_group_keys()
+    # Narrow the groups target set to just the set of targets that we're supposed to build.
+    # Normally, this shouldn't be different from the contents of the group.
+    group_target_sets = [groups.get_targets_for_group_key(group_key) & set(targets)
+                         for group_key in group_keys]
+
+    # The groups are resolved independently of each other, so they're resolved concurrently.
+    # NOTE(pl): The symlinked ivy.xml (for IDEs, particularly IntelliJ) in the presence of
+    # multiple exclusives groups will end up as the last exclusives group run.  I'd like to
+    # deprecate this eventually, but some people rely on it, and it's not clear to me right now
+    # whether telling them to use IdeaGen instead is feasible.
+    classpaths = self.ivy_resolve_groups(group_target_sets,
+                                         executor=executor,
+                                         symlink_ivyxml=True,
+                                         workunit_name='ivy-resolve')
+
+    for group_key, group_targets, classpath in zip(group_keys, group_target_sets, classpaths):
       if self.context.products.is_required_data('ivy_jar_products'):
         self._populate_ivy_jar_products(group_targets)
       for conf in self._confs:
@@ -148,9 +156,14 @@ class IvyResolve(NailgunTask, IvyTaskMixin, JvmToolTaskMixin):
     create_jardeps_for = self.context.products.isrequired('jar_dependencies')
     if create_jardeps_for:
       genmap = self.context.products.get('jar_dependencies')
-      for target in filter(create_jardeps_for, targets):
-        self._ivy_utils.mapjars(genmap, target, executor=executor,
-                                workunit_factory=self.context.new_workunit)
+      jardep_targets = filter(create_jardeps_for, targets)
+      if self._batch_mapjars:
+        self._ivy_utils.mapjars_batched(genmap, jardep_targets, executor=executor,
+                                        workunit_factory=self.context.new_workunit)
+      else:
+        for target in jardep_targets:
+          self._ivy_utils.mapjars(genmap, target, executor=executor,
+                                  workunit_factory=self.context.new_workunit)
 
   def check_artifact_cache_for(self, invalidation_check):
     # Ivy resolution is an output dependent on the entire target set, and is not divisible
@@ -6,10 +6,12 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from collections import defaultdict
+from contextlib import contextmanager
 from hashlib import sha1
 import logging
 import os
 import shutil
+import sys
 import threading
 
 from pants.backend.jvm.ivy_utils import IvyUtils
@@ -18,6 +20,7 @@ from pants.backend.jvm.targets.jvm_target import JvmTarget
 from pants.base.cache_manager import VersionedTargetSet
 from pants.base.exceptions import TaskError
 from pants.base.fingerprint_strategy import FingerprintStrategy
+from pants.base.worker_pool import Work
 from pants.ivy.bootstrapper import Bootstrapper
 from pants.java.executor import Executor
 
@@ -58,6 +61,28 @@ class IvyTaskMixin(object):
                   silent=False,
                   workunit_name=None,
                   workunit_labels=None):
+    return self.ivy_resolve_groups([targets],
+                                   executor=executor,
+                                   symlink_ivyxml=symlink_ivyxml,
+                                   silent=silent,
+                                   workunit_name=workunit_name,
+                                   workunit_labels=workunit_labels)[0]
+
+  def ivy_resolve_groups(self,
+                         target_sets,
+                         executor=None,
+                         symlink_ivyxml=False,
+                         silent=False,
+                         workunit_name=None,
+                         workunit_labels=None):
+    """Resolves the classpath of each of the given sets of targets.
+
+    Each set is resolved with an ivy run of its own, as ivy_resolve would, but the sets that need
+    resolving are resolved concurrently on the foreground worker pool.
+
+    :param target_sets: A list of the sets of targets to resolve.
+    :returns: The classpath of each set of targets, in the same order as the sets.
+    """
     # NOTE: Always pass all the targets to exec_ivy, as they're used to calculate the name of
     # the generated module, which in turn determines the location of the XML report file
     # ivy generates. We recompute this name from targets later in order to find that file.
@@ -67,8 +92,6 @@ class IvyTaskMixin(object):
                        % (executor, type(executor)))
     ivy = Bootstrapper.default_ivy(java_executor=executor,
                                    bootstrap_workunit_factory=self.context.new_workunit)
-    if not targets:
-      return []
 
     ivy_workdir = os.path.join(self.context.config.getdefault('pants_workdir'), 'ivy')
     ivy_utils = IvyUtils(config=self.context.config,
@@ -77,42 +100,66 @@ class IvyTaskMixin(object):
 
     fingerprint_strategy = IvyResolveFingerprintStrategy()
 
-    with self.invalidated(targets,
-                          invalidate_dependents=True,
-                          silent=silent,
-                          fingerprint_strategy=fingerprint_strategy) as invalidation_check:
-      global_vts = VersionedTargetSet.from_versioned_targets(invalidation_check.all_vts)
-      target_workdir = os.path.join(ivy_workdir, global_vts.cache_key.hash)
-      target_classpath_file = os.path.join(target_workdir, 'classpath')
-      raw_target_classpath_file = target_classpath_file + '.raw'
-      raw_target_classpath_file_tmp = raw_target_classpath_file + '.tmp'
-      # A common dir for symlinks into the ivy2 cache. This ensures that paths to jars
-      # in artifact-cached analysis files are consistent across systems.
-      # Note that we have one global, well-known symlink dir, again so that paths are
-      # consistent across builds.
-      symlink_dir = os.path.join(ivy_workdir, 'jars')
-
-      # Note that it's possible for all targets to be valid but for no classpath file to exist at
-      # target_classpath_file, e.g., if we previously built a superset of targets.
-      if invalidation_check.invalid_vts or not os.path.exists(raw_target_classpath_file):
-        args = ['-cachepath', raw_target_classpath_file_tmp]
-
-        def exec_ivy():
-          ivy_utils.exec_ivy(
-              target_workdir=target_workdir,
-              targets=targets,
-              args=args,
-              ivy=ivy,
-              workunit_name='ivy',
-              workunit_factory=self.context.new_workunit,
-              symlink_ivyxml=symlink_ivyxml)
-
+    # A common dir for symlinks into the ivy2 cache. This ensures that paths to jars
+    # in artifact-cached analysis files are consistent across systems.
+    # Note that we have one global, well-known symlink dir, again so that paths are
+    # consistent across builds.
+    symlink_dir = os.path.join(ivy_workdir, 'jars')
+
+    # The (targets, target_workdir, raw classpath file) of each set that needs an ivy run.
+    stale = []
+
+    def exec_ivy(targets, target_workdir, raw_target_classpath_file_tmp):
+      ivy_utils.exec_ivy(
+          target_workdir=target_workdir,
+          targets=targets,
+          args=['-cachepath', raw_target_classpath_file_tmp],
+          ivy=ivy,
+          workunit_name='ivy',
+          workunit_factory=self.context.new_workunit)
+
+    def exec_stale(workunit=None):
+      if len(stale) == 1:
+        exec_ivy(*stale[0])
+      else:
+        self.context.submit_foreground_work_and_wait(Work(exec_ivy, stale, 'resolve'),
+                                                     workunit_parent=workunit)
+      # With several sets resolved, the last one in order wins, as it would resolving serially.
+      if symlink_ivyxml:
+        ivy_utils.link_ivyxml(os.path.join(stale[-1][1], 'ivy.xml'))
+
+    # The invalidation of every set is checked, and the sets stale are resolved, within the
+    # invalidated blocks of all the sets; so each set is only marked valid once all are resolved.
+    target_workdirs = [None] * len(target_sets)
+    resolved = []
+    with self._invalidated_sets(target_sets,
+                                invalidate_dependents=True,
+                                silent=silent,
+                                fingerprint_strategy=fingerprint_strategy) as invalidation_checks:
+      for index, invalidation_check in enumerate(invalidation_checks):
+        if invalidation_check is None:
+          continue
+        global_vts = VersionedTargetSet.from_versioned_targets(invalidation_check.all_vts)
+        target_workdir = os.path.join(ivy_workdir, global_vts.cache_key.hash)
+        target_workdirs[index] = target_workdir
+        raw_target_classpath_file = os.path.join(target_workdir, 'classpath.raw')
+        raw_target_classpath_file_tmp = raw_target_classpath_file + '.tmp'
+
+        # Note that it's possible for all targets to be valid but for no classpath file to exist at
+        # target_classpath_file, e.g., if we previously built a superset of targets.
+        if invalidation_check.invalid_vts or not os.path.exists(raw_target_classpath_file):
+          stale.append((target_sets[index], target_workdir, raw_target_classpath_file_tmp))
+          resolved.append((global_vts, raw_target_classpath_file, raw_target_classpath_file_tmp))
+
+      if stale:
         if workunit_name:
-          with self.context.new_workunit(name=workunit_name, labels=workunit_labels or []):
-            exec_ivy()
+          with self.context.new_workunit(name=workunit_name,
+                                         labels=workunit_labels or []) as workunit:
+            exec_stale(workunit)
         else:
-          exec_ivy()
+          exec_stale()
 
+      for global_vts, raw_target_classpath_file, raw_target_classpath_file_tmp in resolved:
         if not os.path.exists(raw_target_classpath_file_tmp):
           raise TaskError('Ivy failed to create classpath file at %s'
                           % raw_target_classpath_file_tmp)
@@ -122,17 +169,54 @@ class IvyTaskMixin(object):
         if self.artifact_cache_writes_enabled():
           self.update_artifact_cache([(global_vts, [raw_target_classpath_file])])
 
-    # Make our actual classpath be symlinks, so that the paths are uniform across systems.
-    # Note that we must do this even if we read the raw_target_classpath_file from the artifact
-    # cache. If we cache the target_classpath_file we won't know how to create the symlinks.
-    symlink_map = IvyUtils.symlink_cachepath(self.context.ivy_home, raw_target_classpath_file,
-                                             symlink_dir, target_classpath_file)
-    with IvyTaskMixin.symlink_map_lock:
-      all_symlinks_map = self.context.products.get_data('symlink_map') or defaultdict(list)
-      for path, symlink in symlink_map.items():
-        all_symlinks_map[os.path.realpath(path)].append(symlink)
-      self.context.products.safe_create_data('symlink_map', lambda: all_symlinks_map)
-
-    with IvyUtils.cachepath(target_classpath_file) as classpath:
-      stripped_classpath = [path.strip() for path in classpath]
-      return [path for path in stripped_classpath if ivy_utils.is_classpath_artifact(path)]
+    classpaths = []
+    for target_workdir in target_workdirs:
+      if target_workdir is None:
+        classpaths.append([])
+        continue
+
+      # Make our actual classpath be symlinks, so that the paths are uniform across systems.
+      # Note that we must do this even if we read the raw_target_classpath_file from the artifact
+      # cache. If we cache the target_classpath_file we won't know how to create the symlinks.
+      target_classpath_file = os.path.join(target_workdir, 'classpath')
+      symlink_map = IvyUtils.symlink_cachepath(self.context.ivy_home,
+                                               target_classpath_file + '.raw',
+                                               symlink_dir,
+                                               target_classpath_file)
+      with IvyTaskMixin.symlink_map_lock:
+        all_symlinks_map = self.context.products.get_data('symlink_map') or defaultdict(list)
+        for path, symlink in sorted(symlink_map.items()):
+          all_symlinks_map[os.path.realpath(path)].append(symlink)
+        self.context.products.safe_create_data('symlink_map', lambda: all_symlinks_map)
+
+      with IvyUtils.cachepath(target_classpath_file) as classpath:
+        stripped_classpath = [path.strip() for path in classpath]
+        classpaths.append([path for path in stripped_classpath
+                           if ivy_utils.is_classpath_artifact(path)])
+    return classpaths
+
+  @contextmanager
+  def _invalidated_sets(self, target_sets, **kwargs):
+    """Enters the invalidated block of each of the given sets of targets at once.
+
+    Yields the invalidation check of each set, in order, or None for an empty set.  The blocks are
+    exited in reverse order, so none of the sets is marked valid unless the work on all succeeds.
+    """
+    managers = []
+    invalidation_checks = []
+    try:
+      for targets in target_sets:
+        if targets:
+          manager = self.invalidated(targets, **kwargs)
+          invalidation_checks.append(manager.__enter__())
+          managers.append(manager)
+        else:
+          invalidation_checks.append(None)
+      yield invalidation_checks
+    except BaseException:
+      exc_info = sys.exc_info()
+      while managers:
+        managers.pop().__exit__(*exc_info)
+      raise exc_info[0], exc_info[1], exc_info[2]
+    while managers:
+      managers.pop().__exit__(None, None, None)
@@ -9,6 +9,7 @@ from collections import defaultdict
 import itertools
 import os
 import shutil
+import threading
 import uuid
 
 from twitter.common.collections import OrderedSet
@@ -105,6 +106,9 @@ class JvmCompile(NailgunTaskBase, GroupMember, JvmToolTaskMixin):
   _file_suffix = None
   _config_section = None
 
+  # Guards the products shared by the compilers of a group.
+  _products_lock = threading.Lock()
+
   @classmethod
   def name(cls):
     return cls._language
@@ -223,7 +227,8 @@ class JvmCompile(NailgunTaskBase, GroupMember, JvmToolTaskMixin):
                                                  check_missing_deps,
                                                  check_missing_direct_deps,
                                                  check_unnecessary_deps,
-                                                 target_whitelist)
+                                                 target_whitelist,
+                                                 products_lock=self._products_lock)
     else:
       self._dep_analyzer = None
 
@@ -806,24 +811,26 @@ class JvmCompile(NailgunTaskBase, GroupMember, JvmToolTaskMixin):
       self.context.products.safe_create_data('resources_by_target', make_products)
 
   def _register_products(self, targets, analysis_file):
-    classes_by_source = self.context.products.get_data('classes_by_source')
-    classes_by_target = self.context.products.get_data('classes_by_target')
-    resources_by_target = self.context.products.get_data('resources_by_target')
-
-    if classes_by_source is not None or classes_by_target is not None:
-      computed_classes_by_source = self._compute_classes_by_source(analysis_file)
-      for target in targets:
-        target_products = classes_by_target[target] if classes_by_target is not None else None
-        for source in self._sources_by_target.get(target, []):  # Source is relative to buildroot.
-          classes = computed_classes_by_source.get(source, [])  # Classes are absolute paths.
-          if classes_by_target is not None:
-            target_products.add_abs_paths(self._classes_dir, classes)
-          if classes_by_source is not None:
-            classes_by_source[source].add_abs_paths(self._classes_dir, classes)
-
-    # TODO(pl): https://github.com/pantsbuild/pants/issues/206
-    if resources_by_target is not None:
-      for target in targets:
-        target_resources = resources_by_target[target]
-        for root, abs_paths in self.extra_products(target):
-          target_resources.add_abs_paths(root, abs_paths)
+    # Compilers for different languages may execute independent chunks concurrently.
+    with self._products_lock:
+      classes_by_source = self.context.products.get_data('classes_by_source')
+      classes_by_target = self.context.products.get_data('classes_by_target')
+      resources_by_target = self.context.products.get_data('resources_by_target')
+
+      if classes_by_source is not None or classes_by_target is not None:
+        computed_classes_by_source = self._compute_classes_by_source(analysis_file)
+        for target in targets:
+          target_products = classes_by_target[target] if classes_by_target is not None else None
+          for source in self._sources_by_target.get(target, []):  # Source is relative to buildroot.
+            classes = computed_classes_by_source.get(source, [])  # Classes are absolute paths.
+            if classes_by_target is not None:
+              target_products.add_abs_paths(self._classes_dir, classes)
+            if classes_by_source is not None:
+              classes_by_source[source].add_abs_paths(self._classes_dir, classes)
+
+      # TODO(pl): https://github.com/pantsbuild/pants/issues/206
+      if resources_by_target is not None:
+        for target in targets:
+          target_resources = resources_by_target[target]
+          for root, abs_paths in self.extra_products(target):
+            target_resources.add_abs_paths(root, abs_paths)
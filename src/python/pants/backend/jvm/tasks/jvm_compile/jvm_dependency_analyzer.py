@@ -7,6 +7,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 
 from collections import defaultdict
 import os
+import threading
 
 from twitter.common.collections import OrderedSet
 
@@ -15,7 +16,6 @@ from pants.backend.jvm.targets.jar_library import JarLibrary
 from pants.backend.jvm.targets.jvm_target import JvmTarget
 from pants.backend.jvm.targets.scala_library import ScalaLibrary
 from pants.base.build_environment import get_buildroot
-from pants.base.build_graph import sort_targets
 from pants.base.exceptions import TaskError
 
 
@@ -25,9 +25,15 @@ class JvmDependencyAnalyzer(object):
                check_missing_deps,
                check_missing_direct_deps,
                check_unnecessary_deps,
-               target_whitelist):
+               target_whitelist,
+               products_lock=None):
+    """
+    :param products_lock: An optional lock held by whoever adds to the classes_by_target product
+      while it may be read here.
+    """
 
     self._context = context
+    self._products_lock = products_lock or threading.Lock()
     self._context.products.require_data('classes_by_target')
     self._context.products.require_data('ivy_jar_products')
 
@@ -70,11 +76,15 @@ class JvmDependencyAnalyzer(object):
 
     # Compute class -> target.
     with self._context.new_workunit(name='map_classes'):
-      classes_by_target = self._context.products.get_data('classes_by_target')
-      for tgt, target_products in classes_by_target.items():
-        for _, classes in target_products.abs_paths():
-          for cls in classes:
-            targets_by_file[cls].add(tgt)
+      # Compilers of other languages may be adding classes concurrently, so read a snapshot.
+      with self._products_lock:
+        classes_by_target = self._context.products.get_data('classes_by_target')
+        classes_by_tgt = [(tgt, [cls for _, classes in target_products.abs_paths()
+                                 for cls in classes])
+                          for tgt, target_products in classes_by_target.items()]
+      for tgt, classes in classes_by_tgt:
+        for cls in classes:
+          targets_by_file[cls].add(tgt)
 
     # Compute jar -> target.
     with self._context.new_workunit(name='map_jars'):
@@ -124,7 +134,7 @@ class JvmDependencyAnalyzer(object):
   def _compute_transitive_deps_by_target(self):
     """Map from target to all the targets it depends on, transitively."""
     # Sort from least to most dependent.
-    sorted_targets = reversed(sort_targets(self._context.targets()))
+    sorted_targets = self._context.ordered_targets()
     transitive_deps_by_target = defaultdict(set)
     # Iterate in dep order, to accumulate the transitive deps for each target.
     for target in sorted_targets:
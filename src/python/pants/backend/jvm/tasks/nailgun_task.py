@@ -10,6 +10,7 @@ import os
 
 from pants.backend.jvm.tasks.jvm_tool_task_mixin import JvmToolTaskMixin
 from pants.backend.core.tasks.task import QuietTaskMixin, Task, TaskBase
+from pants.base.config import Config
 from pants.base.exceptions import TaskError
 from pants.java import util
 from pants.java.distribution.distribution import Distribution
@@ -33,7 +34,22 @@ class NailgunTaskBase(TaskBase, JvmToolTaskMixin):
     if not NailgunExecutor.killall:
       return False
     else:
-      return NailgunExecutor.killall(logger=logger, everywhere=everywhere)
+      return NailgunExecutor.killall(logger=logger, everywhere=everywhere,
+                                     workdir_root=NailgunTaskBase._executor_workdir_root())
+
+  @staticmethod
+  def _executor_workdir_root(config=None):
+    """Returns the directory nailgun task executor workdirs are kept under.
+
+    Returns None if there is no config to find it from, in which case nailguns must be found by
+    scanning every process.
+    """
+    if config is None:
+      try:
+        config = Config.load()
+      except IOError:
+        return None
+    return os.path.join(config.getdefault('pants_workdir'), 'ng')
 
   @classmethod
   def setup_parser(cls, option_group, args, mkflag):
@@ -45,7 +61,7 @@ class NailgunTaskBase(TaskBase, JvmToolTaskMixin):
 
   def __init__(self, *args, **kwargs):
     super(NailgunTaskBase, self).__init__(*args, **kwargs)
-    self._executor_workdir = os.path.join(self.context.config.getdefault('pants_workdir'), 'ng',
+    self._executor_workdir = os.path.join(self._executor_workdir_root(self.context.config),
                                           self.__class__.__name__)
     self._nailgun_bootstrap_key = 'nailgun'
     self.register_jvm_tool(self._nailgun_bootstrap_key, ['//:nailgun-server'])
@@ -74,7 +90,11 @@ class NailgunTaskBase(TaskBase, JvmToolTaskMixin):
     """
     if self.nailgun_is_enabled and self.context.options.nailgun_daemon:
       classpath = os.pathsep.join(self.tool_classpath(self._nailgun_bootstrap_key))
-      client = NailgunExecutor(self._executor_workdir, classpath, distribution=self._dist)
+      config = self.context.config
+      client = NailgunExecutor(self._executor_workdir, classpath, distribution=self._dist,
+                               pool_size=config.getint('nailgun', 'pool_size', default=1),
+                               idle_timeout_secs=config.getint('nailgun', 'idle_timeout_secs'),
+                               max_memory_mb=config.getint('nailgun', 'max_memory_mb'))
     else:
       client = SubprocessExecutor(self._dist)
     return client
@@ -94,7 +114,8 @@ class NailgunTaskBase(TaskBase, JvmToolTaskMixin):
 
     If --no-ng-daemons is specified then the java main is run in a freshly spawned subprocess,
     otherwise a persistent nailgun server dedicated to this Task subclass is used to speed up
-    amortized run times.
+    amortized run times.  If a ``pool_size`` is configured in the ``nailgun`` section, concurrent
+    calls each lease a server of a pool of that many dedicated to this Task subclass.
     """
     executor = self.create_java_executor()
     try:
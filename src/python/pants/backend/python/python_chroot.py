@@ -6,12 +6,16 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from collections import defaultdict
+import errno
+import json
 import os
 import shutil
 import sys
 import tempfile
+import time
 
 from pex.interpreter import PythonInterpreter
+from pex.marshaller import CodeMarshaller
 from pex.pex_builder import PEXBuilder
 from pex.platforms import Platform
 from twitter.common.collections import OrderedSet
@@ -62,7 +66,18 @@ class PythonChroot(object):
     self._extra_requirements = list(extra_requirements) if extra_requirements else []
     self._platforms = platforms
     self._interpreter = interpreter or PythonInterpreter.get()
-    self._builder = builder or PEXBuilder(tempfile.mkdtemp(), interpreter=self._interpreter)
+
+    # Libraries are dumped by hard linking their files from a cache of per-library layers. Layers
+    # hold compiled .pyc files, so they are specific to the interpreter.
+    cache_root = PythonSetup(self._config).scratch_dir('chroot_cache', default_name='chroots')
+    self._layer_cache_root = os.path.join(cache_root, str(self._interpreter.identity))
+
+    # Hard links can't cross file systems, so by default we assemble the chroot next to the layers.
+    if not builder:
+      tmpdir = os.path.join(cache_root, 'tmp')
+      safe_mkdir(tmpdir)
+      builder = PEXBuilder(tempfile.mkdtemp(dir=tmpdir), interpreter=self._interpreter)
+    self._builder = builder
     self._conn_timeout = conn_timeout
 
     # Note: unrelated to the general pants artifact cache.
@@ -92,18 +107,115 @@ class PythonChroot(object):
     return self._builder.path()
 
   def _dump_library(self, library):
-    def copy_to_chroot(base, path, add_function):
-      src = os.path.join(get_buildroot(), base, path)
-      add_function(src, path)
-
     self.debug('  Dumping library: %s' % library)
+    try:
+      self._link_library_layer(library)
+    except (IOError, OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+      # Another run pruned the layer while we were linking from it, so cache it afresh.
+      self._link_library_layer(library)
+
+  def _link_library_layer(self, library):
+    layer, files = self._library_layer(library)
+    chroot = self._builder.chroot()
+    for relpath, label in files:
+      # Falls back to copying if the chroot is on another file system than the layer.
+      chroot.link(os.path.join(layer, relpath), relpath, label)
+
+  # Bump this to invalidate the layers already cached, e.g., when changing how they are laid out.
+  _LAYER_VERSION = 1
+
+  _LAYER_TMP_PREFIX = 'tmp'
+
+  # Superseded layers are only pruned once unused for this long, so that a run still linking from
+  # one is not likely to lose it.
+  _LAYER_PRUNE_AGE_SECS = 24 * 60 * 60
+
+  def _library_layer(self, library):
+    """Returns the cached layer of a library's sources, resources and compiled sources.
+
+    A layer holds exactly what PEXBuilder.add_source and add_resource would add to the chroot for
+    the library, and is keyed by the invalidation hash of the library and its resources; so an
+    unchanged library is dumped by just linking its files into the chroot, without copying or
+    compiling them again.
+
+    :returns: A tuple of the layer dir and a list of the (relpath, chroot label) of its files.
+    """
+    key = self._key_generator.combine_cache_keys(
+        [self._key_generator.key_for_target(target) for target in [library] + library.resources])
+    library_dir = os.path.join(self._layer_cache_root, library.id)
+    layer = os.path.join(library_dir, '%s-%d' % (key.hash, self._LAYER_VERSION))
+    manifest = os.path.join(layer, 'manifest.json')
+    try:
+      with open(manifest, 'r') as fp:
+        files = json.load(fp)
+      # Record the use, which keeps the layer from being pruned.
+      os.utime(layer, None)
+      return os.path.join(layer, 'files'), files
+    except (IOError, OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+
+    self.debug('    Caching layer %s' % os.path.basename(layer))
+    safe_mkdir(library_dir)
+    tmp_layer = tempfile.mkdtemp(dir=library_dir, prefix=self._LAYER_TMP_PREFIX)
+    files = []
+
+    def add(base, relpath, label):
+      # Copy, rather than link, so that editing a source in place can't change the cached layer.
+      dest = os.path.join(tmp_layer, 'files', relpath)
+      safe_mkdir(os.path.dirname(dest))
+      src = os.path.join(get_buildroot(), base, relpath)
+      shutil.copyfile(src, dest)
+      files.append((relpath, label))
+      if label == 'source' and relpath.endswith('.py'):
+        pyc_relpath = os.path.splitext(relpath)[0] + '.pyc'
+        with open(src) as fp:
+          pyc_object = CodeMarshaller.from_py(fp.read(), relpath)
+        with open(os.path.join(tmp_layer, 'files', pyc_relpath), 'wb') as fp:
+          fp.write(pyc_object.to_pyc())
+        files.append((pyc_relpath, label))
+
     for relpath in library.sources_relative_to_source_root():
-      copy_to_chroot(library.target_base, relpath, self._builder.add_source)
+      add(library.target_base, relpath, 'source')
 
     for resources_tgt in library.resources:
       for resource_file_from_source_root in resources_tgt.sources_relative_to_source_root():
-        copy_to_chroot(resources_tgt.target_base, resource_file_from_source_root,
-                       self._builder.add_resource)
+        add(resources_tgt.target_base, resource_file_from_source_root, 'resource')
+
+    with open(os.path.join(tmp_layer, 'manifest.json'), 'w') as fp:
+      json.dump(files, fp)
+    try:
+      if os.path.isdir(layer) and not os.path.exists(manifest):
+        # What a pruning run left of the layer while it was removing it.
+        safe_rmtree(layer)
+      os.rename(tmp_layer, layer)
+    except OSError:
+      safe_rmtree(tmp_layer)
+      if not os.path.exists(manifest):
+        raise
+      # Else another run cached the same layer concurrently.
+    else:
+      self._prune_layers(library_dir, os.path.basename(layer))
+    return os.path.join(layer, 'files'), files
+
+  def _prune_layers(self, library_dir, current):
+    """Removes the layers of a library superseded by `current` that have gone unused for a while.
+
+    Layers other runs are still caching are left alone, as are recently used ones, which other runs
+    may still be linking from.
+    """
+    cutoff = time.time() - self._LAYER_PRUNE_AGE_SECS
+    for name in os.listdir(library_dir):
+      if name == current or name.startswith(self._LAYER_TMP_PREFIX):
+        continue
+      path = os.path.join(library_dir, name)
+      try:
+        if os.path.getmtime(path) < cutoff:
+          safe_rmtree(path)
+      except OSError:
+        pass  # Another run pruned it first.
 
   def _dump_requirement(self, req, dynamic, repo):
     self.debug('  Dumping requirement: %s%s%s' % (str(req),
@@ -124,6 +236,7 @@ class PythonChroot(object):
       safe_mkdir(cache_dir)
       shutil.copy(sdist, os.path.join(cache_dir, os.path.basename(sdist)))
       self._build_invalidator.update(library_key)
+      self._build_invalidator.flush()
 
     return PythonRequirement(builder.requirement_string(), repository=cache_dir, use_2to3=True)
 
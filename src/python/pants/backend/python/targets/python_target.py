@@ -115,11 +115,10 @@ class PythonTarget(Target):
 
     return resource_targets
 
-  def walk(self, work, predicate=None):
-    super(PythonTarget, self).walk(work, predicate)
+  def extra_walk_targets(self):
     if self.provides and self.provides.binaries:
-      for binary in self.provides.binaries.values():
-        binary.walk(work, predicate)
+      return list(self.provides.binaries.values())
+    return []
 
   def _synthesize_resources_target(self):
     # Create an address for the synthetic target.
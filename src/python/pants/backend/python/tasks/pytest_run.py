@@ -17,6 +17,8 @@ from pants.util.contextutil import environment_as
 
 
 class PytestRun(PythonTask):
+  _CONFIG_SECTION = 'pytest-run'
+
   @classmethod
   def setup_parser(cls, option_group, args, mkflag):
     super(PytestRun, cls).setup_parser(option_group, args, mkflag)
@@ -32,6 +34,10 @@ class PytestRun(PythonTask):
                             action='append', default=[],
                             help='[%default] options to pass to the underlying pytest runner.')
 
+  def __init__(self, *args, **kwargs):
+    super(PytestRun, self).__init__(*args, **kwargs)
+    self.setup_artifact_cache_from_config(config_section=self._CONFIG_SECTION)
+
   def execute(self):
     def is_python_test(target):
       # Note that we ignore PythonTestSuite, because we'll see the PythonTests targets
@@ -56,7 +62,8 @@ class PytestRun(PythonTask):
                                        args=args,
                                        interpreter=self.interpreter,
                                        conn_timeout=self.conn_timeout,
-                                       fast=self.context.options.pytest_run_fast)
+                                       fast=self.context.options.pytest_run_fast,
+                                       pex_provider=self._test_pex)
       with self.context.new_workunit(name='run',
                                      labels=[WorkUnit.TOOL, WorkUnit.TEST]) as workunit:
         # pytest uses py.io.terminalwriter for output. That class detects the terminal
@@ -69,3 +76,7 @@ class PytestRun(PythonTask):
           stderr = workunit.output('stderr') if workunit else None
           if test_builder.run(stdout=stdout, stderr=stderr):
             raise TaskError()
+
+  def _test_pex(self, targets, extra_requirements, build):
+    return self.cached_pex(targets, 'pytest.pex', self.interpreter, build, platforms=('current',),
+                           extra_requirements=extra_requirements)
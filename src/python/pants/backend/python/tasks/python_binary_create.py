@@ -6,15 +6,19 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import os
+import shutil
 import time
 
 from pants.backend.python.python_chroot import PythonChroot
 from pants.backend.python.targets.python_binary import PythonBinary
 from pants.backend.python.tasks.python_task import PythonTask
 from pants.base.exceptions import TaskError
+from pants.util.dirutil import safe_mkdir
 
 
 class PythonBinaryCreate(PythonTask):
+  _CONFIG_SECTION = 'python-binary-create'
+
   @staticmethod
   def is_binary(target):
     return isinstance(target, PythonBinary)
@@ -22,6 +26,7 @@ class PythonBinaryCreate(PythonTask):
   def __init__(self, *args, **kwargs):
     super(PythonBinaryCreate, self).__init__(*args, **kwargs)
     self._distdir = self.context.config.getdefault('pants_distdir')
+    self.setup_artifact_cache_from_config(config_section=self._CONFIG_SECTION)
 
   def execute(self):
     binaries = self.context.targets(self.is_binary)
@@ -41,22 +46,30 @@ class PythonBinaryCreate(PythonTask):
   def create_binary(self, binary):
     interpreter = self.select_interpreter_for_targets(binary.closure())
 
-    run_info = self.context.run_tracker.run_info
-    build_properties = {}
-    build_properties.update(run_info.add_basic_info(run_id=None, timestamp=time.time()))
-    build_properties.update(run_info.add_scm_info())
-
-    pexinfo = binary.pexinfo.copy()
-    pexinfo.build_properties = build_properties
-
-    with self.temporary_pex_builder(pex_info=pexinfo, interpreter=interpreter) as builder:
-      chroot = PythonChroot(
-        targets=[binary],
-        builder=builder,
-        platforms=binary.platforms,
-        interpreter=interpreter,
-        conn_timeout=self.conn_timeout)
-
-      pex_path = os.path.join(self._distdir, '%s.pex' % binary.name)
-      chroot.dump()
-      builder.build(pex_path)
+    def build(path):
+      # The build properties are those of the run that built the PEX, which later runs reuse for
+      # as long as the binary's closure is unchanged.
+      run_info = self.context.run_tracker.run_info
+      build_properties = {}
+      build_properties.update(run_info.add_basic_info(run_id=None, timestamp=time.time()))
+      build_properties.update(run_info.add_scm_info())
+
+      pexinfo = binary.pexinfo.copy()
+      pexinfo.build_properties = build_properties
+
+      with self.temporary_pex_builder(pex_info=pexinfo, interpreter=interpreter) as builder:
+        chroot = PythonChroot(
+          targets=[binary],
+          builder=builder,
+          platforms=binary.platforms,
+          interpreter=interpreter,
+          conn_timeout=self.conn_timeout)
+
+        chroot.dump()
+        builder.build(path)
+
+    cached_pex = self.cached_pex([binary], '%s.pex' % binary.name, interpreter, build,
+                                 platforms=binary.platforms)
+    safe_mkdir(self._distdir)
+    pex_path = os.path.join(self._distdir, '%s.pex' % binary.name)
+    shutil.copy(cached_pex, pex_path)
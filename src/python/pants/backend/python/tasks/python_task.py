@@ -6,6 +6,8 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from contextlib import contextmanager
+import hashlib
+import os
 import tempfile
 
 from pex.pex_builder import PEXBuilder
@@ -13,7 +15,37 @@ from twitter.common.collections import OrderedSet
 
 from pants.backend.core.tasks.task import Task
 from pants.backend.python.interpreter_cache import PythonInterpreterCache
+from pants.backend.python.resolver import get_platforms
+from pants.base.cache_manager import VersionedTargetSet
 from pants.base.exceptions import TaskError
+from pants.base.fingerprint_strategy import DefaultFingerprintStrategy
+from pants.util.dirutil import safe_mkdir, safe_rmtree
+
+
+class PexFingerprintStrategy(DefaultFingerprintStrategy):
+  """Fingerprints targets for the PEXes built from them.
+
+  A PEX also depends on the interpreter it is built for, the platforms its requirements are
+  resolved for and any requirements added to it, so these are mixed into the strategy's name, which
+  in turn labels each fingerprint and keys the fingerprints targets memoize.
+  """
+
+  def __init__(self, interpreter, platforms, extra_requirements=()):
+    """
+    :param interpreter: The PythonInterpreter the PEX is built for.
+    :param platforms: The resolved platforms the PEX is built for.
+    :param extra_requirements: PythonRequirements added to the PEX beyond those of its targets.
+    """
+    hasher = hashlib.sha1()
+    hasher.update(str(interpreter.identity))
+    for platform in sorted(platforms):
+      hasher.update(platform)
+    for requirement in sorted(repr(requirement) for requirement in extra_requirements):
+      hasher.update(requirement)
+    self._name = 'pex.{0}'.format(hasher.hexdigest()[:12])
+
+  def name(self):
+    return self._name
 
 
 class PythonTask(Task):
@@ -84,4 +116,56 @@ class PythonTask(Task):
     yield builder
     builder.chroot().delete()
 
+  def cached_pex(self, targets, name, interpreter, build, platforms=None, extra_requirements=()):
+    """Returns the path of a PEX built from the given targets, building it only if need be.
+
+    PEXes are kept under the task's workdir and shared through its artifact cache, keyed by the
+    transitive fingerprint of the targets along with the interpreter, platforms and extra
+    requirements they are built for. So a warm run reuses the PEX it last built, without resolving
+    or freezing anything.
+
+    :param targets: The targets the PEX is built from.
+    :param string name: The file name of the PEX.
+    :param interpreter: The PythonInterpreter the PEX is built for.
+    :param build: A callable that builds the PEX at the path it is passed; it may build either a
+      PEX file or a frozen PEX chroot.
+    :param platforms: The platforms the PEX is built for, 'python-setup' platforms by default.
+    :param extra_requirements: PythonRequirements added to the PEX beyond those of its targets.
+    :returns: The path of the PEX.
+    """
+    platforms = get_platforms(platforms or
+                              self.context.config.getlist('python-setup', 'platforms', ['current']))
+    fingerprint_strategy = PexFingerprintStrategy(interpreter, platforms, extra_requirements)
+    with self.invalidated(targets,
+                          invalidate_dependents=True,
+                          fingerprint_strategy=fingerprint_strategy) as invalidation_check:
+      pex_vts = VersionedTargetSet.from_versioned_targets(invalidation_check.all_vts)
+      pex_path = os.path.join(self.workdir, pex_vts.cache_key.hash, name)
+      # The targets may all be valid yet never have been built into a PEX together, in which case
+      # the artifact cache was not checked for the set as a whole.
+      if (not os.path.exists(pex_path) and not invalidation_check.invalid_vts
+          and self.artifact_cache_reads_enabled()):
+        self.check_artifact_cache([pex_vts])
+      if not os.path.exists(pex_path):
+        self._build_pex(pex_path, build)
+        if self.artifact_cache_writes_enabled():
+          self.update_artifact_cache([(pex_vts, [pex_path])])
+    return pex_path
+
+  def check_artifact_cache_for(self, invalidation_check):
+    # Each PEX is cached as a single artifact for all the targets it was built from.
+    return [VersionedTargetSet.from_versioned_targets(invalidation_check.all_vts)]
+
+  def _build_pex(self, pex_path, build):
+    # Build alongside the PEX and move it into place, so an interrupted build is never mistaken
+    # for a valid one.
+    safe_mkdir(os.path.dirname(pex_path))
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(pex_path), prefix='tmp')
+    try:
+      path = os.path.join(tmpdir, os.path.basename(pex_path))
+      build(path)
+      os.rename(path, pex_path)
+    finally:
+      safe_rmtree(tmpdir)
+
 
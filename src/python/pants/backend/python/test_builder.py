@@ -87,7 +87,13 @@ class PythonTestBuilder(object):
     PythonRequirement('unittest2py3k', version_filter=lambda py, pl: py.startswith('3'))
   ]
 
-  def __init__(self, targets, args, interpreter=None, conn_timeout=None, fast=False):
+  def __init__(self, targets, args, interpreter=None, conn_timeout=None, fast=False,
+               pex_provider=None):
+    """
+    :param pex_provider: An optional callable that returns the path of a test PEX, given the
+      targets it is for, the requirements it adds to them and a callable that builds it at the path
+      it is passed. By default test PEXes are built afresh for every run.
+    """
     self.targets = targets
     self.args = args
     self.interpreter = interpreter or PythonInterpreter.get()
@@ -97,6 +103,7 @@ class PythonTestBuilder(object):
     # creating a chroot for each test target. However running each test separately is more
     # correct, as the isolation verifies that its dependencies are correctly declared.
     self._fast = fast
+    self._pex_provider = pex_provider
 
   def run(self, stdout=None, stderr=None):
     if self._fast:
@@ -167,17 +174,16 @@ class PythonTestBuilder(object):
     coverage_enabled = 'PANTS_PY_COVERAGE' in os.environ
 
     try:
-      builder = PEXBuilder(interpreter=self.interpreter)
-      builder.info.entry_point = 'pytest'
-      chroot = PythonChroot(
-          targets=targets,
-          extra_requirements=self._TESTING_TARGETS,
-          builder=builder,
-          platforms=('current',),
-          interpreter=self.interpreter,
-          conn_timeout=self._conn_timeout)
-      builder = chroot.dump()
-      builder.freeze()
+      # A PythonChroot deletes its builder's path when it is collected, so the chroots built here
+      # are held until the tests have run.
+      chroots = []
+      if self._pex_provider:
+        def build(path):
+          chroots.append(self._build_chroot(targets, path))
+        pex_path = self._pex_provider(targets, self._TESTING_TARGETS, build)
+      else:
+        chroots.append(self._build_chroot(targets))
+        pex_path = chroots[0].path()
       test_args = []
       test_args.extend(PythonTestBuilder.generate_junit_args(targets))
       test_args.extend(self.args)
@@ -186,7 +192,7 @@ class PythonTestBuilder(object):
         test_args.extend(args)
 
       sources = list(itertools.chain(*[t.sources_relative_to_buildroot() for t in targets]))
-      pex = PEX(builder.path(), interpreter=self.interpreter)
+      pex = PEX(pex_path, interpreter=self.interpreter)
       rc = pex.run(args=test_args + sources, blocking=True, setsid=True,
                    stdout=stdout, stderr=stderr)
       # TODO(wickman): If coverage is enabled, write an intermediate .html that points to
@@ -201,3 +207,21 @@ class PythonTestBuilder(object):
       if coverage_rc:
         os.unlink(coverage_rc)
     return rv
+
+  def _build_chroot(self, targets, path=None):
+    """Builds a frozen PEX chroot for running the given targets' tests and returns it.
+
+    The chroot's path is deleted along with the returned PythonChroot.
+    """
+    builder = PEXBuilder(path=path, interpreter=self.interpreter)
+    builder.info.entry_point = 'pytest'
+    chroot = PythonChroot(
+        targets=targets,
+        extra_requirements=self._TESTING_TARGETS,
+        builder=builder,
+        platforms=('current',),
+        interpreter=self.interpreter,
+        conn_timeout=self._conn_timeout)
+    chroot.dump()
+    builder.freeze()
+    return chroot
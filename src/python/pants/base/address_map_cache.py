@@ -0,0 +1,45 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from pants.base.persistent_pickle_store import PersistentPickleStore
+
+
+class AddressMapCache(PersistentPickleStore):
+  """A persistent cache of the serialized address maps parsed from BUILD files.
+
+  Entries are stored per BUILD file against a key computed by the BuildFileParser from the BUILD
+  file's content and the aliases it was parsed with; an entry is only returned while the key still
+  matches, so a stale entry costs a re-parse and never a wrong answer.  Holding a single entry per
+  BUILD file keeps the cache from growing as BUILD files are edited.
+  """
+
+  # Bump this if the on-disk format changes.
+  VERSION = 1
+
+  def contains(self, relpath, key):
+    """Returns True if there is an entry for the BUILD file at `relpath` under `key`."""
+    entry = self._load().get(relpath)
+    return entry is not None and entry[0] == key
+
+  def get(self, relpath, key):
+    """Returns the serialized address map stored for the BUILD file at `relpath` under `key`.
+
+    :returns: The serialized address map or None if there is no entry with a matching key or the
+      address map was recorded as uncacheable.
+    """
+    entry = self._load().get(relpath)
+    if entry is not None and entry[0] == key:
+      return entry[1]
+    return None
+
+  def put(self, relpath, key, payload):
+    """Stores the serialized address map `payload` for the BUILD file at `relpath` under `key`.
+
+    A `payload` of None records that the BUILD file's address map cannot be cached, so it need not
+    be tried again until the BUILD file changes.
+    """
+    self._put(relpath, (key, payload))
@@ -23,12 +23,38 @@ class BuildConfiguration(object):
   that can operate on the targets defined in them.
   """
 
-  ParseState = namedtuple('ParseState', ['registered_addressable_instances', 'parse_globals'])
+  ParseState = namedtuple('ParseState', ['registered_addressable_instances', 'parse_globals',
+                                         'impure_aliases'])
+
+  class _ImpureUseRecorder(object):
+    """Stands in for an impure exposed object, noting its alias whenever it is used."""
+
+    def __init__(self, alias, context_aware_object, impure_aliases):
+      self._alias = alias
+      self._context_aware_object = context_aware_object
+      self._impure_aliases = impure_aliases
+
+    def __call__(self, *args, **kwargs):
+      self._impure_aliases.add(self._alias)
+      return self._context_aware_object(*args, **kwargs)
+
+    def __getattr__(self, name):
+      self._impure_aliases.add(self._alias)
+      return getattr(self._context_aware_object, name)
+
+    def __reduce__(self):
+      # An addressable holding one must not be cached, so refuse to be pickled.
+      self._impure_aliases.add(self._alias)
+      raise TypeError('The {0} object of a BUILD file cannot be pickled.'.format(self._alias))
 
   @staticmethod
   def _is_target_type(obj):
     return inspect.isclass(obj) and issubclass(obj, Target)
 
+  @staticmethod
+  def _is_impure_callable(obj):
+    return callable(obj) and not inspect.isclass(obj) and not getattr(obj, 'pure', False)
+
   def __init__(self):
     self._target_aliases = {}
     self._addressable_alias_map = {}
@@ -76,6 +102,11 @@ class BuildConfiguration(object):
 
     The object must not be a target subclass.  Those should be registered via
     `register_target_alias`.
+
+    Functions and other callables that are not classes are assumed to read the filesystem, the
+    environment or the pants install when called, e.g. `pants_version`, so BUILD files calling
+    them are always re-parsed.  One that returns the same value for the same arguments may set a
+    `pure` attribute to True to allow the results of parsing BUILD files using it to be cached.
     """
     if self._is_target_type(obj):
       raise TypeError('The exposed object {0} is a Target - these should be registered '
@@ -108,6 +139,11 @@ class BuildConfiguration(object):
 
     Context aware object factories must be callables that take a single ParseContext argument
     and return some object that will be exposed in the BUILD file parse context under `alias`.
+
+    Objects are assumed to read the filesystem or have side effects when used, so BUILD files
+    using them are always re-parsed.  A factory whose objects do neither, beyond what is implied
+    by the BUILD file's path, may set a `pure` attribute to True to allow the results of parsing
+    BUILD files using it to be cached.
     """
     if self._is_target_type(context_aware_object_factory):
       raise TypeError('The exposed context aware object factory {factory} is a Target - these '
@@ -125,8 +161,17 @@ class BuildConfiguration(object):
                       .format(factory=context_aware_object_factory))
 
   def initialize_parse_state(self, build_file):
-    """Creates a fresh parse state for the given build file."""
-    type_aliases = self._exposed_objects.copy()
+    """Creates a fresh parse state for the given build file.
+
+    The parse state's `impure_aliases` collects the aliases of any callable exposed objects and
+    context aware objects used while parsing that are not marked `pure`.
+    """
+    impure_aliases = set()
+    type_aliases = {}
+    for alias, obj in self._exposed_objects.items():
+      if self._is_impure_callable(obj):
+        obj = self._ImpureUseRecorder(alias, obj, impure_aliases)
+      type_aliases[alias] = obj
 
     registered_addressable_instances = []
     def registration_callback(address, addressable):
@@ -147,6 +192,9 @@ class BuildConfiguration(object):
     parse_globals['__file__'] = build_file.full_path
 
     for alias, object_factory in self._exposed_context_aware_object_factories.items():
-      parse_globals[alias] = object_factory(parse_context)
+      context_aware_object = object_factory(parse_context)
+      if not getattr(object_factory, 'pure', False):
+        context_aware_object = self._ImpureUseRecorder(alias, context_aware_object, impure_aliases)
+      parse_globals[alias] = context_aware_object
 
-    return self.ParseState(registered_addressable_instances, parse_globals)
+    return self.ParseState(registered_addressable_instances, parse_globals, impure_aliases)
@@ -7,13 +7,14 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 
 from glob import glob1
 import logging
-import marshal
 import os
 import re
 
-from pex.interpreter import PythonIdentity
 from twitter.common.collections import OrderedSet
 
+from pants.base.build_file_index import BuildFileIndex, get_build_file_index
+from pants.base.bytecode_cache import get_bytecode_cache
+
 
 logger = logging.getLogger(__name__)
 
@@ -66,13 +67,14 @@ class BuildFile(object):
 
   @staticmethod
   def scan_buildfiles(root_dir, base_path=None):
-    """Looks for all BUILD files under base_path"""
-    buildfiles = []
-    for root, dirs, files in os.walk(os.path.join(root_dir, base_path or '')):
-      for filename in files:
-        if BuildFile._is_buildfile_name(filename):
-          buildfile_relpath = os.path.relpath(os.path.join(root, filename), root_dir)
-          buildfiles.append(BuildFile.from_cache(root_dir, buildfile_relpath))
+    """Looks for all BUILD files under base_path.
+
+    The scan goes through the registered BuildFileIndex, if there is one, and otherwise prunes just
+    the default ignored directories.
+    """
+    index = get_build_file_index() or BuildFileIndex()
+    buildfiles = [BuildFile.from_cache(root_dir, relpath)
+                  for relpath in index.scan(root_dir, BuildFile._is_buildfile_name, base_path)]
     return OrderedSet(sorted(buildfiles, key=lambda buildfile: buildfile.full_path))
 
   def __init__(self, root_dir, relpath=None, must_exist=True):
@@ -129,10 +131,6 @@ class BuildFile(object):
     self.name = os.path.basename(self.full_path)
     self.parent_path = os.path.dirname(self.full_path)
 
-    self._bytecode_path = os.path.join(self.parent_path,
-                                       '.{name}.{ident}.pyc'.format(name=self.name,
-                                                                    ident=PythonIdentity.get()))
-
     self.relpath = os.path.relpath(self.full_path, self.root_dir)
     self.spec_path = os.path.dirname(self.relpath)
 
@@ -195,22 +193,16 @@ class BuildFile(object):
       yield sibling
 
   def code(self):
-    """Returns the code object for this BUILD file."""
-    if (os.path.exists(self._bytecode_path) and
-        os.path.getmtime(self.full_path) <= os.path.getmtime(self._bytecode_path)):
-      with open(self._bytecode_path, 'rb') as bytecode:
-        try:
-          return marshal.load(bytecode)
-        except Exception as e:
-          logger.warn('Failed to marshall BUILD file bytecode at {_bytecode_path}.'
-                      ' Exception was: {e}'
-                      .format(_bytecode_path=self._bytecode_path, e=e))
+    """Returns the code object for this BUILD file.
 
+    Compilation goes through the registered BytecodeCache, if there is one.
+    """
     with open(self.full_path, 'rb') as source:
-      code = compile(source.read(), '<string>', 'exec', flags=0, dont_inherit=True)
-      with open(self._bytecode_path, 'wb') as bytecode:
-        marshal.dump(code, bytecode)
-      return code
+      source = source.read()
+    bytecode_cache = get_bytecode_cache()
+    if bytecode_cache:
+      return bytecode_cache.compile(source)
+    return compile(source, '<string>', 'exec', flags=0, dont_inherit=True)
 
   def __eq__(self, other):
     result = other and (
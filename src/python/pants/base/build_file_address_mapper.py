@@ -141,6 +141,16 @@ class BuildFileAddressMapper(object):
       self._spec_path_to_address_map_map[spec_path] = address_map
     return self._spec_path_to_address_map_map[spec_path]
 
+  def prefetch(self, build_files):
+    """Prepares for looking up addresses in many BUILD files at once.
+
+    Parses any of `build_files` not yet parsed in parallel where the BuildFileParser supports it.
+    Errors are raised when addresses are looked up, as usual.
+
+    :param build_files: The BuildFiles whose addresses are about to be looked up.
+    """
+    self._build_file_parser.prefetch(build_files)
+
   def addresses_in_spec_path(self, spec_path):
     """Returns only the addresses gathered by `address_map_from_spec_path`, with no values."""
     return self.address_map_from_spec_path(spec_path).keys()
@@ -175,7 +185,9 @@ class BuildFileAddressMapper(object):
     addresses = set()
     root = root or get_buildroot()
     try:
-      for build_file in BuildFile.scan_buildfiles(root):
+      build_files = BuildFile.scan_buildfiles(root)
+      self.prefetch(build_files)
+      for build_file in build_files:
         for address in self.addresses_in_spec_path(build_file.spec_path):
           addresses.add(address)
     except BuildFile.BuildFileError as e:
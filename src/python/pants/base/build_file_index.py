@@ -0,0 +1,131 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from fnmatch import fnmatch
+import os
+import time
+
+from pants.base.persistent_pickle_store import PersistentPickleStore
+
+
+class BuildFileIndex(PersistentPickleStore):
+  """An index of the directories holding BUILD files, persisted across runs.
+
+  For every directory scanned the index records the names of its subdirectories and of the BUILD
+  files it holds, keyed by the directory's stat.  A later scan stats each directory and re-lists
+  only those whose stat changed, so scanning an unchanged tree costs a stat per directory rather
+  than a listing of every file in it.
+
+  Directories matching one of the ignore patterns are never descended into.  A pattern containing
+  a '/' is matched against a directory's path relative to the root of the scan, any other pattern
+  against its name alone; so 'dist' prunes every directory named dist and '3rdparty/node' just the
+  one.  The directory a scan starts from is never pruned.
+  """
+
+  # Bump this if the on-disk format changes.
+  VERSION = 1
+
+  DEFAULT_IGNORE_PATTERNS = ('.git', '.hg', '.svn', '.pants.d', 'dist', 'node_modules')
+
+  # Directories modified this recently (in seconds) are not recorded.  A directory listed in the
+  # same mtime tick as it was modified could change again without its stat changing.
+  RACY_WINDOW_SECS = 2
+
+  def __init__(self, path=None, ignore_patterns=DEFAULT_IGNORE_PATTERNS, clock=time):
+    """
+    :param path: The file to persist the index to or None for an index that lives only in memory.
+    :param ignore_patterns: Glob patterns for the directories scans should not descend into.
+    :param clock: The source of the current time; exposed for tests.
+    """
+    super(BuildFileIndex, self).__init__(path)
+    self._ignore_patterns = tuple(ignore_patterns or ())
+    self._clock = clock
+
+  @property
+  def ignore_patterns(self):
+    return self._ignore_patterns
+
+  def is_ignored(self, relpath):
+    """Returns True if the directory at `relpath`, relative to the root of a scan, is pruned."""
+    name = os.path.basename(relpath)
+    for pattern in self._ignore_patterns:
+      if fnmatch(relpath if '/' in pattern else name, pattern):
+        return True
+    return False
+
+  def scan(self, root_dir, is_build_file, base_path=None):
+    """Returns the paths, relative to `root_dir`, of all the BUILD files under `base_path`.
+
+    Like `os.walk`, symlinked directories are not descended into and unreadable directories are
+    skipped.
+
+    :param string root_dir: The root of the scan; ignore patterns are matched relative to it.
+    :param is_build_file: A predicate selecting BUILD files by name.
+    :param string base_path: The directory to scan, relative to `root_dir`, or the whole root.
+    :returns: The relative paths of the BUILD files found, in no particular order.
+    """
+    entries = self._load()
+    buildfiles = []
+    start = os.path.normpath(os.path.join(root_dir, base_path or ''))
+    stack = [(start, os.path.relpath(start, root_dir))]
+    while stack:
+      path, relpath = stack.pop()
+      listing = self._list(entries, path, is_build_file)
+      if listing is None:
+        continue
+      subdirs, names = listing
+      for name in names:
+        buildfiles.append(os.path.normpath(os.path.join(relpath, name)))
+      for subdir in subdirs:
+        subdir_relpath = os.path.normpath(os.path.join(relpath, subdir))
+        if not self.is_ignored(subdir_relpath):
+          stack.append((os.path.join(path, subdir), subdir_relpath))
+    return buildfiles
+
+  def _list(self, entries, path, is_build_file):
+    try:
+      stat = os.stat(path)
+    except OSError:
+      return None
+    key = (int(stat.st_mtime * 1000000000), stat.st_ino)
+    entry = entries.get(path)
+    if entry is not None and entry[0] == key:
+      return entry[1]
+
+    try:
+      names = os.listdir(path)
+    except OSError:
+      return None
+    subdirs = []
+    buildfiles = []
+    for name in names:
+      child = os.path.join(path, name)
+      if os.path.isdir(child):
+        if not os.path.islink(child):
+          subdirs.append(name)
+      elif is_build_file(name):
+        buildfiles.append(name)
+    listing = (tuple(subdirs), tuple(buildfiles))
+    if self._clock.time() - stat.st_mtime > self.RACY_WINDOW_SECS:
+      self._put(path, (key, listing))
+    return listing
+
+
+_BUILD_FILE_INDEX = None
+
+
+def get_build_file_index():
+  """Returns the BuildFileIndex BUILD file scans go through, if any."""
+  return _BUILD_FILE_INDEX
+
+
+def set_build_file_index(index):
+  """Sets the BuildFileIndex BUILD file scans go through; None scans with the default ignores."""
+  if index is not None and not isinstance(index, BuildFileIndex):
+    raise ValueError('The index must be an instance of BuildFileIndex, given %s' % index)
+  global _BUILD_FILE_INDEX
+  _BUILD_FILE_INDEX = index
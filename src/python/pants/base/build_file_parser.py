@@ -5,10 +5,22 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+import dis
+import hashlib
 import logging
+import multiprocessing
+import types
+
+try:
+  import cPickle as pickle
+except ImportError:
+  import pickle
 
 from twitter.common.lang import Compatibility
 
+from pants.base.address import BuildFileAddress
+from pants.base.address_map_cache import AddressMapCache
+from pants.base.build_environment import pants_version
 from pants.base.build_file import BuildFile
 
 
@@ -52,10 +64,61 @@ class BuildFileParser(object):
   class ExecuteError(BuildFileParserError):
     """An exception was encountered executing code in the BUILD file"""
 
-  def __init__(self, build_configuration, root_dir, run_tracker=None):
+  # Bump this if the way address maps are serialized for caching changes.
+  CACHE_VERSION = 1
+
+  # The fewest BUILD files worth sending to a process of the prefetch pool to parse.
+  PREFETCH_BATCH_SIZE = 32
+
+  # Names which, if referenced by a BUILD file's code, suggest it may do i/o or otherwise depend on
+  # more than its own content; the address maps of such BUILD files are never cached.
+  _UNCACHEABLE_NAMES = frozenset(['__import__', 'compile', 'eval', 'execfile', 'file', 'globals',
+                                  'input', 'locals', 'open', 'raw_input', 'reload', 'vars'])
+
+  _UNCACHEABLE_OPCODES = frozenset(dis.opmap[name] for name in ('IMPORT_NAME', 'EXEC_STMT')
+                                   if name in dis.opmap)
+
+  @classmethod
+  def create_prefetch_pool(cls, build_configuration, root_dir, processes):
+    """Returns a pool of processes for `prefetch` to parse BUILD files in.
+
+    The processes are forked as the pool is created, so create it before the run starts any
+    threads: a process forked while another thread holds a lock inherits the lock held forever.
+
+    :param BuildConfiguration build_configuration: The aliases BUILD files are parsed with.
+    :param string root_dir: The root directory of the repo.
+    :param int processes: The number of processes to parse BUILD files with.
+    """
+    return multiprocessing.Pool(processes,
+                                initializer=_init_worker,
+                                initargs=(build_configuration, root_dir))
+
+  def __init__(self, build_configuration, root_dir, run_tracker=None, address_map_cache=None,
+               prefetch_pool=None):
+    """
+    :param BuildConfiguration build_configuration: The aliases BUILD files are parsed with.
+    :param string root_dir: The root directory of the repo.
+    :param RunTracker run_tracker: The run tracker for this run, if any.
+    :param AddressMapCache address_map_cache: A cache of parsed address maps to consult before
+      executing BUILD files, if any.
+    :param prefetch_pool: A pool from `create_prefetch_pool` for `prefetch` to parse BUILD files in,
+      if any.
+    """
     self._build_configuration = build_configuration
     self._root_dir = root_dir
     self.run_tracker = run_tracker
+    if address_map_cache is None and prefetch_pool is not None:
+      # Results parsed in parallel need somewhere to go until they are asked for.
+      address_map_cache = AddressMapCache()
+    self._address_map_cache = address_map_cache
+    self._prefetch_pool = prefetch_pool
+    self._aliases_fingerprint = None
+    self._alias_by_addressable_type = None
+
+  def save_cache(self):
+    """Persists any address maps parsed into the address map cache."""
+    if self._address_map_cache:
+      self._address_map_cache.save()
 
   def registered_aliases(self):
     """Returns a copy of the registered build file aliases this build file parser uses."""
@@ -101,10 +164,146 @@ class BuildFileParser(object):
       family_address_map_by_build_file[bf] = bf_address_map
     return family_address_map_by_build_file
 
+  def prefetch(self, build_files):
+    """Parses any of `build_files` whose address maps are not cached, in parallel if configured.
+
+    This only warms the address map cache, so errors are left to be raised when the BUILD file is
+    parsed with `parse_build_file`.
+
+    :param build_files: The BuildFiles that are about to be parsed.
+    """
+    if not self._address_map_cache or self._prefetch_pool is None:
+      return
+
+    misses = []
+    for build_file in build_files:
+      try:
+        key = self._cache_key(build_file)
+      except (IOError, OSError):
+        continue
+      if not self._address_map_cache.contains(build_file.relpath, key):
+        misses.append((build_file, key))
+    if len(misses) < 2 * self.PREFETCH_BATCH_SIZE:
+      return
+
+    payloads = self._prefetch_pool.map(_parse_in_worker,
+                                       [build_file.relpath for build_file, _ in misses],
+                                       chunksize=self.PREFETCH_BATCH_SIZE)
+    for (build_file, key), payload in zip(misses, payloads):
+      # Leave failed and uncacheable BUILD files to be parsed here, where errors can be reported
+      # and side effects take hold.
+      if payload is not None:
+        self._address_map_cache.put(build_file.relpath, key, payload)
+
   def parse_build_file(self, build_file):
     """Capture Addressable instances from parsing `build_file`.
     Prepare a context for parsing, read a BUILD file from the filesystem, and return the
     Addressable instances generated by executing the code.
+
+    If the BUILD file's address map is cached, it is returned without executing the code.
+    """
+    if self._address_map_cache:
+      key = self._cache_key(build_file)
+      payload = self._address_map_cache.get(build_file.relpath, key)
+      if payload is not None:
+        address_map = self._deserialize(build_file, payload)
+        if address_map is not None:
+          return address_map
+
+    address_map, payload = self._parse_build_file(build_file)
+    if self._address_map_cache:
+      self._address_map_cache.put(build_file.relpath, key, payload)
+    return address_map
+
+  def _cache_key(self, build_file):
+    if self._aliases_fingerprint is None:
+      self._aliases_fingerprint = self._fingerprint_aliases()
+    sha = hashlib.sha1(self._aliases_fingerprint)
+    sha.update(build_file.root_dir.encode('utf-8'))
+    sha.update(b'\0')
+    sha.update(build_file.relpath.encode('utf-8'))
+    sha.update(b'\0')
+    with open(build_file.full_path, 'rb') as source:
+      sha.update(source.read())
+    return sha.hexdigest()
+
+  def _fingerprint_aliases(self):
+    def type_name(obj):
+      return '{0}.{1}'.format(getattr(obj, '__module__', ''),
+                              getattr(obj, '__name__', type(obj).__name__))
+
+    aliases = self.registered_aliases()
+    sha = hashlib.sha1(str(self.CACHE_VERSION))
+    # Objects of the aliases may change along with pants without their names or types changing.
+    sha.update(pants_version().encode('utf-8'))
+    for kind, entries in (('targets', aliases.targets),
+                          ('objects', aliases.objects),
+                          ('context_aware_object_factories',
+                           aliases.context_aware_object_factories)):
+      for alias, obj in sorted(entries.items()):
+        sha.update('{0}:{1}={2}\n'.format(kind, alias, type_name(obj)).encode('utf-8'))
+    # Target addressable types are generated per target type, so are covered by the targets above.
+    for alias, addressable_type in sorted(aliases.addressables.items()):
+      if alias not in aliases.targets:
+        sha.update('addressables:{0}={1}\n'.format(alias, type_name(addressable_type))
+                   .encode('utf-8'))
+    return sha.digest()
+
+  def _serialize(self, address_map):
+    """Returns the address map serialized for caching or None if it cannot be."""
+    if self._alias_by_addressable_type is None:
+      self._alias_by_addressable_type = dict(
+          (addressable_type, alias)
+          for alias, addressable_type in self.registered_aliases().addressables.items())
+
+    entries = []
+    for address, addressable in address_map.items():
+      alias = self._alias_by_addressable_type.get(type(addressable))
+      if alias is None or not hasattr(addressable, '__dict__'):
+        return None
+      entries.append((address.target_name, alias, addressable.__dict__))
+    try:
+      return pickle.dumps(entries, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+      # Address maps holding closures and the like cannot be cached.
+      return None
+
+  def _deserialize(self, build_file, payload):
+    """Returns the address map serialized in `payload` or None if it cannot be restored."""
+    addressables = self.registered_aliases().addressables
+    try:
+      entries = pickle.loads(payload)
+    except Exception:
+      return None
+    address_map = {}
+    for target_name, alias, state in entries:
+      addressable_type = addressables.get(alias)
+      if addressable_type is None:
+        return None
+      addressable = addressable_type.__new__(addressable_type)
+      addressable.__dict__.update(state)
+      address_map[BuildFileAddress(build_file, target_name)] = addressable
+    return address_map
+
+  @classmethod
+  def _is_cacheable_code(cls, code):
+    """Returns False if `code` looks like it may do i/o, import or execute other code."""
+    if cls._UNCACHEABLE_NAMES.intersection(code.co_names):
+      return False
+    bytecode = code.co_code
+    i = 0
+    while i < len(bytecode):
+      opcode = ord(bytecode[i])
+      if opcode in cls._UNCACHEABLE_OPCODES:
+        return False
+      i += 3 if opcode >= dis.HAVE_ARGUMENT else 1
+    return all(cls._is_cacheable_code(const) for const in code.co_consts
+               if isinstance(const, types.CodeType))
+
+  def _parse_build_file(self, build_file):
+    """Executes `build_file`, returning its address map and the map serialized for caching.
+
+    The serialized address map is None if the BUILD file's results cannot safely be cached.
     """
 
     def _format_context_msg(lineno, offset, error_type, message):
@@ -142,6 +341,7 @@ class BuildFileParser(object):
                                       message=e, build_file=build_file))
 
     parse_state = self._build_configuration.initialize_parse_state(build_file)
+    cacheable = self._address_map_cache is not None and self._is_cacheable_code(build_file_code)
     try:
       Compatibility.exec_function(build_file_code, parse_state.parse_globals)
     except Exception as e:
@@ -166,4 +366,30 @@ class BuildFileParser(object):
       logger.debug("  * {address}: {addressable}"
                    .format(address=address,
                            addressable=addressable))
-    return address_map
+
+    if cacheable and not parse_state.impure_aliases:
+      return address_map, self._serialize(address_map)
+    return address_map, None
+
+
+# The parser of a prefetch pool process.
+_WORKER_PARSER = None
+
+
+def _init_worker(build_configuration, root_dir):
+  global _WORKER_PARSER
+  # The address maps parsed are only serialized for BUILD files that are safe to cache.
+  _WORKER_PARSER = BuildFileParser(build_configuration, root_dir,
+                                   address_map_cache=AddressMapCache())
+
+
+def _parse_in_worker(relpath):
+  """Parses the BUILD file at `relpath` and returns its serialized address map, if cacheable."""
+  parser = _WORKER_PARSER
+  try:
+    build_file = BuildFile.from_cache(parser._root_dir, relpath)
+    _, payload = parser._parse_build_file(build_file)
+    return payload
+  except Exception:
+    # The parent reports the error when it parses the BUILD file itself.
+    return None
@@ -37,6 +37,24 @@ class BuildGraph(object):
     self._target_dependencies_by_address = defaultdict(OrderedSet)
     self._target_dependees_by_address = defaultdict(set)
     self._derived_from_by_derivative_address = {}
+    self._ordered_closure_by_roots = {}
+    # A topological order of the graph maintained as targets and dependencies are injected: every
+    # target's index is greater than the indexes of all of its dependencies.
+    self._topological_index_by_address = {}
+    self._next_topological_index = 0
+    # Dependencies that close a cycle are kept out of the topological order; maps each such
+    # (dependent, dependency) edge to the addresses of the cycle it closes.
+    self._cycles_by_dependency = {}
+    # Each target gets a dense ordinal, in injection order, which indexes it in reachability bitsets.
+    self._ordinal_by_address = {}
+    # Memoized bitsets over ordinals of the closures of addresses.  These are always memoized for
+    # the whole closure of an address at once, so when an address has none memoized neither does
+    # any address depending on it.  They are kept up to date as dependencies are injected.
+    self._reachable_by_address = {}
+    # Memoized closures of addresses, each in DFS inorder traversal order.  An address only has its
+    # closure memoized along with its reachability.  Injecting a dependency can re-order a closure,
+    # so these are forgotten instead.
+    self._closure_by_address = {}
 
   def contains_address(self, address):
     return address in self._target_by_address
@@ -123,6 +141,17 @@ class BuildGraph(object):
       self._derived_from_by_derivative_address[target.address] = derived_from.address
 
     self._target_by_address[address] = target
+    self._topological_index_by_address[address] = self._next_topological_index
+    self._next_topological_index += 1
+    self._ordered_closure_by_roots.clear()
+    self._ordinal_by_address[address] = len(self._ordinal_by_address)
+
+    # Dependencies on this target may have been injected before it was; order it below them now.
+    # The target has no dependencies of its own yet so this can never close a cycle.
+    if address in self._target_dependees_by_address:
+      for dependent in list(self._target_dependees_by_address[address]):
+        self._order_dependency(dependent=dependent, dependency=address)
+        self._extend_closures(dependent=dependent, dependency=address)
 
     for dependency_address in dependencies:
       self.inject_dependency(dependent=address, dependency=dependency_address)
@@ -142,27 +171,120 @@ class BuildGraph(object):
                        ' dependent is not in the BuildGraph.'
                        .format(dependent=dependent, dependency=dependency))
 
-    # TODO(pl): Unfortunately this is an unhelpful time to error due to a cycle.  Instead, we warn
-    # and allow the cycle to appear.  It is the caller's responsibility to call sort_targets on the
-    # entire graph to generate a friendlier CycleException that actually prints the cycle.
-    # Alternatively, we could call sort_targets after every inject_dependency/inject_target, but
-    # that could have nasty performance implications.  Alternative 2 would be to have an internal
-    # data structure of the topologically sorted graph which would have acceptable amortized
-    # performance for inserting new nodes, and also cycle detection on each insert.
+    # Cycles are detected here as the topological order is maintained, but it is not an error to
+    # inject one: some targets, docs pages for example, legitimately refer to each other.  Instead
+    # we warn, and it is an error to ask for an ordering of a subgraph containing the cycle.
 
     if dependency not in self._target_by_address:
       logger.warning('Injecting dependency from {dependent} on {dependency}, but the dependency'
                      ' is not in the BuildGraph.  This probably indicates a dependency cycle, but'
-                     ' it is not an error until sort_targets is called on a subgraph containing'
-                     ' the cycle.'
+                     ' it is not an error until an ordering of a subgraph containing the cycle'
+                     ' is requested.'
                      .format(dependent=dependent, dependency=dependency))
 
     if dependency in self.dependencies_of(dependent):
       logger.warn('{dependent} already depends on {dependency}'
                   .format(dependent=dependent, dependency=dependency))
     else:
+      if dependency in self._target_by_address:
+        cycle = self._order_dependency(dependent=dependent, dependency=dependency)
+        if cycle:
+          logger.warning('Injecting dependency from {dependent} on {dependency} introduces a'
+                         ' dependency cycle:\n\t{cycle}'
+                         .format(dependent=dependent, dependency=dependency,
+                                 cycle=' ->\n\t'.join(address.spec for address in cycle)))
+          self._cycles_by_dependency[(dependent, dependency)] = cycle
       self._target_dependencies_by_address[dependent].add(dependency)
       self._target_dependees_by_address[dependency].add(dependent)
+      self._ordered_closure_by_roots.clear()
+      self._extend_closures(dependent=dependent, dependency=dependency)
+
+  def _extend_closures(self, dependent, dependency):
+    """Accounts for a new edge from `dependent` onto `dependency` in the memoized closures."""
+    reachable_by_address = self._reachable_by_address
+    if self._cycles_by_dependency:
+      reachable_by_address.clear()
+      self._closure_by_address.clear()
+      return
+
+    # Nothing depending on an address without a memoized closure has one either.
+    if dependent not in reachable_by_address or dependency not in self._ordinal_by_address:
+      return
+
+    dependent_bit = 1 << self._ordinal_by_address[dependent]
+    for address in [address for address in self._closure_by_address
+                    if reachable_by_address[address] & dependent_bit]:
+      del self._closure_by_address[address]
+
+    # Once an address already reaches everything newly reachable, so does everything depending on
+    # it.
+    added = self._reachable(dependency)
+    stack = [dependent]
+    while stack:
+      address = stack.pop()
+      reachable = reachable_by_address.get(address)
+      if reachable is not None and reachable | added != reachable:
+        reachable_by_address[address] = reachable | added
+        stack.extend(self._target_dependees_by_address.get(address, ()))
+
+  def _order_dependency(self, dependent, dependency):
+    """Updates the topological order to account for an edge from `dependent` onto `dependency`.
+
+    This is the Pearce-Kelly dynamic topological sort: only the targets whose indexes lie between
+    the two endpoints and that are connected to them need to be visited, and those are re-ordered
+    amongst their own indexes.  A cycle exists exactly when `dependency` already transitively
+    depends on `dependent`, which the forward search discovers.
+
+    :returns: The addresses forming the cycle the edge closes, in which case the order is left
+      untouched, or else None.
+    """
+    index = self._topological_index_by_address
+    lower_bound = index[dependent]
+    upper_bound = index[dependency]
+    if upper_bound < lower_bound:
+      return None
+    cyclic = self._cycles_by_dependency
+
+    # Find the dependees of `dependent` that sit at or below `dependency` in the order; these must
+    # all move above it.
+    dependees = self._target_dependees_by_address
+    came_from = {dependent: None}
+    stack = [dependent]
+    while stack:
+      address = stack.pop()
+      if address == dependency:
+        path = [address]
+        while came_from[address] is not None:
+          address = came_from[address]
+          path.append(address)
+        return [dependent] + path
+      for dependee in dependees.get(address, ()):
+        if (dependee not in came_from and index[dependee] <= upper_bound
+            and (dependee, address) not in cyclic):
+          came_from[dependee] = address
+          stack.append(dependee)
+    forward = list(came_from)
+
+    # Find the dependencies of `dependency` that sit at or above `dependent` in the order; these
+    # must all move below it.
+    dependencies = self._target_dependencies_by_address
+    seen = set([dependency])
+    stack = [dependency]
+    while stack:
+      address = stack.pop()
+      for dep in dependencies.get(address, ()):
+        if (dep not in seen and dep in index and index[dep] >= lower_bound
+            and (address, dep) not in cyclic):
+          seen.add(dep)
+          stack.append(dep)
+    backward = list(seen)
+
+    forward.sort(key=index.__getitem__)
+    backward.sort(key=index.__getitem__)
+    reordered = backward + forward
+    for address, position in zip(reordered, sorted(index[a] for a in reordered)):
+      index[address] = position
+    return None
 
   def targets(self, predicate=None):
     """Returns all the targets in the graph in no particular order.
@@ -175,7 +297,50 @@ class BuildGraph(object):
 
   def sorted_targets(self):
     """:return: targets ordered from most dependent to least."""
-    return sort_targets(self._target_by_address.values())
+    return self.ordered_subset(self._target_by_address.values())[::-1]
+
+  def ordered_closure(self, targets):
+    """Returns the transitive closure of `targets`, ordered from least dependent to most.
+
+    The order is read from the topological order the graph maintains as it is built.  Orderings
+    are cached per set of roots until the graph is next mutated.
+
+    :param targets: The Targets to close over.
+    :raises: CycleException if the closure contains a dependency cycle.
+    """
+    roots = [target.address for target in targets]
+    key = frozenset(roots)
+    ordered = self._ordered_closure_by_roots.get(key)
+    if ordered is None:
+      closure = set(roots)
+      stack = list(closure)
+      while stack:
+        for dependency in self._target_dependencies_by_address.get(stack.pop(), ()):
+          if dependency not in closure:
+            closure.add(dependency)
+            stack.append(dependency)
+      for (dependent, _), cycle in self._cycles_by_dependency.items():
+        if dependent in closure:
+          raise CycleException([self._target_by_address[address] for address in cycle])
+      ordered = tuple(self._target_by_address[address]
+                      for address in self._topologically_ordered(closure))
+      self._ordered_closure_by_roots[key] = ordered
+    return list(ordered)
+
+  def ordered_subset(self, targets):
+    """Returns just `targets`, ordered from least dependent to most.
+
+    :param targets: The Targets to order.
+    :raises: CycleException if the closure of `targets` contains a dependency cycle.
+    """
+    if self._cycles_by_dependency:
+      # Only the closure knows whether a cycle is involved; this is the uncommon, failing case.
+      self.ordered_closure(targets)
+    return sorted(targets, key=lambda target: self._topological_index_by_address[target.address])
+
+  def _topologically_ordered(self, addresses):
+    """Returns `addresses` ordered from least dependent to most."""
+    return sorted(addresses, key=self._topological_index_by_address.__getitem__)
 
   def walk_transitive_dependency_graph(self, addresses, work, predicate=None):
     """Given a work function, walks the transitive dependency closure of `addresses`.
@@ -239,14 +404,86 @@ class BuildGraph(object):
     hence it trims graphs rather than just filtering out Targets that do not match the predicate.
     See `walk_transitive_dependencies_graph for more detail on `predicate`.
 
+    Without a predicate the closure of each address is memoized until a dependency is injected
+    into it, so repeated calls are cheap.
+
     :param list<Address> addresses: The root addresses to transitively close over.
     :param function predicate: The predicate passed through to
       `walk_transitive_dependencies_graph`.
     """
     ret = OrderedSet()
-    self.walk_transitive_dependency_graph(addresses, ret.add, predicate=predicate)
+    if predicate:
+      self.walk_transitive_dependency_graph(addresses, ret.add, predicate=predicate)
+    else:
+      # The closure of each address is either already walked in full or else walked in the same
+      # order as a walk of all the addresses would, so concatenating them preserves that order.
+      for address in addresses:
+        ret.update(self._closure(address))
     return ret
 
+  def depends_on(self, dependent, dependency):
+    """Returns True if the Target at `dependency` is in the closure of the Target at `dependent`.
+
+    This is a lookup in a reachability index memoized alongside closures.
+
+    :param Address dependent: The address whose closure to look in.
+    :param Address dependency: The address to look for.
+    """
+    ordinal = self._ordinal_by_address.get(dependency)
+    return ordinal is not None and bool(self._reachable(dependent) >> ordinal & 1)
+
+  def _closure(self, address):
+    """Returns the closure of `address` as a tuple of Targets in DFS inorder traversal order."""
+    closure = self._closure_by_address.get(address)
+    if closure is None:
+      targets = []
+      self.walk_transitive_dependency_graph([address], targets.append)
+      closure = tuple(targets)
+      if not self._cycles_by_dependency:
+        self._reachable(address)
+        self._closure_by_address[address] = closure
+    return closure
+
+  def _reachable(self, address):
+    """Returns a bitset over target ordinals of the closure of `address`.
+
+    Bitsets are memoized for every address in the closure, each built from those of its
+    dependencies.  Graphs with cycles, which are an error to order anyway, aren't memoized.
+    """
+    reachable_by_address = self._reachable_by_address
+    reachable = reachable_by_address.get(address)
+    if reachable is not None:
+      return reachable
+
+    ordinals = self._ordinal_by_address
+    if self._cycles_by_dependency:
+      reachable = 0
+      for target in self._closure(address):
+        reachable |= 1 << ordinals[target.address]
+      return reachable
+
+    dependencies_by_address = self._target_dependencies_by_address
+    stack = [address]
+    while stack:
+      node = stack[-1]
+      if node in reachable_by_address:
+        stack.pop()
+        continue
+      # Dependencies that have not been injected yet can't be reached.
+      dependencies = [dependency for dependency in dependencies_by_address.get(node, ())
+                      if dependency in ordinals]
+      pending = [dependency for dependency in dependencies
+                 if dependency not in reachable_by_address]
+      if pending:
+        stack.extend(pending)
+      else:
+        reachable = 1 << ordinals[node]
+        for dependency in dependencies:
+          reachable |= reachable_by_address[dependency]
+        reachable_by_address[node] = reachable
+        stack.pop()
+    return reachable_by_address[address]
+
   def inject_synthetic_target(self,
                               address,
                               target_type,
@@ -369,44 +606,62 @@ class CycleException(Exception):
     ))
 
 
-def sort_targets(targets):
-  """:return: the targets that targets depend on sorted from most dependent to least."""
-  roots = OrderedSet()
-  inverted_deps = defaultdict(OrderedSet)  # target -> dependent targets
-  visited = set()
-  path = OrderedSet()
-
-  def invert(target):
-    if target in path:
-      path_list = list(path)
-      cycle_head = path_list.index(target)
-      cycle = path_list[cycle_head:] + [target]
-      raise CycleException(cycle)
-    path.add(target)
-    if target not in visited:
-      visited.add(target)
-      for dependency in target.dependencies:
-        inverted_deps[dependency].add(target)
-        invert(dependency)
-      else:
-        roots.add(target)
-    path.remove(target)
+def _dependencies_first(roots, dependencies_of, as_target=lambda node: node):
+  """Returns the closure of `roots` in depth first post-order, so every node follows its deps.
 
-  for target in targets:
-    invert(target)
+  The walk uses an explicit stack rather than recursion, so is not limited by the depth of the
+  graph.
 
+  :param roots: The nodes to close over.
+  :param dependencies_of: A function returning the direct dependencies of a node.
+  :param as_target: A function mapping a node to its Target, used to report cycles.
+  :raises: CycleException if a cycle is reachable from `roots`.
+  """
   ordered = []
-  visited.clear()
+  done = set()
+  for root in roots:
+    if root in done:
+      continue
+    # Each stack entry is a node and an iterator over its unvisited dependencies; the nodes on the
+    # stack form the current path.
+    stack = [(root, iter(dependencies_of(root)))]
+    on_path = set([root])
+    while stack:
+      node, dependencies = stack[-1]
+      for dependency in dependencies:
+        if dependency in on_path:
+          path = [entry[0] for entry in stack]
+          cycle = path[path.index(dependency):] + [dependency]
+          raise CycleException([as_target(n) for n in cycle])
+        if dependency not in done:
+          stack.append((dependency, iter(dependencies_of(dependency))))
+          on_path.add(dependency)
+          break
+      else:
+        stack.pop()
+        on_path.discard(node)
+        done.add(node)
+        ordered.append(node)
+  return ordered
 
-  def topological_sort(target):
-    if target not in visited:
-      visited.add(target)
-      if target in inverted_deps:
-        for dep in inverted_deps[target]:
-          topological_sort(dep)
-      ordered.append(target)
 
-  for root in roots:
-    topological_sort(root)
+def _sort(roots, dependencies_of, as_target=lambda node: node):
+  """Returns the closure of `roots` sorted from most dependent to least.
 
-  return ordered
+  Dependents are discovered by walking dependencies from `roots` and the resulting inverted graph is
+  then walked from its leaves, which fixes the relative order of unrelated nodes.
+  """
+  dependents = defaultdict(OrderedSet)
+
+  def record_dependents(node):
+    for dependency in dependencies_of(node):
+      dependents[dependency].add(node)
+      yield dependency
+
+  leaves_first = _dependencies_first(roots, dependencies_of=record_dependents, as_target=as_target)
+  return _dependencies_first(leaves_first, dependencies_of=lambda node: dependents.get(node, ()))
+
+
+def sort_targets(targets):
+  """:return: the targets that targets depend on sorted from most dependent to least."""
+  return _sort(targets, dependencies_of=lambda target: target.dependencies)
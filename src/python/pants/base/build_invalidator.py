@@ -5,16 +5,28 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+from abc import abstractmethod
+from collections import namedtuple
+from contextlib import contextmanager
 import errno
 import hashlib
 import itertools
+import logging
 import os
-from collections import namedtuple
+import re
+import tempfile
+import threading
+
+from twitter.common.dirutil import lock_file, unlock_file
+from twitter.common.lang import AbstractClass
 
 from pants.base.hash_utils import hash_all
 from pants.base.target import Target
 from pants.fs.fs import safe_filename
-from pants.util.dirutil import safe_mkdir
+from pants.util.dirutil import safe_delete, safe_mkdir
+
+
+logger = logging.getLogger(__name__)
 
 
 # A CacheKey represents some version of a set of targets.
@@ -91,15 +103,221 @@ class CacheKeyGenerator(object):
     return CacheKey(target.id, full_key, target.payload.num_chunking_units, (target.payload,))
 
 
+class CacheKeyStore(AbstractClass):
+  """A persistent map from cache key id to the hash of the valid version of that key."""
+
+  @abstractmethod
+  def get(self, id):
+    """Returns the stored hash for id or None if there is none."""
+
+  @abstractmethod
+  def put(self, id, hash):
+    """Records hash as the valid version of id."""
+
+  @abstractmethod
+  def delete(self, id):
+    """Forgets any hash stored for id."""
+
+  @abstractmethod
+  def clear(self):
+    """Forgets all stored hashes."""
+
+  def flush(self):
+    """Persists any buffered writes; a no-op for stores that write through."""
+
+
+class FilePerKeyStore(CacheKeyStore):
+  """Stores each cache key's hash in its own `<id>.hash` file under the store root."""
+
+  def __init__(self, root):
+    self._root = root
+    safe_mkdir(self._root)
+
+  def get(self, id):
+    try:
+      with open(self._sha_file_by_id(id), 'rb') as fd:
+        return fd.read().strip()
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None  # File doesn't exist.
+
+  def put(self, id, hash):
+    with open(self._sha_file_by_id(id), 'w') as fd:
+      fd.write(hash)
+
+  def delete(self, id):
+    safe_delete(self._sha_file_by_id(id))
+
+  def clear(self):
+    safe_mkdir(self._root, clean=True)
+
+  def _sha_file_by_id(self, id):
+    return os.path.join(self._root, safe_filename(id, extension='.hash'))
+
+
+class LogStore(CacheKeyStore):
+  """Stores all cache key hashes in a single append-only log that is indexed in memory.
+
+  The whole log is read in one go on first access.  Puts are buffered and appended in a single
+  write by `flush`; deletes are appended immediately since losing one could leave a stale key
+  looking valid.  All writes are made under an inter-process lock so concurrent pants runs can share
+  a store, and the log is compacted when it is mostly superseded records.
+
+  Hashes found in a `FilePerKeyStore` layout under the same root are imported on first load.
+  """
+
+  LOG_NAME = 'cache_keys.log'
+
+  # Compact once the log holds this many more records than live keys.
+  COMPACTION_SLACK = 1000
+
+  _DIGEST_NAME_RE = re.compile(r'^[0-9a-f]{40}$')
+
+  def __init__(self, root):
+    self._root = root
+    self._log = os.path.join(root, self.LOG_NAME)
+    self._lockfile = self._log + '.lock'
+    self._index = None
+    self._pending = {}
+    self._mutex = threading.RLock()
+    safe_mkdir(self._root)
+
+  def get(self, id):
+    return self._load().get(id)
+
+  def put(self, id, hash):
+    with self._mutex:
+      self._load()[id] = hash
+      self._pending[id] = hash
+
+  def delete(self, id):
+    with self._mutex:
+      self._load().pop(id, None)
+      self._pending.pop(id, None)
+      with self._locked():
+        self._append([(id, None)])
+
+  def clear(self):
+    with self._mutex:
+      with self._locked():
+        self._import_file_per_key_layout()
+        self._rewrite({})
+      self._index = {}
+      self._pending = {}
+
+  def flush(self):
+    with self._mutex:
+      if self._pending:
+        with self._locked():
+          self._append(self._pending.items())
+        self._pending = {}
+
+  @contextmanager
+  def _locked(self):
+    safe_mkdir(self._root)
+    lock = lock_file(self._lockfile, mode='a', blocking=True)
+    try:
+      yield
+    finally:
+      unlock_file(lock, close=True)
+
+  def _load(self):
+    if self._index is None:
+      with self._mutex:
+        if self._index is None:
+          with self._locked():
+            self._index = self._read_and_maintain()
+    return self._index
+
+  def _read_and_maintain(self):
+    if not os.path.exists(self._log):
+      index = self._import_file_per_key_layout()
+      if index:
+        self._rewrite(index)
+      return index
+
+    index = {}
+    num_records = 0
+    with open(self._log, 'rb') as fd:
+      for line in fd:
+        # A torn final record from an interrupted write is ignored.
+        if not line.endswith(b'\n'):
+          break
+        hash, _, id = line[:-1].partition(b'\t')
+        id = id.decode('utf-8')
+        if hash:
+          index[id] = hash
+        else:
+          index.pop(id, None)
+        num_records += 1
+    if num_records > 2 * len(index) + self.COMPACTION_SLACK:
+      self._rewrite(index)
+    return index
+
+  def _import_file_per_key_layout(self):
+    index = {}
+    skipped = 0
+    for name in os.listdir(self._root):
+      if name.endswith('.hash'):
+        path = os.path.join(self._root, name)
+        id = name[:-len('.hash')]
+        # Files only hold the hash, and a name that is a digest may be one safe_filename made of a
+        # longer id; such keys are dropped, which just invalidates them.
+        if self._DIGEST_NAME_RE.match(id):
+          skipped += 1
+        else:
+          with open(path, 'rb') as fd:
+            index[id] = fd.read().strip()
+        os.unlink(path)
+    if skipped:
+      logger.debug('Dropped {0} cache keys with hashed file names from {1}.'.format(skipped,
+                                                                                    self._root))
+    return index
+
+  def _rewrite(self, index):
+    fd, tmp = tempfile.mkstemp(dir=self._root, prefix='.{0}.'.format(self.LOG_NAME))
+    with os.fdopen(fd, 'wb') as out:
+      out.write(self._records(index.items()))
+    os.rename(tmp, self._log)
+
+  def _append(self, entries):
+    with open(self._log, 'a+b') as fd:
+      fd.seek(0, os.SEEK_END)
+      prefix = b''
+      if fd.tell() > 0:
+        # Terminate any torn record left by an interrupted write so ours parse cleanly.
+        fd.seek(-1, os.SEEK_END)
+        if fd.read(1) != b'\n':
+          prefix = b'\n'
+      fd.write(prefix + self._records(entries))
+
+  @staticmethod
+  def _records(entries):
+    return b''.join(b'{0}\t{1}\n'.format(hash or b'', id.encode('utf-8')) for id, hash in entries)
+
+
 # A persistent map from target set to cache key, which is a fingerprint of all
 # the inputs to the current version of that target set. That cache key can then be used
 # to look up build artifacts in an artifact cache.
 class BuildInvalidator(object):
   """Invalidates build targets based on the SHA1 hash of source files and other inputs."""
 
-  def __init__(self, root):
-    self._root = os.path.join(root, GLOBAL_CACHE_KEY_GEN_VERSION)
-    safe_mkdir(self._root)
+  # The CacheKeyStore implementations selectable by name.
+  STORES = {
+    'files': FilePerKeyStore,
+    'log': LogStore,
+  }
+
+  def __init__(self, root, store='log'):
+    """
+    :param root: The directory to keep invalidation state under.
+    :param store: The name of the CacheKeyStore to keep invalidation state in; one of `STORES`.
+    """
+    if store not in self.STORES:
+      raise ValueError('Unknown build invalidator store {store}, expected one of: {stores}'
+                       .format(store=store, stores=', '.join(sorted(self.STORES))))
+    self._store = self.STORES[store](os.path.join(root, GLOBAL_CACHE_KEY_GEN_VERSION))
 
   def needs_update(self, cache_key):
     """Check if the given cached item is invalid.
@@ -107,52 +325,32 @@ class BuildInvalidator(object):
     :param cache_key: A CacheKey object (as returned by BuildInvalidator.key_for().
     :returns: True if the cached version of the item is out of date.
     """
-    return self._read_sha(cache_key) != cache_key.hash
+    return self._store.get(cache_key.id) != cache_key.hash
 
   def update(self, cache_key):
     """Makes cache_key the valid version of the corresponding target set.
 
+    The update may be buffered until the next `flush`.
+
     :param cache_key: A CacheKey object (typically returned by BuildInvalidator.key_for()).
     """
-    self._write_sha(cache_key)
+    self._store.put(cache_key.id, cache_key.hash)
+
+  def flush(self):
+    """Persists any buffered updates."""
+    self._store.flush()
 
   def force_invalidate_all(self):
     """Force-invalidates all cached items."""
-    safe_mkdir(self._root, clean=True)
+    self._store.clear()
 
   def force_invalidate(self, cache_key):
     """Force-invalidate the cached item."""
-    try:
-      os.unlink(self._sha_file(cache_key))
-    except OSError as e:
-      if e.errno != errno.ENOENT:
-        raise
+    self._store.delete(cache_key.id)
 
   def existing_hash(self, id):
     """Returns the existing hash for the specified id.
 
     Returns None if there is no existing hash for this id.
     """
-    return self._read_sha_by_id(id)
-
-  def _sha_file(self, cache_key):
-    return self._sha_file_by_id(cache_key.id)
-
-  def _sha_file_by_id(self, id):
-    return os.path.join(self._root, safe_filename(id, extension='.hash'))
-
-  def _write_sha(self, cache_key):
-    with open(self._sha_file(cache_key), 'w') as fd:
-      fd.write(cache_key.hash)
-
-  def _read_sha(self, cache_key):
-    return self._read_sha_by_id(cache_key.id)
-
-  def _read_sha_by_id(self, id):
-    try:
-      with open(self._sha_file_by_id(id), 'rb') as fd:
-        return fd.read().strip()
-    except IOError as e:
-      if e.errno != errno.ENOENT:
-        raise
-      return None  # File doesn't exist.
+    return self._store.get(id)
@@ -0,0 +1,213 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from contextlib import contextmanager
+import errno
+import hashlib
+import logging
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from pex.interpreter import PythonIdentity
+from twitter.common.dirutil import lock_file, unlock_file
+
+from pants.util.dirutil import safe_delete, safe_mkdir
+
+
+logger = logging.getLogger(__name__)
+
+
+class BytecodeCache(object):
+  """A content-addressed store of compiled BUILD file code.
+
+  Code objects are stored against a digest of the source they were compiled from and the identity
+  of the interpreter that compiled them, so entries can never be stale and are shared by every
+  checkout using the same store, whatever the mtimes of their files.
+
+  The store is a single append-only file of records, each a digest, a length and the marshalled
+  code.  It is mmapped and indexed once, on first use; code compiled since is appended by `save`
+  under an inter-process lock.  A torn final record, left by a crash mid-append, is ignored.  When
+  the store outgrows `max_size` it is rewritten with just the entries this process used.
+  """
+
+  # Bump this if the record format changes.
+  MAGIC = b'PANTSBC1'
+
+  _RECORD_HEADER = struct.Struct(b'>20sI')
+
+  def __init__(self, path=None, identity=None, max_size=32 * 1024 * 1024):
+    """
+    :param path: The store file or None for a cache that lives only in memory.
+    :param identity: Identifies the interpreter code is compiled for; by default the current one.
+    :param int max_size: The size in bytes beyond which `save` compacts the store.
+    """
+    self._path = path
+    self._identity = str(identity or PythonIdentity.get()).encode('utf-8')
+    self._max_size = max_size
+    self._lock = threading.Lock()
+    self._mmap = None
+    self._index = None
+    self._used = set()
+    self._compiled = {}
+    self._unsaved = set()
+
+  @property
+  def path(self):
+    return self._path
+
+  def compile(self, source):
+    """Returns the code object for the BUILD file `source`, compiling it only if needed.
+
+    :raises: SyntaxError if the source does not compile.
+    """
+    digest = hashlib.sha1(self._identity)
+    digest.update(b'\0')
+    digest.update(source)
+    key = digest.digest()
+
+    index = self._load()
+    with self._lock:
+      self._used.add(key)
+      data = self._compiled.get(key)
+      if data is None and key in index:
+        offset, length = index[key]
+        data = self._mmap[offset:offset + length]
+    if data is not None:
+      try:
+        return marshal.loads(data)
+      except Exception as e:
+        logger.warn('Failed to load cached BUILD file bytecode from {path}. Exception was: {e}'
+                    .format(path=self._path, e=e))
+
+    code = compile(source, '<string>', 'exec', flags=0, dont_inherit=True)
+    with self._lock:
+      self._compiled[key] = marshal.dumps(code)
+      self._unsaved.add(key)
+    return code
+
+  def save(self):
+    """Appends any code compiled since the store was loaded to the store."""
+    if not self._path:
+      return
+    with self._lock:
+      if not self._unsaved:
+        return
+      with self._locked():
+        if os.path.exists(self._path) and os.path.getsize(self._path) > self._max_size:
+          self._compact()
+        else:
+          self._append()
+      self._unsaved = set()
+
+  def _append(self):
+    with open(self._path, 'a+b') as store:
+      # Drop anything after the last whole record, so a torn record cannot misalign those appended
+      # after it.
+      size = os.fstat(store.fileno()).st_size
+      store.seek(0)
+      if store.read(len(self.MAGIC)) != self.MAGIC:
+        store.truncate(0)
+        store.write(self.MAGIC)
+      else:
+        mapped = mmap.mmap(store.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+          _, end = self._scan(mapped, size)
+        finally:
+          mapped.close()
+        if end < size:
+          store.truncate(end)
+      store.write(b''.join(self._record(key, self._compiled[key]) for key in self._unsaved))
+
+  def _compact(self):
+    records = dict((key, self._compiled[key]) for key in self._unsaved)
+    for key in self._used:
+      if key not in records and key in self._index:
+        offset, length = self._index[key]
+        records[key] = self._mmap[offset:offset + length]
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self._path), prefix='.bytecode.')
+    try:
+      with os.fdopen(fd, 'wb') as store:
+        store.write(self.MAGIC)
+        store.write(b''.join(self._record(key, data) for key, data in records.items()))
+      os.rename(tmp, self._path)
+    except (IOError, OSError):
+      safe_delete(tmp)
+      raise
+
+  def _record(self, key, data):
+    return self._RECORD_HEADER.pack(key, len(data)) + data
+
+  @contextmanager
+  def _locked(self):
+    safe_mkdir(os.path.dirname(self._path))
+    lock = lock_file('{0}.lock'.format(self._path), mode='a', blocking=True)
+    try:
+      yield
+    finally:
+      unlock_file(lock, close=True)
+
+  def _load(self):
+    if self._index is None:
+      with self._lock:
+        if self._index is None:
+          self._mmap, self._index = self._read()
+    return self._index
+
+  def _read(self):
+    if not self._path:
+      return None, {}
+    try:
+      with open(self._path, 'rb') as store:
+        size = os.fstat(store.fileno()).st_size
+        if size <= len(self.MAGIC):
+          return None, {}
+        mapped = mmap.mmap(store.fileno(), size, access=mmap.ACCESS_READ)
+    except (IOError, OSError, mmap.error) as e:
+      if getattr(e, 'errno', None) != errno.ENOENT:
+        logger.warn('Failed to read the BUILD file bytecode cache at {path}. Exception was: {e}'
+                    .format(path=self._path, e=e))
+      return None, {}
+
+    if mapped[:len(self.MAGIC)] != self.MAGIC:
+      mapped.close()
+      return None, {}
+
+    index, _ = self._scan(mapped, size)
+    return mapped, index
+
+  def _scan(self, mapped, size):
+    """Returns the index of the records in `mapped` and the offset just past the last whole one."""
+    index = {}
+    offset = len(self.MAGIC)
+    header_size = self._RECORD_HEADER.size
+    while offset + header_size <= size:
+      key, length = self._RECORD_HEADER.unpack_from(mapped, offset)
+      if offset + header_size + length > size:
+        break
+      index[key] = (offset + header_size, length)
+      offset += header_size + length
+    return index, offset
+
+
+_BYTECODE_CACHE = None
+
+
+def get_bytecode_cache():
+  """Returns the BytecodeCache BUILD files are compiled through, if any."""
+  return _BYTECODE_CACHE
+
+
+def set_bytecode_cache(cache):
+  """Sets the BytecodeCache BUILD files are compiled through; None disables caching."""
+  if cache is not None and not isinstance(cache, BytecodeCache):
+    raise ValueError('The cache must be an instance of BytecodeCache, given %s' % cache)
+  global _BYTECODE_CACHE
+  _BYTECODE_CACHE = cache
@@ -5,6 +5,8 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+from contextlib import closing
+from multiprocessing.pool import ThreadPool
 import sys
 
 try:
@@ -184,11 +186,22 @@ class InvalidationCacheManager(object):
                cache_key_generator,
                build_invalidator_dir,
                invalidate_dependents,
-               fingerprint_strategy=None):
+               fingerprint_strategy=None,
+               fingerprint_workers=1,
+               invalidator_store='log',
+               build_graph=None):
+    """
+    :param fingerprint_workers: The number of threads to fingerprint target payloads with.
+    :param invalidator_store: The name of the BuildInvalidator store to keep cache keys in.
+    :param build_graph: The BuildGraph the checked targets belong to; its cached orderings are used
+      when given.
+    """
     self._cache_key_generator = cache_key_generator
     self._invalidate_dependents = invalidate_dependents
-    self._invalidator = BuildInvalidator(build_invalidator_dir)
+    self._invalidator = BuildInvalidator(build_invalidator_dir, store=invalidator_store)
     self._fingerprint_strategy = fingerprint_strategy
+    self._fingerprint_workers = fingerprint_workers
+    self._build_graph = build_graph
 
   def update(self, vts):
     """Mark a changed or invalidated VersionedTargetSet as successfully processed."""
@@ -198,6 +211,10 @@ class InvalidationCacheManager(object):
     self._invalidator.update(vts.cache_key)
     vts.valid = True
 
+  def flush(self):
+    """Persists the updates made so far."""
+    self._invalidator.flush()
+
   def force_invalidate(self, vts):
     """Force invalidation of a VersionedTargetSet."""
     for vt in vts.versioned_targets:
@@ -231,6 +248,7 @@ class InvalidationCacheManager(object):
     # We must check the targets in this order, to ensure correctness if invalidate_dependents=True,
     # since we use earlier cache keys to compute later cache keys in this case.
     ordered_targets = self._order_target_list(targets)
+    self._precompute_fingerprints(targets, ordered_targets)
 
     # This will be a list of VersionedTargets that correspond to @targets.
     versioned_targets = []
@@ -258,9 +276,54 @@ class InvalidationCacheManager(object):
   def needs_update(self, cache_key):
     return self._invalidator.needs_update(cache_key)
 
+  def _precompute_fingerprints(self, targets, ordered_targets):
+    """Warms the fingerprints memoized on each target that the cache keys will be built from.
+
+    The per-target payload fingerprints dominate the cost of a check since they read source files,
+    so these are computed concurrently.  Transitive fingerprints are then combined from them on
+    this thread in topological order, so the cache keys come out exactly as if computed serially.
+    """
+    if self._invalidate_dependents:
+      # Transitive fingerprints cover every dependency, whether or not it is in `targets`.
+      ordered_closure = self._order_target_closure(targets)
+    else:
+      ordered_closure = ordered_targets
+
+    # Failures are left for _key_for to hit again and report with the failing target's details.
+    def fingerprint(target):
+      try:
+        target.invalidation_hash(self._fingerprint_strategy)
+      except Exception:
+        pass
+
+    def transitive_fingerprint(target):
+      try:
+        target.transitive_invalidation_hash(self._fingerprint_strategy)
+      except Exception:
+        pass
+
+    workers = min(self._fingerprint_workers, len(ordered_closure))
+    if workers > 1:
+      chunksize = max(1, len(ordered_closure) // (workers * 4))
+      with closing(ThreadPool(processes=workers)) as pool:
+        pool.map(fingerprint, ordered_closure, chunksize=chunksize)
+
+    if self._invalidate_dependents:
+      for target in ordered_closure:
+        transitive_fingerprint(target)
+
+  def _order_target_closure(self, targets):
+    """Orders the closure of the targets topologically, from least to most dependent."""
+    if self._build_graph:
+      return self._build_graph.ordered_closure(targets)
+    return list(reversed(sort_targets(targets)))
+
   def _order_target_list(self, targets):
     """Orders the targets topologically, from least to most dependent."""
-    return filter(targets.__contains__, reversed(sort_targets(targets)))
+    if self._build_graph:
+      return self._build_graph.ordered_subset(targets)
+    members = set(targets)
+    return [target for target in reversed(sort_targets(targets)) if target in members]
 
   def _key_for(self, target, transitive=False):
     try:
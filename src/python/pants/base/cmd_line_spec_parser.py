@@ -99,7 +99,9 @@ class CmdLineSpecParser(object):
         raise self.BadSpecError('Can only recursive glob directories and {0} is not a valid dir'
                                 .format(spec_dir))
       try:
-        for build_file in BuildFile.scan_buildfiles(self._root_dir, spec_dir):
+        build_files = BuildFile.scan_buildfiles(self._root_dir, spec_dir)
+        self._address_mapper.prefetch(build_files)
+        for build_file in build_files:
           addresses.update(self._address_mapper.addresses_in_spec_path(build_file.spec_path))
         return addresses
       except (BuildFile.BuildFileError, AddressLookupError) as e:
@@ -0,0 +1,75 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import time
+
+from pants.base.hash_utils import hash_file
+from pants.base.persistent_pickle_store import PersistentPickleStore
+
+
+class FileDigestCache(PersistentPickleStore):
+  """A persistent cache of file content digests.
+
+  Each digest is stored against the (size, mtime_ns, inode) of the file it was computed from and is
+  only trusted while a fresh stat of the file still matches, so a stale entry costs a re-read and
+  never a wrong answer.
+  """
+
+  # Bump this if the on-disk format or the digest algorithm changes.
+  VERSION = 1
+
+  # Files modified this recently (in seconds) are not cached.  A file written in the same mtime
+  # tick as it was hashed could change again without its stat changing, so it is "racily clean".
+  RACY_WINDOW_SECS = 2
+
+  def __init__(self, path=None, clock=time):
+    """
+    :param path: The file to persist digests to or None for a cache that lives only in memory.
+    :param clock: The source of the current time; exposed for tests.
+    """
+    super(FileDigestCache, self).__init__(path)
+    self._clock = clock
+
+  def digest(self, path):
+    """Returns the hex sha1 of the contents of the file at path, reading it only if needed."""
+    stat = os.stat(path)
+    key = (stat.st_size, int(stat.st_mtime * 1000000000), stat.st_ino)
+    entries = self._load()
+    entry = entries.get(path)
+    if entry is not None and entry[0] == key:
+      return entry[1]
+
+    digest = hash_file(path)
+    if self._clock.time() - stat.st_mtime > self.RACY_WINDOW_SECS:
+      self._put(path, (key, digest))
+    return digest
+
+
+_FILE_DIGEST_CACHE = None
+
+
+def get_file_digest_cache():
+  """Returns the FileDigestCache used to fingerprint payload files, if any."""
+  return _FILE_DIGEST_CACHE
+
+
+def set_file_digest_cache(cache):
+  """Sets the FileDigestCache used to fingerprint payload files; None disables caching."""
+  if cache is not None and not isinstance(cache, FileDigestCache):
+    raise ValueError('The cache must be an instance of FileDigestCache, given %s' % cache)
+  global _FILE_DIGEST_CACHE
+  _FILE_DIGEST_CACHE = cache
+
+
+def file_digest(path):
+  """Returns the hex sha1 of the contents of the file at path.
+
+  Consults the registered FileDigestCache, if there is one, before reading the file.
+  """
+  cache = _FILE_DIGEST_CACHE
+  return cache.digest(path) if cache else hash_file(path)
@@ -52,25 +52,39 @@ class MustacheRenderer(object):
     self._package_name = package_name
     self._pystache_renderer = pystache.Renderer(search_dirs=template_dir)
 
+    # Embedded templates are parsed once, by name. The strings passed to callables embedded in them
+    # are parsed once too, by content; these come from the templates, so there are few of them.
+    self._parsed_templates = {}
+    self._parsed_callable_args = {}
+
   def render_name(self, template_name, args):
-    # TODO: Precompile and cache the templates?
     if self._template_dir:
       # Let pystache find the template by name.
       return self._pystache_renderer.render_name(template_name, MustacheRenderer.expand(args))
     else:
-      # Load the named template embedded in our package.
-      path = os.path.join('templates', template_name + '.mustache')
-      template = pkgutil.get_data(self._package_name, path)
+      parsed = self._parsed_templates.get(template_name)
+      if parsed is None:
+        # Load the named template embedded in our package.
+        path = os.path.join('templates', template_name + '.mustache')
+        template = pkgutil.get_data(self._package_name, path)
 
-      if template == None:
-        raise self.MustacheError(
-          "could not find template %s in package %s" % (path, self._package_name))
+        if template == None:
+          raise self.MustacheError(
+            "could not find template %s in package %s" % (path, self._package_name))
 
-      return self.render(template, args)
+        parsed = self._parse(template)
+        self._parsed_templates[template_name] = parsed
+      return self.render(parsed, args)
 
   def render(self, template, args):
     return self._pystache_renderer.render(template, MustacheRenderer.expand(args))
 
+  @staticmethod
+  def _parse(template):
+    if isinstance(template, bytes):
+      template = template.decode('utf-8')
+    return pystache.parse(template)
+
   def render_callable(self, inner_template_name, arg_string, outer_args):
     """Handle a mustache callable.
 
@@ -90,7 +104,11 @@ class MustacheRenderer(object):
     """
     # First render the arg_string (mustache doesn't do this for you, and it may itself
     # contain mustache constructs).
-    rendered_arg_string = self.render(arg_string, outer_args)
+    parsed = self._parsed_callable_args.get(arg_string)
+    if parsed is None:
+      parsed = self._parse(arg_string)
+      self._parsed_callable_args[arg_string] = parsed
+    rendered_arg_string = self.render(parsed, outer_args)
     # Parse the inner args as CGI args.
     inner_args = dict([(k, v[0]) for k, v in urlparse.parse_qs(rendered_arg_string).items()])
     # Order matters: lets the inner args override the outer args.
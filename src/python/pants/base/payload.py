@@ -13,15 +13,15 @@ from twitter.common.collections import OrderedSet
 from twitter.common.lang import AbstractClass
 
 from pants.base.build_environment import get_buildroot
+from pants.base.file_digest_cache import file_digest
 from pants.base.validation import assert_list
 
 def hash_sources(root_path, rel_path, sources):
   hasher = sha1()
   hasher.update(rel_path)
   for source in sorted(sources):
-    with open(os.path.join(root_path, rel_path, source), 'rb') as f:
-      hasher.update(source)
-      hasher.update(f.read())
+    hasher.update(source)
+    hasher.update(file_digest(os.path.join(root_path, rel_path, source)))
   return hasher.hexdigest()
 
 
@@ -33,8 +33,7 @@ def hash_bundle(bundle):
     buildroot_relative_path = os.path.relpath(abs_path, get_buildroot())
     hasher.update(buildroot_relative_path)
     hasher.update(bundle.filemap[abs_path])
-    with open(abs_path, 'rb') as f:
-      hasher.update(f.read())
+    hasher.update(file_digest(abs_path))
   return hasher.hexdigest()
 
 
@@ -0,0 +1,96 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import errno
+import os
+import tempfile
+import threading
+
+try:
+  import cPickle as pickle
+except ImportError:
+  import pickle
+
+from pants.util.dirutil import safe_delete, safe_mkdir
+
+
+class PersistentPickleStore(object):
+  """A base class for caches of entries kept in a dict that is pickled to a single file.
+
+  The entries are loaded lazily on first use and written back with `save`.  Saving merges the
+  entries stored since loading into whatever another pants run may have saved in the meantime and
+  replaces the file atomically, so concurrent runs can share a file safely; at worst one run's new
+  entries are lost and re-computed next time.  A missing, truncated or foreign file, or one saved
+  with another `VERSION`, reads as empty.
+  """
+
+  # Subclasses bump this if the format of their entries changes.
+  VERSION = 1
+
+  def __init__(self, path=None):
+    """
+    :param path: The file to persist entries to or None for a store that lives only in memory.
+    """
+    self._path = path
+    self._lock = threading.Lock()
+    self._entries = None
+    self._updates = {}
+
+  @property
+  def path(self):
+    return self._path
+
+  def save(self):
+    """Persists any entries stored since the store was loaded."""
+    if not self._path:
+      return
+    with self._lock:
+      if not self._updates:
+        return
+      entries = self._read()
+      entries.update(self._updates)
+      dirname, basename = os.path.split(self._path)
+      safe_mkdir(dirname)
+      fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.{0}.'.format(basename))
+      try:
+        with os.fdopen(fd, 'wb') as out:
+          pickle.dump((self.VERSION, entries), out, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, self._path)
+      except (IOError, OSError):
+        safe_delete(tmp)
+        raise
+      self._entries = entries
+      self._updates = {}
+
+  def _load(self):
+    """Returns the dict of entries, reading it from the file on first use."""
+    if self._entries is None:
+      with self._lock:
+        if self._entries is None:
+          self._entries = self._read()
+    return self._entries
+
+  def _put(self, key, value):
+    """Stores `value` under `key`, to be persisted by the next `save`."""
+    entries = self._load()
+    with self._lock:
+      entries[key] = self._updates[key] = value
+
+  def _read(self):
+    if not self._path:
+      return {}
+    try:
+      with open(self._path, 'rb') as fd:
+        version, entries = pickle.load(fd)
+    except (IOError, OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return {}
+    except Exception:
+      # A truncated or foreign file is just a cold cache.
+      return {}
+    return entries if version == self.VERSION else {}
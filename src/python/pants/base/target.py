@@ -310,6 +310,8 @@ class Target(AbstractTarget):
     For a detailed description of the purpose and use of exclusives tags,
     see the documentation of the CheckExclusives task.
 
+    The map is from exclusives keys to frozensets of their values, and may be shared with other
+    targets, so must not be modified.
     """
     if self.exclusives is None:
       self._propagate_exclusives()
@@ -317,25 +319,78 @@ class Target(AbstractTarget):
 
   def _propagate_exclusives(self):
     if self.exclusives is None:
-      self.exclusives = collections.defaultdict(set)
-      self.add_to_exclusives(self.declared_exclusives)
-      # This may perform more work than necessary.
-      # We want to just traverse the immediate dependencies of this target,
-      # but for a general target, we can't do that. _propagate_exclusives is overridden
-      # in subclasses when possible to avoid the extra work.
-      self.walk(lambda t: self._propagate_exclusives_work(t))
-
-  def _propagate_exclusives_work(self, target):
-    # Note: this will cause a stack overflow if there is a cycle in
-    # the dependency graph, so exclusives checking should occur after
-    # cycle detection.
-    self.add_to_exclusives(target.declared_exclusives)
-    return None
+      self.propagate_exclusives([self])
+
+  @staticmethod
+  def propagate_exclusives(targets):
+    """Computes the exclusives of `targets` and everything they depend on in a single pass.
+
+    Targets are visited dependencies first, so each need only merge the exclusives of its direct
+    dependencies, and of the `extra_walk_targets` it is walked along with, into its own.  Equal
+    exclusives maps are interned, so most targets share theirs with their dependencies and the
+    merges are mostly identity checks.
+
+    :param targets: The Targets to compute exclusives for, all from the same BuildGraph.
+    :raises: CycleException if the targets depend on a cycle.
+    """
+    if not targets:
+      return
+    interned = {}
+    # Targets whose extra walk targets are being computed.  An extra walk target may depend on the
+    # target walked along with it, in which case it sees the target's exclusives without its own.
+    in_progress = set()
+
+    def intern(exclusives):
+      return interned.setdefault(frozenset(exclusives.items()), exclusives)
+
+    def propagate(roots):
+      for target in roots[0]._build_graph.ordered_closure(roots):
+        if target.exclusives is not None:
+          intern(target.exclusives)
+          continue
+        extras = [extra for extra in target.extra_walk_targets() if extra not in in_progress]
+        pending = [extra for extra in extras if extra.exclusives is None]
+        if pending:
+          in_progress.add(target)
+          in_progress.update(pending)
+          propagate(pending)
+          in_progress.difference_update(pending)
+          in_progress.discard(target)
+        target.exclusives = intern(Target._merge_exclusives(target,
+                                                            list(target.dependencies) + extras))
+
+    propagate(targets)
+
+  @staticmethod
+  def _merge_exclusives(target, dependencies):
+    # A target that adds nothing to the exclusives of its dependencies shares their map; a new one
+    # is made only once a merge adds to it.
+    exclusives = dict((key, frozenset(values))
+                      for key, values in target.declared_exclusives.items() if values)
+    owned = bool(exclusives)
+    for dependency in dependencies:
+      dependency_exclusives = dependency.exclusives
+      if not owned and not exclusives:
+        exclusives = dependency_exclusives
+        continue
+      if dependency_exclusives is exclusives:
+        continue
+      for key, values in dependency_exclusives.items():
+        merged = exclusives.get(key)
+        if merged is None or not values <= merged:
+          if not owned:
+            exclusives = dict(exclusives)
+            owned = True
+          exclusives[key] = values if merged is None else merged | values
+    return exclusives
 
   def add_to_exclusives(self, exclusives):
     if exclusives is not None:
+      merged = dict(self.exclusives or {})
       for key in exclusives:
-        self.exclusives[key] |= exclusives[key]
+        if exclusives[key]:
+          merged[key] = merged.get(key, frozenset()) | frozenset(exclusives[key])
+      self.exclusives = merged
 
   @property
   def id(self):
@@ -371,11 +426,24 @@ class Target(AbstractTarget):
     if predicate and not callable(predicate):
       raise ValueError('predicate must be callable but was %s' % predicate)
     self._build_graph.walk_transitive_dependency_graph([self.address], work, predicate)
+    for target in self.extra_walk_targets():
+      target.walk(work, predicate)
+
+  def extra_walk_targets(self):
+    """Returns the targets besides its dependencies that `walk` visits along with this target.
+
+    Exclusives propagate from these targets too.  None by default.
+    """
+    return []
 
   def closure(self):
     """Returns this target's transitive dependencies, in DFS inorder traversal."""
     return self._build_graph.transitive_subgraph_of_addresses([self.address])
 
+  def depends_on(self, target):
+    """Returns True if `target` is in this target's closure, without materializing the closure."""
+    return self._build_graph.depends_on(self.address, target.address)
+
   @manual.builddict()
   def with_description(self, description):
     """Set a human-readable description of this target.
@@ -6,6 +6,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import logging
+import multiprocessing
 import optparse
 import os
 import sys
@@ -16,10 +17,13 @@ from twitter.common.dirutil import Lock
 
 from pants.backend.jvm.tasks.nailgun_task import NailgunTask
 from pants.base.address import Address
+from pants.base.address_map_cache import AddressMapCache
 from pants.base.build_environment import get_buildroot, pants_version
 from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_index import BuildFileIndex, set_build_file_index
 from pants.base.build_file_parser import BuildFileParser
 from pants.base.build_graph import BuildGraph
+from pants.base.bytecode_cache import BytecodeCache, set_bytecode_cache
 from pants.base.config import Config
 from pants.base.dev_backend_loader import load_build_configuration_from_source
 from pants.base.rcfile import RcFile
@@ -97,6 +101,11 @@ def _parse_command(root_dir, args):
   return Command.get_command(command), args
 
 
+def _scans_build_files(args):
+  """Returns True if `args` hold a recursive (`::`) or sibling (`:`) spec."""
+  return any(arg.endswith(':') for arg in args if not arg.startswith('-'))
+
+
 def _process_info(pid):
   process = psutil.Process(pid)
   return '%d (%s)' % (pid, ' '.join(process.cmdline))
@@ -139,6 +148,31 @@ def _run():
 
   config = Config.load()
 
+  backend_packages = config.getlist('backends', 'packages')
+  build_configuration = load_build_configuration_from_source(additional_backends=backend_packages)
+
+  # BUILD files are compiled through a store shared by every checkout using this workdir.
+  bytecode_cache = BytecodeCache(os.path.join(config.getdefault('pants_workdir'),
+                                              'build_file_parser', 'bytecode'))
+  set_bytecode_cache(bytecode_cache)
+
+  # BUILD file scans reuse the directory listings of earlier runs and skip ignored directories.
+  build_file_index = BuildFileIndex(
+      os.path.join(config.getdefault('pants_workdir'), 'build_file_parser', 'build_file_index'),
+      ignore_patterns=config.getlist('build-file-parser', 'ignore_patterns',
+                                     default=list(BuildFileIndex.DEFAULT_IGNORE_PATTERNS)))
+  set_build_file_index(build_file_index)
+
+  # The processes that parse BUILD files in parallel must be forked before any threads start, and
+  # after the stores above are set so they parse with them too.  They only pay off for command
+  # lines that scan for BUILD files.
+  cache_address_maps = config.getbool('build-file-parser', 'cache_address_maps', default=True)
+  parallelism = config.getint('build-file-parser', 'parallelism',
+                              default=multiprocessing.cpu_count())
+  prefetch_pool = None
+  if cache_address_maps and parallelism > 1 and _scans_build_files(argv):
+    prefetch_pool = BuildFileParser.create_prefetch_pool(build_configuration, root_dir, parallelism)
+
   # XXX(wickman) This should be in the command goal, not in pants_exe.py!
   run_tracker = RunTracker.from_config(config)
   report = initial_reporting(config, run_tracker)
@@ -150,11 +184,16 @@ def _run():
   else:
     run_tracker.log(Report.INFO, '(To run a reporting server: ./pants goal server)')
 
-  backend_packages = config.getlist('backends', 'packages')
-  build_configuration = load_build_configuration_from_source(additional_backends=backend_packages)
+  # Parsed BUILD files are cached across runs so unchanged BUILD files need not be executed.
+  address_map_cache = None
+  if cache_address_maps:
+    address_map_cache = AddressMapCache(os.path.join(config.getdefault('pants_workdir'),
+                                                     'build_file_parser', 'address_maps.pickle'))
   build_file_parser = BuildFileParser(build_configuration=build_configuration,
                                       root_dir=root_dir,
-                                      run_tracker=run_tracker)
+                                      run_tracker=run_tracker,
+                                      address_map_cache=address_map_cache,
+                                      prefetch_pool=prefetch_pool)
   address_mapper = BuildFileAddressMapper(build_file_parser)
   build_graph = BuildGraph(run_tracker=run_tracker, address_mapper=address_mapper)
 
@@ -186,8 +225,13 @@ def _run():
       command.cleanup()
       raise
     finally:
+      build_file_parser.save_cache()
+      bytecode_cache.save()
+      build_file_index.save()
       lock.release()
   finally:
+    if prefetch_pool:
+      prefetch_pool.terminate()
     run_tracker.end()
     # Must kill nailguns only after run_tracker.end() is called, because there may still
     # be pending background work that needs a nailgun.
@@ -9,9 +9,10 @@ import errno
 import os
 import shutil
 import tarfile
+import tempfile
 
 from pants.util.contextutil import open_tar
-from pants.util.dirutil import safe_mkdir, safe_mkdir_for
+from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_rmtree
 
 
 class ArtifactError(Exception):
@@ -74,6 +75,12 @@ class DirectoryArtifact(Artifact):
 class TarballArtifact(Artifact):
   """An artifact stored in a tarball."""
   def __init__(self, artifact_root, tarfile, compress):
+    """
+    :param string artifact_root: The root under which all the artifact's files live.
+    :param tarfile: The path of the tarball or, for `extract_stream` only, a file object to read the
+      tarball from sequentially.
+    :param bool compress: Whether the tarball is gzipped.
+    """
     Artifact.__init__(self, artifact_root)
     self._tarfile = tarfile
     self._compress = compress
@@ -117,3 +124,41 @@ class TarballArtifact(Artifact):
         self._relpaths.update(paths)
     except tarfile.ReadError as e:
       raise ArtifactError(e.message)
+
+  def extract_stream(self):
+    """Extract the tarball as it is read, in a single pass, from the file object it was created with.
+
+    This allows extracting straight off a network response, without first spooling the tarball to
+    disk.  The files are extracted into a staging directory under artifact root and only moved into
+    place once the whole tarball has been read, so a truncated stream leaves no partial files behind.
+    """
+    safe_mkdir(self._artifact_root)
+    staging = tempfile.mkdtemp(dir=self._artifact_root, prefix='.extract.')
+    try:
+      with open_tar(self._tarfile, 'r|gz' if self._compress else 'r|', errorlevel=2) as tarin:
+        paths = []
+        dirs = set()
+        files = []
+        for tarinfo in tarin:
+          paths.append(tarinfo.name)
+          if tarinfo.isdir():
+            dirs.add(tarinfo.name)
+          else:
+            dirs.add(os.path.dirname(tarinfo.name))
+            files.append(tarinfo.name)
+            tarin.extract(tarinfo, staging)
+
+      # See the note in extract about creating directories up front.
+      for d in dirs:
+        try:
+          os.makedirs(os.path.join(self._artifact_root, d))
+        except OSError as e:
+          if e.errno != errno.EEXIST:
+            raise
+      for path in files:
+        os.rename(os.path.join(staging, path), os.path.join(self._artifact_root, path))
+      self._relpaths.update(paths)
+    except tarfile.ReadError as e:
+      raise ArtifactError(e.message)
+    finally:
+      safe_rmtree(staging)
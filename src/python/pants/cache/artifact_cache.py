@@ -64,6 +64,25 @@ class ArtifactCache(object):
   def has(self, cache_key):
     pass
 
+  def has_many(self, cache_keys):
+    """Returns a list of whether the cache holds artifacts for each of the given keys, in order.
+
+    Caches that can check many keys more cheaply than one at a time, e.g., by making the checks
+    concurrently, override this.
+
+    Errors checking for a key are logged and the key reported missing, rather than raised.
+
+    cache_keys: A list of CacheKey objects.
+    """
+    return [self._has_or_false(cache_key) for cache_key in cache_keys]
+
+  def _has_or_false(self, cache_key):
+    try:
+      return bool(self.has(cache_key))
+    except self.CacheError as e:
+      self.log.warn('Error while checking artifact cache: %s' % e)
+      return False
+
   def use_cached_files(self, cache_key):
     """Use the files cached for the given key.
 
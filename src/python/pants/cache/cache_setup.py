@@ -9,6 +9,7 @@ import os
 import urlparse
 
 from pants.cache.combined_artifact_cache import CombinedArtifactCache
+from pants.cache.content_addressed_artifact_cache import ContentAddressedArtifactCache
 from pants.cache.local_artifact_cache import LocalArtifactCache
 from pants.cache.pinger import Pinger
 from pants.cache.restful_artifact_cache import RESTfulArtifactCache
@@ -30,7 +31,8 @@ def select_best_url(spec, pinger, log):
   return best_url
 
 
-def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
+def create_artifact_cache(log, artifact_root, spec, task_name, action='using',
+                          local_layout='tarball', local_max_size=None):
   """Returns an artifact cache for the specified spec.
 
   spec can be:
@@ -38,6 +40,10 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     - a URL of a RESTful cache root.
     - a bar-separated list of URLs, where we'll pick the one with the best ping times.
     - A list of the above, for a combined cache.
+
+  local_layout selects how file-based caches store artifacts: 'tarball' stores a tarball per cache
+  key, 'content' stores each file once by content digest (see ContentAddressedArtifactCache).
+  local_max_size bounds the size in bytes of a 'content' cache; None leaves it unbounded.
   """
   if not spec:
     raise ValueError('Empty artifact cache spec')
@@ -45,7 +51,12 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     if spec.startswith('/') or spec.startswith('~'):
       path = os.path.join(spec, task_name)
       log.info('%s %s local artifact cache at %s' % (task_name, action, path))
-      return LocalArtifactCache(log, artifact_root, path)
+      if local_layout == 'content':
+        return ContentAddressedArtifactCache(log, artifact_root, path, max_size=local_max_size)
+      elif local_layout == 'tarball':
+        return LocalArtifactCache(log, artifact_root, path)
+      else:
+        raise ValueError('Invalid local artifact cache layout: %s' % local_layout)
     elif spec.startswith('http://') or spec.startswith('https://'):
       # Caches are supposed to be close, and we don't want to waste time pinging on no-op builds.
       # So we ping twice with a short timeout.
@@ -61,5 +72,6 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     else:
       raise ValueError('Invalid artifact cache spec: %s' % spec)
   elif isinstance(spec, (list, tuple)):
-    caches = filter(None, [ create_artifact_cache(log, artifact_root, x, task_name, action) for x in spec ])
+    caches = filter(None, [ create_artifact_cache(log, artifact_root, x, task_name, action,
+                                                  local_layout, local_max_size) for x in spec ])
     return CombinedArtifactCache(caches) if caches else None
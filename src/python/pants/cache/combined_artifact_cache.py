@@ -32,7 +32,18 @@ class CombinedArtifactCache(ArtifactCache):
       cache.insert(cache_key, paths)
 
   def has(self, cache_key):
-    return any(cache.has(cache_key) for cache in self._artifact_caches)
+    return self.has_many([cache_key])[0]
+
+  def has_many(self, cache_keys):
+    cache_keys = list(cache_keys)
+    found = [False] * len(cache_keys)
+    for cache in self._artifact_caches:
+      missing = [i for i, has in enumerate(found) if not has]
+      if not missing:
+        break
+      for i, has in zip(missing, cache.has_many([cache_keys[i] for i in missing])):
+        found[i] = has
+    return found
 
   def use_cached_files(self, cache_key):
     to_backfill = []
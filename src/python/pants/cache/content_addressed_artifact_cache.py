@@ -0,0 +1,322 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from contextlib import contextmanager
+import errno
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+from twitter.common.dirutil import lock_file, unlock_file
+
+from pants.base.hash_utils import hash_file
+from pants.cache.artifact import Artifact
+from pants.cache.artifact_cache import ArtifactCache
+from pants.util.dirutil import safe_delete, safe_mkdir, safe_mkdir_for
+
+
+class ContentAddressedArtifactCache(ArtifactCache):
+  """A local artifact cache that stores each cached file once, by the digest of its content.
+
+  Each cache key maps to a manifest of the files cached for it and the digest of each, and the
+  files themselves are stored under their digests, so an output identical across targets or across
+  versions of a target is stored just once.  Cached files are restored by copying them out of the
+  store rather than linking them, since compilers rewrite their outputs in place and would
+  otherwise fail on, or corrupt, the shared copy.  Stored files are made read-only to guard the
+  store against any other writer.
+
+  Uses of the cache are recorded in an append-only index of the manifests, their objects and when
+  each was last used.  Once the objects stored grow beyond `max_size` the least recently used
+  manifests are evicted, along with any objects no other manifest refers to, until the store is
+  back under `EVICTION_LOW_WATER` of `max_size`.  All changes to the index are made under an
+  inter-process lock so concurrent pants runs can share a cache.
+  """
+
+  INDEX_NAME = 'index.log'
+
+  # Evict down to this fraction of the max size, so that eviction is not needed again right away.
+  EVICTION_LOW_WATER = 0.8
+
+  # Compact once the index holds this many more records than live manifests.
+  COMPACTION_SLACK = 1000
+
+  def __init__(self, log, artifact_root, cache_root, max_size=None, clock=time):
+    """
+    :param log: A logger.
+    :param string artifact_root: The root under which all cached files live.
+    :param string cache_root: The directory the store, manifests and index are kept under.
+    :param int max_size: The size in bytes beyond which stored files are evicted or None for an
+      unbounded cache.
+    :param clock: The source of the current time; exposed for tests.
+    """
+    ArtifactCache.__init__(self, log, artifact_root)
+    self._cache_root = os.path.expanduser(cache_root)
+    self._objects_root = os.path.join(self._cache_root, 'objects')
+    self._manifests_root = os.path.join(self._cache_root, 'manifests')
+    self._index_path = os.path.join(self._cache_root, self.INDEX_NAME)
+    self._max_size = max_size
+    self._clock = clock
+    self._mutex = threading.RLock()
+    self._manifests = None
+    self._sizes = None
+    safe_mkdir(self._cache_root)
+
+  @property
+  def size(self):
+    """The total size in bytes of the files stored, as last seen by this process."""
+    with self._mutex:
+      self._load()
+      return sum(self._sizes.values())
+
+  def try_insert(self, cache_key, paths):
+    files = []
+    dirs = []
+    for path in paths:
+      if os.path.isdir(path):
+        for root, dirnames, filenames in os.walk(path, followlinks=True):
+          dirs.append(os.path.relpath(root, self.artifact_root))
+          for filename in filenames:
+            files.append(os.path.join(root, filename))
+      else:
+        files.append(path)
+
+    entries = []
+    objects = {}
+    for path in files:
+      digest = self._store(path)
+      objects[digest] = os.path.getsize(path)
+      entries.append([os.path.relpath(path, self.artifact_root), digest])
+
+    manifest = self._manifest_for_key(cache_key)
+    safe_mkdir_for(manifest)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(manifest), prefix='.manifest.')
+    try:
+      with os.fdopen(fd, 'wb') as out:
+        json.dump({'dirs': dirs, 'files': entries}, out)
+      os.rename(tmp, manifest)
+    except (IOError, OSError):
+      safe_delete(tmp)
+      raise
+
+    with self._mutex:
+      self._load()
+      self._record(['put', self._key(cache_key), self._clock.time(), objects.items()])
+      if self._max_size is not None and sum(self._sizes.values()) > self._max_size:
+        self._evict(int(self._max_size * self.EVICTION_LOW_WATER))
+
+  def has(self, cache_key):
+    return os.path.isfile(self._manifest_for_key(cache_key))
+
+  def use_cached_files(self, cache_key):
+    try:
+      manifest = self._manifest_for_key(cache_key)
+      if not os.path.exists(manifest):
+        return None
+      with open(manifest, 'rb') as fd:
+        manifest = json.load(fd)
+
+      # An object can go missing if another run evicted it after this manifest was written, in
+      # which case this entry is as good as evicted too.
+      for _, digest in manifest['files']:
+        if not os.path.exists(self._object_path(digest)):
+          self.delete(cache_key)
+          return None
+
+      for relpath in manifest['dirs']:
+        safe_mkdir(os.path.join(self.artifact_root, relpath))
+      paths = []
+      for relpath, digest in manifest['files']:
+        path = os.path.join(self.artifact_root, relpath)
+        self._restore(self._object_path(digest), path)
+        paths.append(path)
+
+      with self._mutex:
+        self._record(['use', self._key(cache_key), self._clock.time()])
+      artifact = Artifact(self.artifact_root)
+      artifact.override_paths(paths)
+      return artifact
+    except Exception as e:
+      self.log.warn('Error while reading from local artifact cache: %s' % e)
+      return None
+
+  def delete(self, cache_key):
+    safe_delete(self._manifest_for_key(cache_key))
+    with self._mutex:
+      self._record(['del', self._key(cache_key)])
+
+  def prune(self, age_hours):
+    """Evicts the manifests not used in the last `age_hours` and the objects only they refer to."""
+    with self._mutex:
+      with self._locked():
+        self._manifests, self._sizes, _ = self._read()
+        cutoff = self._clock.time() - age_hours * 60 * 60
+        self._drop([key for key, (last_used, _) in self._manifests.items() if last_used < cutoff])
+        self._rewrite()
+
+  def _store(self, path):
+    digest = hash_file(path)
+    obj = self._object_path(digest)
+    if not os.path.exists(obj):
+      safe_mkdir_for(obj)
+      fd, tmp = tempfile.mkstemp(dir=os.path.dirname(obj), prefix='.object.')
+      try:
+        with os.fdopen(fd, 'wb') as out:
+          with open(path, 'rb') as src:
+            shutil.copyfileobj(src, out)
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        os.chmod(tmp, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) | stat.S_IRUSR)
+        os.rename(tmp, obj)
+      except (IOError, OSError):
+        safe_delete(tmp)
+        raise
+    return digest
+
+  def _restore(self, obj, path):
+    safe_mkdir_for(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.restore.')
+    try:
+      with os.fdopen(fd, 'wb') as out:
+        with open(obj, 'rb') as src:
+          shutil.copyfileobj(src, out)
+      os.chmod(tmp, stat.S_IMODE(os.stat(obj).st_mode) | stat.S_IWUSR)
+      os.rename(tmp, path)
+    except (IOError, OSError):
+      safe_delete(tmp)
+      raise
+
+  def _key(self, cache_key):
+    return '{0}/{1}'.format(cache_key.id, cache_key.hash)
+
+  def _manifest_for_key(self, cache_key):
+    # Note: it's important to use the id as well as the hash, because two different targets
+    # may have the same hash if both have no sources, but we may still want to differentiate them.
+    return os.path.join(self._manifests_root, cache_key.id, cache_key.hash) + '.json'
+
+  def _object_path(self, digest):
+    return os.path.join(self._objects_root, digest[:2], digest[2:])
+
+  @contextmanager
+  def _locked(self):
+    lock = lock_file(self._index_path + '.lock', mode='a', blocking=True)
+    try:
+      yield
+    finally:
+      unlock_file(lock, close=True)
+
+  def _load(self):
+    if self._manifests is None:
+      with self._locked():
+        self._manifests, self._sizes, num_records = self._read()
+        if num_records > 2 * len(self._manifests) + self.COMPACTION_SLACK:
+          self._drop([])
+          self._rewrite()
+
+  def _read(self):
+    """Replays the index, returning the live manifests, the objects stored and the number of records
+    replayed.
+
+    Manifests are returned as a map from key to when the manifest was last used and the digests of
+    the objects it refers to; objects as a map from digest to size.  Objects no live manifest refers
+    to any longer are included, since they remain in the store until the next `_drop`.
+    """
+    manifests = {}
+    sizes = {}
+    num_records = 0
+    try:
+      with open(self._index_path, 'rb') as fd:
+        for line in fd:
+          # A torn final record from an interrupted write is ignored.
+          if not line.endswith(b'\n'):
+            break
+          try:
+            record = json.loads(line)
+          except ValueError:
+            continue
+          num_records += 1
+          op, key = record[0], record[1]
+          if op == 'put':
+            objects = dict(record[3])
+            manifests[key] = (record[2], tuple(objects))
+            sizes.update(objects)
+          elif op == 'use' and key in manifests:
+            manifests[key] = (record[2], manifests[key][1])
+          elif op == 'del':
+            manifests.pop(key, None)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+    return manifests, sizes, num_records
+
+  def _record(self, record):
+    op, key = record[0], record[1]
+    if op == 'put':
+      self._load()
+      objects = dict(record[3])
+      self._manifests[key] = (record[2], tuple(objects))
+      self._sizes.update(objects)
+      record = [op, key, record[2], sorted(objects.items())]
+    elif op == 'use' and self._manifests is not None and key in self._manifests:
+      self._manifests[key] = (record[2], self._manifests[key][1])
+    elif op == 'del' and self._manifests is not None:
+      self._manifests.pop(key, None)
+    with self._locked():
+      with open(self._index_path, 'a+b') as fd:
+        fd.seek(0, os.SEEK_END)
+        prefix = b''
+        if fd.tell() > 0:
+          # Terminate any torn record left by an interrupted write so ours parses cleanly.
+          fd.seek(-1, os.SEEK_END)
+          if fd.read(1) != b'\n':
+            prefix = b'\n'
+        fd.write(prefix + json.dumps(record).encode('utf-8') + b'\n')
+
+  def _evict(self, target_size):
+    with self._locked():
+      # Evict from the index as it stands, which may include other runs' changes.
+      self._manifests, self._sizes, _ = self._read()
+      lru = sorted(self._manifests, key=lambda key: self._manifests[key][0])
+      refcounts = {}
+      for _, digests in self._manifests.values():
+        for digest in digests:
+          refcounts[digest] = refcounts.get(digest, 0) + 1
+      total = sum(self._sizes[digest] for digest in refcounts)
+      evicted = []
+      for key in lru:
+        if total <= target_size:
+          break
+        evicted.append(key)
+        for digest in self._manifests[key][1]:
+          refcounts[digest] -= 1
+          if refcounts[digest] == 0:
+            total -= self._sizes[digest]
+      self._drop(evicted)
+      self._rewrite()
+      self.log.debug('Evicted %d entries from the local artifact cache at %s.'
+                     % (len(evicted), self._cache_root))
+
+  def _drop(self, keys):
+    """Removes the manifests for `keys` and any objects only they refer to; must hold the lock."""
+    for key in keys:
+      del self._manifests[key]
+      safe_delete(os.path.join(self._manifests_root, key) + '.json')
+    referenced = set(digest for _, digests in self._manifests.values() for digest in digests)
+    for digest in list(self._sizes):
+      if digest not in referenced:
+        del self._sizes[digest]
+        safe_delete(self._object_path(digest))
+
+  def _rewrite(self):
+    fd, tmp = tempfile.mkstemp(dir=self._cache_root, prefix='.{0}.'.format(self.INDEX_NAME))
+    with os.fdopen(fd, 'wb') as out:
+      for key, (last_used, digests) in self._manifests.items():
+        objects = sorted((digest, self._sizes[digest]) for digest in digests)
+        out.write(json.dumps(['put', key, last_used, objects]).encode('utf-8') + b'\n')
+    os.rename(tmp, self._index_path)
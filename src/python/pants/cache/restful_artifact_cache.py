@@ -6,26 +6,34 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import logging
+from multiprocessing.pool import ThreadPool
 import urlparse
 
 import requests
 from requests import RequestException
+from requests.adapters import HTTPAdapter
 
 from pants.cache.artifact import TarballArtifact
 from pants.cache.artifact_cache import ArtifactCache
-from pants.util.contextutil import temporary_file, temporary_file_path
+from pants.util.contextutil import temporary_file_path
 
 
 class RESTfulArtifactCache(ArtifactCache):
-  """An artifact cache that stores the artifacts on a RESTful service."""
+  """An artifact cache that stores the artifacts on a RESTful service.
 
-  READ_SIZE_BYTES = 4 * 1024 * 1024
+  Requests are made through a single session whose pool keeps up to `max_connections` connections
+  to the service alive, so a run pays for connection (and TLS) setup a handful of times rather than
+  once per artifact.  Tarballs are extracted as they are downloaded, into a staging directory that
+  is only moved into place once the download completes.
+  """
 
-  def __init__(self, log, artifact_root, url_base, compress=True):
+  def __init__(self, log, artifact_root, url_base, compress=True, max_connections=16):
     """
     url_base: The prefix for urls on some RESTful service. We must be able to PUT and GET to any
               path under this base.
     compress: Whether to compress the artifacts before storing them.
+    max_connections: The most connections to keep open to the service, which is also the most
+                     existence checks `has_many` makes at once.
     """
     ArtifactCache.__init__(self, log, artifact_root)
     parsed_url = urlparse.urlparse(url_base)
@@ -39,6 +47,11 @@ class RESTfulArtifactCache(ArtifactCache):
     self._netloc = parsed_url.netloc
     self._path_prefix = parsed_url.path.rstrip('/')
     self.compress = compress
+    self._max_connections = max_connections
+    self._session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+    self._session.mount('http://', adapter)
+    self._session.mount('https://', adapter)
 
     # Reduce the somewhat verbose logging of requests.
     # TODO do this in a central place
@@ -58,8 +71,20 @@ class RESTfulArtifactCache(ArtifactCache):
   def has(self, cache_key):
     return self._request('HEAD', self._remote_path_for_key(cache_key)) is not None
 
+  def has_many(self, cache_keys):
+    """Checks for all the keys at once, with up to `max_connections` HEAD requests in flight."""
+    cache_keys = list(cache_keys)
+    if len(cache_keys) < 2:
+      return [self._has_or_false(cache_key) for cache_key in cache_keys]
+    pool = ThreadPool(min(self._max_connections, len(cache_keys)))
+    try:
+      return pool.map(self._has_or_false, cache_keys)
+    finally:
+      pool.close()
+      pool.join()
+
   def use_cached_files(self, cache_key):
-    # This implementation fetches the appropriate tarball and extracts it.
+    # This implementation streams the appropriate tarball and extracts it as it arrives.
     remote_path = self._remote_path_for_key(cache_key)
     try:
       # Send an HTTP request for the tarball.
@@ -67,21 +92,17 @@ class RESTfulArtifactCache(ArtifactCache):
       if response is None:
         return None
 
-      with temporary_file() as outfile:
-        total_bytes = 0
-        # Read the data in a loop.
-        for chunk in response.iter_content(self.READ_SIZE_BYTES):
-          outfile.write(chunk)
-          total_bytes += len(chunk)
-
-        outfile.close()
-        self.log.debug('Read %d bytes from artifact cache at %s' %
-                       (total_bytes,self._url_string(remote_path)))
-
-        # Extract the tarfile.
-        artifact = TarballArtifact(self.artifact_root, outfile.name, self.compress)
-        artifact.extract()
-        return artifact
+      try:
+        # Undo any transfer encoding the server applied; the tarball's own gzip is left alone.
+        response.raw.decode_content = True
+        artifact = TarballArtifact(self.artifact_root, response.raw, self.compress)
+        artifact.extract_stream()
+      finally:
+        response.close()
+      self.log.debug('Read %s bytes from artifact cache at %s' %
+                     (response.headers.get('content-length', 'unknown'),
+                      self._url_string(remote_path)))
+      return artifact
     except Exception as e:
       self.log.warn('Error while reading from remote artifact cache: %s' % e)
       return None
@@ -109,20 +130,22 @@ class RESTfulArtifactCache(ArtifactCache):
     try:
       response = None
       if 'PUT' == method:
-        response = requests.put(url, data=body, timeout=self._timeout_secs)
+        response = self._session.put(url, data=body, timeout=self._timeout_secs)
       elif 'GET' == method:
-        response = requests.get(url, timeout=self._timeout_secs, stream=True)
+        response = self._session.get(url, timeout=self._timeout_secs, stream=True)
       elif 'HEAD' == method:
-        response = requests.head(url, timeout=self._timeout_secs)
+        response = self._session.head(url, timeout=self._timeout_secs)
       elif 'DELETE' == method:
-        response = requests.delete(url, timeout=self._timeout_secs)
+        response = self._session.delete(url, timeout=self._timeout_secs)
       else:
         raise ValueError('Unknown request method %s' % method)
 
       # Allow all 2XX responses. E.g., nginx returns 201 on PUT. HEAD may return 204.
       if int(response.status_code / 100) == 2:
         return response
-      elif response.status_code == 404:
+      # Read the body of a failed streamed request, so its connection is released to the pool.
+      response.content
+      if response.status_code == 404:
         self.log.debug('404 returned for %s request to %s' % (method, self._url_string(path)))
         return None
       else:
@@ -25,6 +25,8 @@ from pants.base.build_environment import get_buildroot
 from pants.base.build_file import BuildFile
 from pants.base.cmd_line_spec_parser import CmdLineSpecParser
 from pants.base.config import Config
+from pants.base.file_digest_cache import (FileDigestCache, get_file_digest_cache,
+                                          set_file_digest_cache)
 from pants.base.rcfile import RcFile
 from pants.base.workunit import WorkUnit
 from pants.commands.command import Command
@@ -147,6 +149,10 @@ class GoalRunner(Command):
     self.config = Config.load()
     add_global_options(parser)
 
+    # Source fingerprints are persisted across runs so unchanged files need not be re-read.
+    set_file_digest_cache(FileDigestCache(
+        os.path.join(self.config.getdefault('pants_workdir'), 'file_digests', 'digests.pickle')))
+
     # We support attempting zero or more goals.  Multiple goals must be delimited from further
     # options and non goal args with a '--'.  The key permutations we need to support:
     # ./pants goal => goals
@@ -292,7 +298,12 @@ class GoalRunner(Command):
       return 1
 
     engine = RoundEngine()
-    return engine.execute(context, self.goals)
+    try:
+      return engine.execute(context, self.goals)
+    finally:
+      digest_cache = get_file_digest_cache()
+      if digest_cache:
+        digest_cache.save()
 
   def cleanup(self):
     # TODO: This is JVM-specific and really doesn't belong here.
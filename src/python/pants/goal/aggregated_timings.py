@@ -7,6 +7,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 
 import os
 from collections import defaultdict
+import threading
 
 from pants.util.dirutil import safe_mkdir_for
 
@@ -14,7 +15,11 @@ from pants.util.dirutil import safe_mkdir_for
 class AggregatedTimings(object):
   """Aggregates timings over multiple invocations of 'similar' work.
 
-  If filepath is not none, stores the timings in that file. Useful for finding bottlenecks."""
+  If filepath is not none, stores the timings in that file. Useful for finding bottlenecks.
+
+  Timings are aggregated in memory: each one is just appended to an events log alongside the file,
+  and the sorted file itself is only rewritten on flush().
+  """
   def __init__(self, path=None):
     # Map path -> timing in seconds (a float)
     self._timings_by_path = defaultdict(float)
@@ -22,25 +27,69 @@ class AggregatedTimings(object):
     self._path = path
     safe_mkdir_for(self._path)
 
+    # Timings are added from worker threads while the file is flushed from a background thread.
+    self._lock = threading.Lock()
+    self._dirty = False
+    self._events = None
+    self._closed = False
+
+  @property
+  def events_path(self):
+    """The path of the log each timing is appended to as it is added, or None if not stored."""
+    return '%s.events' % self._path if self._path else None
+
   def add_timing(self, label, secs, is_tool=False):
     """Aggregate timings by label.
 
     secs - a double, so fractional seconds are allowed.
     is_tool - whether this label represents a tool invocation.
     """
-    self._timings_by_path[label] += secs
-    if is_tool:
-      self._tool_labels.add(label)
+    with self._lock:
+      self._timings_by_path[label] += secs
+      if is_tool:
+        self._tool_labels.add(label)
+      self._dirty = True
+      events = self._events_log()
+      if events:
+        events.write(('%s\t%.6f\t%d\n' % (label, secs, is_tool)).encode('utf-8'))
+
+  def _events_log(self):
     # Check existence in case we're a clean-all. We don't want to write anything in that case.
-    if self._path and os.path.exists(os.path.dirname(self._path)):
-      with open(self._path, 'w') as f:
-        for x in self.get_all():
-          f.write('%(label)s: %(timing)s\n' % x)
+    if not self._events and not self._closed and self._writable():
+      self._events = open(self.events_path, 'a')
+    return self._events
+
+  def _writable(self):
+    return self._path and os.path.exists(os.path.dirname(self._path))
+
+  def flush(self):
+    """Writes out the events logged so far and, if they changed, the aggregated timings."""
+    with self._lock:
+      if self._events:
+        self._events.flush()
+      if self._dirty and self._writable():
+        with open(self._path, 'w') as f:
+          for x in self._sorted_timings():
+            f.write('%(label)s: %(timing)s\n' % x)
+      self._dirty = False
+
+  def close(self):
+    """Flushes the timings and closes the events log; later timings are only kept in memory."""
+    self.flush()
+    with self._lock:
+      self._closed = True
+      if self._events:
+        self._events.close()
+        self._events = None
 
   def get_all(self):
     """Returns all the timings, sorted in decreasing order.
 
     Each value is a dict: { path: <path>, timing: <timing in seconds> }
     """
+    with self._lock:
+      return self._sorted_timings()
+
+  def _sorted_timings(self):
     return [{ 'label': x[0], 'timing': x[1], 'is_tool': x[0] in self._tool_labels}
             for x in sorted(self._timings_by_path.items(), key=lambda x: x[1], reverse=True)]
@@ -272,6 +272,15 @@ class Context(object):
       target_set.update(target.closure())
     return filter(predicate, target_set)
 
+  def ordered_targets(self, predicate=None):
+    """Selects the same targets as `targets` but ordered from least dependent to most.
+
+    The order is read from the build graph, which maintains it as targets are injected.
+
+    :return: a list of targets evaluated by the predicate, every one preceded by its dependencies.
+    """
+    return filter(predicate, self.build_graph.ordered_closure(self._target_roots))
+
   def dependents(self, on_predicate=None, from_predicate=None):
     """Returns  a map from targets that satisfy the from_predicate to targets they depend on that
       satisfy the on_predicate.
@@ -62,6 +62,107 @@ class MultipleRootedProducts(object):
     return self._rooted_products_by_root.setdefault(root, RootedProducts(root))
 
 
+class _ProductList(list):
+  """A list of the products under a basedir that keeps its mapping's reverse index current."""
+
+  __slots__ = ('_mapping', '_key', '_basedir')
+
+  def __init__(self, mapping, key, basedir):
+    self._mapping = mapping
+    self._key = key
+    self._basedir = basedir
+
+  def append(self, product):
+    # This is the hot path when mapping products, so interning is inlined.
+    mapping = self._mapping
+    if isinstance(product, basestring):
+      product = mapping._interned.setdefault(product, product)
+    list.append(self, product)
+    mapping._index(self._key, self._basedir, (product,))
+
+  def extend(self, products):
+    products = [self._mapping._intern(product) for product in products]
+    list.extend(self, products)
+    self._mapping._index(self._key, self._basedir, products)
+
+  def insert(self, index, product):
+    product = self._mapping._intern(product)
+    list.insert(self, index, product)
+    self._mapping._index(self._key, self._basedir, [product])
+
+  def __iadd__(self, products):
+    self.extend(products)
+    return self
+
+  def __setitem__(self, index, value):
+    if isinstance(index, slice):
+      removed = self[index]
+      value = added = [self._mapping._intern(product) for product in value]
+    else:
+      removed = [self[index]]
+      value = self._mapping._intern(value)
+      added = [value]
+    list.__setitem__(self, index, value)
+    self._mapping._reindex(self._key, self._basedir, self, removed, added)
+
+  def __setslice__(self, i, j, value):
+    self.__setitem__(slice(max(0, i), max(0, j)), value)
+
+  def __delitem__(self, index):
+    removed = self[index] if isinstance(index, slice) else [self[index]]
+    list.__delitem__(self, index)
+    self._mapping._reindex(self._key, self._basedir, self, removed)
+
+  def __delslice__(self, i, j):
+    self.__delitem__(slice(max(0, i), max(0, j)))
+
+  def remove(self, product):
+    list.remove(self, product)
+    self._mapping._reindex(self._key, self._basedir, self, [product])
+
+  def pop(self, *args):
+    product = list.pop(self, *args)
+    self._mapping._reindex(self._key, self._basedir, self, [product])
+    return product
+
+
+class _ProductsByBasedir(dict):
+  """The products mapped under a target, by basedir; missing basedirs map to an empty list."""
+
+  def __init__(self, mapping, key):
+    dict.__init__(self)
+    self._mapping = mapping
+    self._key = key
+
+  def __missing__(self, basedir):
+    products = _ProductList(self._mapping, self._key, basedir)
+    dict.__setitem__(self, basedir, products)
+    return products
+
+  def __setitem__(self, basedir, products):
+    if basedir in self:
+      del self[basedir]
+    self[basedir].extend(products)
+
+  def __delitem__(self, basedir):
+    products = self[basedir]
+    dict.__delitem__(self, basedir)
+    self._mapping._reindex(self._key, basedir, (), products)
+
+
+class _ProductsByTarget(dict):
+  """Product maps by target; missing targets map to an empty product map."""
+
+  def __init__(self, mapping):
+    dict.__init__(self)
+    self._mapping = mapping
+
+  def __missing__(self, key):
+    products_by_basedir = _ProductsByBasedir(self._mapping, key)
+    self[key] = products_by_basedir
+    return products_by_basedir
+
+
 class Products(object):
   """An out-of-band 'dropbox' where tasks can place build product information for later tasks to use.
 
@@ -89,11 +190,20 @@ class Products(object):
   class ProductMapping(object):
     """Maps products of a given type by target. Each product is a map from basedir to a list of
     files in that dir.
+
+    The mapping also keeps a reverse index from (basedir, product) to the targets the product is
+    mapped under, so `keys_for` is a lookup rather than a scan of every mapping.  The product lists
+    handed out by `add` and `__getitem__` update the index as they are mutated, and the product
+    paths they hold are interned, so a path mapped under many targets is stored once.
     """
 
     def __init__(self, typename):
       self.typename = typename
-      self.by_target = defaultdict(lambda: defaultdict(list))
+      self.by_target = _ProductsByTarget(self)
+      self._keys_by_product = defaultdict(set)
+      self._interned = {}
+      # Set if a product cannot be indexed, in which case keys_for falls back to a scan.
+      self._unindexable = False
 
     def empty(self):
       return len(self.by_target) == 0
@@ -141,6 +251,11 @@ class Products(object):
 
     def keys_for(self, basedir, product):
       """Returns the set of keys the given mapped product is registered under."""
+      if not self._unindexable:
+        try:
+          return set(self._keys_by_product.get((basedir, product), ()))
+        except TypeError:
+          pass
       keys = set()
       for key, mappings in self.by_target.items():
         for mapped in mappings.get(basedir, []):
@@ -149,6 +264,35 @@ class Products(object):
             break
       return keys
 
+    def _intern(self, value):
+      if isinstance(value, basestring):
+        return self._interned.setdefault(value, value)
+      return value
+
+    def _index(self, key, basedir, products):
+      if self._unindexable:
+        return
+      try:
+        for product in products:
+          self._keys_by_product[(basedir, product)].add(key)
+      except TypeError:
+        # An unhashable product; give up on the index rather than on the mapping.
+        self._unindexable = True
+        self._keys_by_product.clear()
+
+    def _reindex(self, key, basedir, products, removed, added=()):
+      """Updates the index after `removed` were replaced by `added` in the basedir's `products`."""
+      if self._unindexable:
+        return
+      for product in removed:
+        if product not in products:
+          keys = self._keys_by_product.get((basedir, product))
+          if keys is not None:
+            keys.discard(key)
+            if not keys:
+              del self._keys_by_product[(basedir, product)]
+      self._index(key, basedir, added)
+
     def __repr__(self):
       return 'ProductMapping(%s) {\n  %s\n}' % (self.typename, '\n  '.join(
         '%s => %s\n    %s' % (str(target), basedir, outputs)
@@ -16,6 +16,8 @@ from urlparse import urlparse
 
 import httplib
 
+from twitter.common.threading import PeriodicThread
+
 from pants.base.config import Config
 from pants.base.run_info import RunInfo
 from pants.base.worker_pool import WorkerPool
@@ -59,17 +61,24 @@ class RunTracker(object):
     stats_upload_timeout = config.getdefault('stats_upload_timeout', default=2)
     num_foreground_workers = config.getdefault('num_foreground_workers', default=8)
     num_background_workers = config.getdefault('num_background_workers', default=8)
+    summary_period_secs = config.getdefault('reporting_summary_period_secs', type=float, default=1)
     return cls(info_dir,
                stats_upload_url=stats_upload_url,
                num_foreground_workers=num_foreground_workers,
-               num_background_workers=num_background_workers)
+               num_background_workers=num_background_workers,
+               summary_period_secs=summary_period_secs)
 
   def __init__(self,
                info_dir,
                stats_upload_url=None,
                stats_upload_timeout=2,
                num_foreground_workers=8,
-               num_background_workers=8):
+               num_background_workers=8,
+               summary_period_secs=1):
+    """
+    :param float summary_period_secs: How often to bring the timings, cache stats and the summaries
+      reporters render from them up to date while the run is in progress.
+    """
     self.run_timestamp = time.time()  # A double, so we get subsecond precision for ids.
     cmd_line = ' '.join(['./pants'] + sys.argv[1:])
 
@@ -101,6 +110,12 @@ class RunTracker(object):
     self.artifact_cache_stats = \
       ArtifactCacheStats(os.path.join(self.info_dir, 'artifact_cache_stats'))
 
+    # We periodically write out the timings and re-render summaries of them, rather than doing so
+    # as each workunit ends.
+    self._summary_thread = PeriodicThread(target=self.render_summaries, name='summary-renderer',
+                                          period_secs=summary_period_secs)
+    self._summary_thread.daemon = True
+
     # Number of threads for foreground work.
     self._num_foreground_workers = num_foreground_workers
 
@@ -150,6 +165,7 @@ class RunTracker(object):
     self.register_thread(self._main_root_workunit)
     self._main_root_workunit.start()
     self.report.start_workunit(self._main_root_workunit)
+    self._summary_thread.start()
 
   def set_root_outcome(self, outcome):
     """Useful for setup code that doesn't have a reference to a workunit."""
@@ -218,6 +234,12 @@ class RunTracker(object):
     """Log a message against the current workunit."""
     self.report.log(self._threadlocal.current_workunit, level, *msg_elements)
 
+  def render_summaries(self):
+    """Writes out the timings so far and has the reporters re-render their summaries of them."""
+    self.cumulative_timings.flush()
+    self.self_timings.flush()
+    self.report.render_summaries()
+
   def upload_stats(self):
     """Send timing results to URL specified in pants.ini"""
     def error(msg):
@@ -286,6 +308,11 @@ class RunTracker(object):
       except IOError:
         pass  # If the goal is clean-all then the run info dir no longer exists...
 
+    self._summary_thread.stop()
+    self.render_summaries()
+    self.cumulative_timings.close()
+    self.self_timings.close()
+
     self.report.close()
     self.upload_stats()
 
@@ -5,13 +5,15 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+from collections import namedtuple
+from contextlib import contextmanager
 import hashlib
+import json
 import os
 import re
+import threading
 import time
 
-from collections import namedtuple
-
 import psutil
 
 # TODO: Once we integrate standard logging into our reporting framework, we  can consider making
@@ -21,9 +23,10 @@ from twitter.common.collections import maybe_list
 from twitter.common.lang import Compatibility
 
 from pants.base.build_environment import get_buildroot
+from pants.base.file_digest_cache import file_digest
 from pants.java.executor import Executor, SubprocessExecutor
 from pants.java.nailgun_client import NailgunClient
-from pants.util.dirutil import safe_open
+from pants.util.dirutil import safe_delete, safe_open
 
 
 class NailgunExecutor(Executor):
@@ -39,12 +42,23 @@ class NailgunExecutor(Executor):
     @classmethod
     def parse(cls, endpoint):
       """Parses an endpoint from a string of the form exe:fingerprint:pid:port"""
-      components = endpoint.split(':')
+      # The exe is a path and so may itself contain colons.
+      components = endpoint.rsplit(':', 3)
       if len(components) != 4:
         raise ValueError('Invalid endpoint spec %s' % endpoint)
       exe, fingerprint, pid, port = components
       return cls(exe, fingerprint, int(pid), int(port))
 
+    def serialize(self):
+      """Returns this endpoint as a string of the form exe:fingerprint:pid:port"""
+      return ':'.join(str(component) for component in self)
+
+  # The file in an executor's workdir recording the endpoint of the nailgun server it launched.
+  _REGISTRY = 'endpoint'
+
+  # Records the digested classpath a server was launched with, so it can be extended in place.
+  _CLASSPATH_MANIFEST = 'classpath.json'
+
   # Used to identify we own a given java nailgun server
   _PANTS_NG_ARG_PREFIX = b'-Dpants.buildroot'
   _PANTS_NG_ARG = b'%s=%s' % (_PANTS_NG_ARG_PREFIX, get_buildroot())
@@ -59,6 +73,14 @@ class NailgunExecutor(Executor):
     except OSError:
       return False
 
+  @staticmethod
+  def _check_port(port):
+    sock = NailgunClient(port=port).try_connect()
+    if sock:
+      sock.close()
+      return True
+    return False
+
   @staticmethod
   def create_owner_arg(workdir):
     # Currently the owner is identified via the full path to the workdir.
@@ -76,11 +98,69 @@ class NailgunExecutor(Executor):
         return components[1]
     return None
 
+  # Stands in for the content digest of classpath entries that do not exist.
+  _MISSING_ENTRY = 'missing'
+
+  # The digest of each directory entry digested, along with the mtimes of the directories under it
+  # when it was.
+  _dir_digests = {}
+  _dir_digests_lock = threading.Lock()
+
+  @classmethod
+  def _digest_classpath(cls, classpath):
+    """Returns a list of (entry, content digest) pairs for the given classpath, in order.
+
+    File digests are cached by stat via the registered FileDigestCache, and directory digests are
+    reused for as long as none of the directories under them changes, so digesting an unchanged
+    classpath just stats its files and directories.
+    """
+    entries = [entry for element in classpath for entry in element.split(os.pathsep) if entry]
+    return [(entry, cls._digest_entry(entry)) for entry in entries]
+
+  @staticmethod
+  def _mtime(path):
+    try:
+      return os.path.getmtime(path)
+    except OSError:
+      return None
+
+  @classmethod
+  def _digest_entry(cls, entry):
+    if os.path.isfile(entry):
+      return file_digest(entry)
+    if not os.path.isdir(entry):
+      return cls._MISSING_ENTRY
+
+    # Adding, removing or replacing a file under the entry changes the mtime of its directory.
+    with cls._dir_digests_lock:
+      cached = cls._dir_digests.get(entry)
+    if cached:
+      mtimes, entry_digest = cached
+      if all(cls._mtime(path) == mtime for path, mtime in mtimes):
+        return entry_digest
+
+    mtimes = []
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(entry):
+      mtimes.append((root, cls._mtime(root)))
+      dirs.sort()
+      for f in sorted(files):
+        path = os.path.join(root, f)
+        digest.update(os.path.relpath(path, entry).encode('utf-8'))
+        digest.update(file_digest(path))
+    entry_digest = digest.hexdigest()
+    with cls._dir_digests_lock:
+      cls._dir_digests[entry] = (mtimes, entry_digest)
+    return entry_digest
+
   @staticmethod
-  def _fingerprint(jvm_args, classpath):
+  def _fingerprint(jvm_args, entries):
+    """Fingerprints the jvm args and the ordered, digested classpath entries of a server."""
     digest = hashlib.sha1()
-    digest.update(''.join(sorted(jvm_args)))
-    digest.update(''.join(sorted(classpath)))  # TODO(John Sirois): hash classpath contents?
+    digest.update(''.join(sorted(jvm_args)).encode('utf-8'))
+    for entry, entry_digest in entries:
+      digest.update(entry.encode('utf-8'))
+      digest.update(entry_digest)
     return digest.hexdigest()
 
   @staticmethod
@@ -104,14 +184,22 @@ class NailgunExecutor(Executor):
         pass
 
   @classmethod
-  def killall(cls, logger=None, everywhere=False):
+  def killall(cls, logger=None, everywhere=False, workdir_root=None):
     """Kills all nailgun servers started by pants.
 
     :param bool everywhere: If ``True`` Kills all pants-started nailguns on this machine; otherwise
       restricts the nailguns killed to those started for the current build root.
+    :param string workdir_root: If specified, and not killing nailguns everywhere, just the
+      nailguns registered by executors with workdirs directly under this directory are killed,
+      which saves scanning every process on the machine.
     """
+    if workdir_root and not everywhere:
+      procs = cls._find_registered_ngs(workdir_root)
+    else:
+      procs = cls._find_ngs(everywhere=everywhere)
+
     success = True
-    for proc in cls._find_ngs(everywhere=everywhere):
+    for proc in procs:
       try:
         cls._log_kill(proc.pid, logger=logger)
         proc.kill()
@@ -119,30 +207,86 @@ class NailgunExecutor(Executor):
         success = False
     return success
 
-  @staticmethod
-  def _find_ng_listen_port(proc):
-    for connection in proc.get_connections(kind=b'tcp'):
-      if connection.status == b'LISTEN':
-        host, port = connection.laddr
-        return port
-    return None
+  @classmethod
+  def _find_registered_ngs(cls, workdir_root):
+    if not os.path.isdir(workdir_root):
+      return
+    for name in os.listdir(workdir_root):
+      workdir = os.path.join(workdir_root, name)
+      endpoint = cls._read_endpoint(workdir)
+      if endpoint and cls._check_pid(endpoint.pid):
+        # The server may have died and its pid been reused since, so make sure it's ours to kill.
+        try:
+          proc = psutil.Process(endpoint.pid)
+          if cls.create_owner_arg(workdir) in proc.cmdline:
+            yield proc
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+          pass
+
+  @classmethod
+  def _read_endpoint(cls, workdir):
+    try:
+      with open(os.path.join(workdir, cls._REGISTRY), 'r') as registry:
+        return cls.Endpoint.parse(registry.read().strip())
+    except (IOError, ValueError):
+      return None
 
   @classmethod
   def _find(cls, workdir):
-    owner_arg = cls.create_owner_arg(workdir)
-    for proc in cls._find_ngs(everywhere=False):
-      try:
-        if owner_arg in proc.cmdline:
-          fingerprint = cls.parse_fingerprint_arg(proc.cmdline)
-          port = cls._find_ng_listen_port(proc)
-          exe = proc.cmdline[0]
-          if fingerprint and port:
-            return cls.Endpoint(exe, fingerprint, proc.pid, port)
-      except (psutil.AccessDenied, psutil.NoSuchProcess):
-        pass
+    """Returns the endpoint of the live nailgun server registered for the workdir, if any."""
+    endpoint = cls._read_endpoint(workdir)
+    if endpoint and cls._check_pid(endpoint.pid) and cls._check_port(endpoint.port):
+      return endpoint
     return None
 
-  def __init__(self, workdir, nailgun_classpath, distribution=None, ins=None):
+  class _Pool(object):
+    """Tracks which servers of a pool are leased by threads of this process."""
+
+    def __init__(self):
+      self.leased = set()
+      self.condition = threading.Condition()
+
+  _pools = {}
+  _pools_lock = threading.Lock()
+
+  @classmethod
+  def _pool_for(cls, workdir):
+    with cls._pools_lock:
+      pool = cls._pools.get(workdir)
+      if pool is None:
+        pool = cls._pools[workdir] = cls._Pool()
+      return pool
+
+  _PARSE_MAX_HEAP = re.compile(r'^-Xmx(\d+)([kKmMgG]?)$')
+
+  @classmethod
+  def _max_heap_mb(cls, jvm_args):
+    """Returns the max heap in MB the jvm args set, or None if they don't set one."""
+    max_heap_mb = None
+    for arg in jvm_args:
+      match = cls._PARSE_MAX_HEAP.match(arg)
+      if match:
+        size, unit = int(match.group(1)), match.group(2).lower()
+        scale = {'': 1.0 / (1024 * 1024), 'k': 1.0 / 1024, 'm': 1, 'g': 1024}[unit]
+        max_heap_mb = size * scale
+    return max_heap_mb
+
+  def __init__(self, workdir, nailgun_classpath, distribution=None, ins=None, pool_size=1,
+               idle_timeout_secs=None, max_memory_mb=None):
+    """
+    :param string workdir: The directory to keep the state of the nailgun server in.
+    :param nailgun_classpath: The classpath of the nailgun server.
+    :param distribution: An optional validated java distribution to launch the server with.
+    :param ins: The stream to read nailed command standard input from.
+    :param int pool_size: The number of servers to keep for running commands concurrently.  Each
+      command leases a server of its own, waiting for one if all are leased, so that commands run
+      concurrently don't contend for a single server.  Servers beyond the first keep their state
+      in workdirs named for the workdir with the server's index appended.
+    :param int idle_timeout_secs: When pooling servers, kill those that go unused for this long.
+    :param int max_memory_mb: When pooling servers, run no more servers of a pool at once than fit
+      in this much max heap, less the max heap of the servers of all the other executors with
+      workdirs alongside this one.
+    """
     super(NailgunExecutor, self).__init__(distribution=distribution)
 
     self._nailgun_classpath = maybe_list(nailgun_classpath)
@@ -153,9 +297,15 @@ class NailgunExecutor(Executor):
 
     self._ng_out = os.path.join(workdir, 'stdout')
     self._ng_err = os.path.join(workdir, 'stderr')
+    self._registry = os.path.join(workdir, self._REGISTRY)
+    self._classpath_manifest = os.path.join(workdir, self._CLASSPATH_MANIFEST)
 
     self._ins = ins
 
+    self._pool_size = pool_size
+    self._idle_timeout_secs = idle_timeout_secs
+    self._max_memory_mb = max_memory_mb
+
   def _runner(self, classpath, main, jvm_options, args):
     command = self._create_command(classpath, main, jvm_options, args)
 
@@ -169,17 +319,135 @@ class NailgunExecutor(Executor):
         return ' '.join(command)
 
       def run(this, stdout=None, stderr=None):
-        nailgun = self._get_nailgun_client(jvm_options, classpath, stdout, stderr)
-        try:
-          log.debug('Executing via %s: %s' % (nailgun, this.cmd))
-          return nailgun(main, *args)
-        except nailgun.NailgunError as e:
-          self.kill()
-          raise self.Error('Problem launching via %s command %s %s: %s'
-                           % (nailgun, main, ' '.join(args), e))
+        entries = self._digest_classpath(self._nailgun_classpath + classpath)
+        with self._lease(jvm_options, entries) as executor:
+          nailgun = executor._get_nailgun_client(jvm_options, classpath, entries, stdout, stderr)
+          try:
+            log.debug('Executing via %s: %s' % (nailgun, this.cmd))
+            return nailgun(main, *args)
+          except nailgun.NailgunError as e:
+            executor.kill()
+            raise self.Error('Problem launching via %s command %s %s: %s'
+                             % (nailgun, main, ' '.join(args), e))
 
     return Runner()
 
+  def _slot_executor(self, slot):
+    workdir = self._workdir if slot == 0 else '%s-%d' % (self._workdir, slot)
+    return NailgunExecutor(workdir, self._nailgun_classpath, distribution=self._distribution,
+                           ins=self._ins)
+
+  def _pool_capacity(self, jvm_args):
+    capacity = self._pool_size
+    max_heap_mb = self._max_heap_mb(jvm_args)
+    if self._max_memory_mb and max_heap_mb:
+      available_mb = self._max_memory_mb - self._others_max_heap_mb()
+      capacity = min(capacity, int(available_mb // max_heap_mb))
+    return max(1, capacity)
+
+  def _others_max_heap_mb(self):
+    """Returns the total max heap of the live servers registered alongside this executor's pool.
+
+    Servers of the pool itself, in this executor's workdir and its slot workdirs, are not counted.
+    """
+    workdir_root, name = os.path.split(self._workdir)
+    if not os.path.isdir(workdir_root):
+      return 0
+    own = re.compile(r'^%s(-\d+)?$' % re.escape(name))
+    total_mb = 0
+    for other in os.listdir(workdir_root):
+      if own.match(other):
+        continue
+      workdir = os.path.join(workdir_root, other)
+      endpoint = self._read_endpoint(workdir)
+      if not endpoint or not self._check_pid(endpoint.pid):
+        continue
+      recorded = self._read_classpath_manifest(workdir, endpoint.fingerprint)
+      if recorded:
+        total_mb += self._max_heap_mb(recorded[0]) or 0
+    return total_mb
+
+  @contextmanager
+  def _lease(self, jvm_args, entries):
+    """Leases a server of the pool for the duration of the context, yielding its executor.
+
+    :param list entries: The digested classpath entries of the server, from `_digest_classpath`.
+
+    Without a pool this executor's own server is used, and may be used concurrently.
+    """
+    if self._pool_size <= 1:
+      yield self
+      return
+
+    pool = self._pool_for(self._workdir)
+    capacity = self._pool_capacity(jvm_args)
+    fingerprint = self._fingerprint(jvm_args, entries)
+    with pool.condition:
+      while True:
+        free = [slot for slot in range(capacity) if slot not in pool.leased]
+        if free:
+          break
+        # A timeout keeps the wait interruptible.
+        pool.condition.wait(1)
+      self._evict(pool, capacity)
+      slot = self._choose_slot(free, fingerprint)
+      pool.leased.add(slot)
+
+    executor = self._slot_executor(slot)
+    try:
+      yield executor
+    finally:
+      executor._touch()
+      with pool.condition:
+        pool.leased.discard(slot)
+        pool.condition.notify()
+
+  def _choose_slot(self, free, fingerprint):
+    """Picks a server already running with the right fingerprint, else an unused slot."""
+    unused = None
+    for slot in free:
+      endpoint = self._slot_executor(slot)._get_nailgun_endpoint()
+      if not endpoint:
+        unused = slot if unused is None else unused
+      elif endpoint.fingerprint == fingerprint and endpoint.exe == self._distribution.java:
+        return slot
+    return free[0] if unused is None else unused
+
+  def _evict(self, pool, capacity):
+    """Kills unleased servers beyond the pool's capacity or idle for longer than the timeout.
+
+    Must be called holding the pool's condition.
+    """
+    now = time.time()
+    for slot in range(self._pool_size):
+      if slot in pool.leased:
+        continue
+      executor = self._slot_executor(slot)
+      idle_secs = executor._idle_secs(now)
+      if idle_secs is None:
+        continue
+      if slot >= capacity:
+        log.debug('Evicting ng server in slot %d of %s: over capacity' % (slot, self._workdir))
+        executor.kill()
+      elif self._idle_timeout_secs is not None and idle_secs > self._idle_timeout_secs:
+        log.debug('Evicting ng server in slot %d of %s: idle for %ds'
+                  % (slot, self._workdir, idle_secs))
+        executor.kill()
+
+  def _touch(self):
+    """Records that the server was just used."""
+    try:
+      os.utime(self._registry, None)
+    except OSError:
+      pass
+
+  def _idle_secs(self, now):
+    """Returns how long the registered server has gone unused, or None if none is registered."""
+    try:
+      return now - os.path.getmtime(self._registry)
+    except OSError:
+      return None
+
   def kill(self):
     """Kills the nailgun server owned by this executor if its currently running."""
 
@@ -190,6 +458,14 @@ class NailgunExecutor(Executor):
         os.kill(endpoint.pid, 9)
       except OSError:
         pass
+    safe_delete(self._registry)
+    safe_delete(self._classpath_manifest)
+
+  def _register(self, endpoint):
+    tmp = '%s.%d' % (self._registry, os.getpid())
+    with safe_open(tmp, 'w') as registry:
+      registry.write(endpoint.serialize())
+    os.rename(tmp, self._registry)
 
   def _get_nailgun_endpoint(self):
     endpoint = self._find(self._workdir)
@@ -197,9 +473,70 @@ class NailgunExecutor(Executor):
       log.debug('Found ng server launched with %s fingerprint %s @ pid:%d port:%d' % endpoint)
     return endpoint
 
-  def _get_nailgun_client(self, jvm_args, classpath, stdout, stderr):
+  def _record_classpath(self, fingerprint, jvm_args, entries):
+    """Records the digested classpath the server with the given fingerprint was launched with."""
+    tmp = '%s.%d' % (self._classpath_manifest, os.getpid())
+    with safe_open(tmp, 'w') as manifest:
+      json.dump(dict(fingerprint=fingerprint, jvm_args=sorted(jvm_args), entries=entries), manifest)
+    os.rename(tmp, self._classpath_manifest)
+
+  def _read_classpath(self, fingerprint):
+    """Returns the digested classpath entries recorded for the server with the given fingerprint.
+
+    :returns: A tuple of the server's sorted jvm args and its digested classpath entries, or None
+      if no classpath is recorded for the server.
+    """
+    return self._read_classpath_manifest(self._workdir, fingerprint)
+
+  @classmethod
+  def _read_classpath_manifest(cls, workdir, fingerprint):
+    try:
+      with open(os.path.join(workdir, cls._CLASSPATH_MANIFEST), 'r') as fp:
+        manifest = json.load(fp)
+    except (IOError, ValueError):
+      return None
+    if manifest.get('fingerprint') != fingerprint:
+      return None
+    return manifest['jvm_args'], [tuple(entry) for entry in manifest['entries']]
+
+  def _extend_nailgun_server(self, endpoint, fingerprint, jvm_args, entries):
+    """Appends entries to the classpath of a running server launched with a prefix of `entries`.
+
+    Nailgun's builtin ng-cp nail adds to the server's system classloader, which leaves the server
+    serving exactly the classpath it would have been launched with, without a restart.
+
+    :returns: True if the server was extended and re-registered under the new fingerprint.
+    """
+    recorded = self._read_classpath(endpoint.fingerprint)
+    if not recorded:
+      return False
+    recorded_jvm_args, recorded_entries = recorded
+    if recorded_jvm_args != sorted(jvm_args):
+      return False
+    if len(recorded_entries) >= len(entries) or entries[:len(recorded_entries)] != recorded_entries:
+      return False
+
+    appended = [entry for entry, _ in entries[len(recorded_entries):]]
+    log.debug('Extending classpath of ng server @ pid:%d port:%d with %s'
+              % (endpoint.pid, endpoint.port, appended))
+    out = Compatibility.StringIO()
+    nailgun = NailgunClient(port=endpoint.port, ins=None, out=out, err=out, workdir=get_buildroot())
+    try:
+      result = nailgun('ng-cp', *appended)
+    except NailgunClient.NailgunError as e:
+      log.debug('Failed to extend ng server classpath: %s' % e)
+      return False
+    if result != 0:
+      log.debug('Failed to extend ng server classpath: %s' % out.getvalue())
+      return False
+
+    self._register(endpoint._replace(fingerprint=fingerprint))
+    self._record_classpath(fingerprint, jvm_args, entries)
+    return True
+
+  def _get_nailgun_client(self, jvm_args, classpath, entries, stdout, stderr):
     classpath = self._nailgun_classpath + classpath
-    new_fingerprint = self._fingerprint(jvm_args, classpath)
+    new_fingerprint = self._fingerprint(jvm_args, entries)
 
     endpoint = self._get_nailgun_endpoint()
     running = endpoint and self._check_pid(endpoint.pid)
@@ -207,11 +544,16 @@ class NailgunExecutor(Executor):
     updated = updated or (endpoint and endpoint.exe != self._distribution.java)
     if running and not updated:
       return self._create_ngclient(endpoint.port, stdout, stderr)
+    elif (running and endpoint.exe == self._distribution.java and
+          self._extend_nailgun_server(endpoint, new_fingerprint, jvm_args, entries)):
+      return self._create_ngclient(endpoint.port, stdout, stderr)
     else:
       if running and updated:
         log.debug('Killing ng server launched with %s fingerprint %s @ pid:%d port:%d' % endpoint)
         self.kill()
-      return self._spawn_nailgun_server(new_fingerprint, jvm_args, classpath, stdout, stderr)
+      nailgun = self._spawn_nailgun_server(new_fingerprint, jvm_args, classpath, stdout, stderr)
+      self._record_classpath(new_fingerprint, jvm_args, entries)
+      return nailgun
 
   # 'NGServer started on 127.0.0.1, port 53785.'
   _PARSE_NG_PORT = re.compile('.*\s+port\s+(\d+)\.$')
@@ -223,7 +565,7 @@ class NailgunExecutor(Executor):
                                        ' line: %s' % line)
     return int(match.group(1))
 
-  def _await_nailgun_server(self, stdout, stderr):
+  def _await_nailgun_server(self, fingerprint, pid, stdout, stderr):
     nailgun_timeout_seconds = 5
     max_socket_connect_attempts = 10
     nailgun = None
@@ -249,11 +591,9 @@ class NailgunExecutor(Executor):
       sock = nailgun.try_connect()
       if sock:
         sock.close()
-        endpoint = self._get_nailgun_endpoint()
-        if endpoint:
-          log.debug('Connected to ng server launched with %s fingerprint %s pid: %d @ port: %d' % endpoint)
-        else:
-          raise NailgunClient.NailgunError('Failed to connect to ng server.')
+        endpoint = self.Endpoint(self._distribution.java, fingerprint, pid, port)
+        self._register(endpoint)
+        log.debug('Connected to ng server launched with %s fingerprint %s pid: %d @ port: %d' % endpoint)
         return nailgun
       elif attempt > max_socket_connect_attempts:
         raise nailgun.NailgunError('Failed to connect to ng output after %d connect attempts'
@@ -270,12 +610,22 @@ class NailgunExecutor(Executor):
 
     with safe_open(self._ng_out, 'w'):
       pass  # truncate
+    safe_delete(self._registry)
 
+    # The forked child reports the pid of the server it spawns back over this pipe.
+    read_fd, write_fd = os.pipe()
     pid = os.fork()
     if pid != 0:
       # In the parent tine - block on ng being up for connections
-      return self._await_nailgun_server(stdout, stderr)
-
+      os.close(write_fd)
+      with os.fdopen(read_fd, 'r') as child:
+        spawned = child.read().strip()
+      os.waitpid(pid, 0)
+      if not spawned:
+        raise NailgunClient.NailgunError('Failed to spawn ng server.')
+      return self._await_nailgun_server(fingerprint, int(spawned), stdout, stderr)
+
+    os.close(read_fd)
     os.setsid()
     in_fd = open('/dev/null', 'r')
     out_fd = safe_open(self._ng_out, 'w')
@@ -297,6 +647,8 @@ class NailgunExecutor(Executor):
                          close_fds=True)
 
     log.debug('Spawned ng server with fingerprint %s @ %d' % (fingerprint, process.pid))
+    os.write(write_fd, str(process.pid))
+    os.close(write_fd)
     # Prevents finally blocks and atexit handlers from being executed, unlike sys.exit(). We
     # don't want to execute finally blocks because we might, e.g., clean up tempfiles that the
     # parent still needs.
@@ -51,6 +51,9 @@ class HtmlReporter(Reporter):
     # We redirect stdout, stderr etc. of tool invocations to these files.
     self._output_files = defaultdict(dict)  # workunit_id -> {path -> fileobj}.
 
+    # Whether workunits have ended since the timings and cache stats were last rendered.
+    self._summaries_stale = False
+
   def report_path(self):
     """The path to the main report file."""
     return os.path.join(self._html_dir, 'build.html')
@@ -62,6 +65,7 @@ class HtmlReporter(Reporter):
 
   def close(self):
     """Implementation of Reporter callback."""
+    self.render_summaries()
     self._report_file.close()
     # Make sure everything's closed.
     for files in self._output_files.values():
@@ -133,6 +137,19 @@ class HtmlReporter(Reporter):
     s += self._renderer.render_name('workunit_end', args)
     self._emit(s)
 
+    # Re-rendering the summaries after every workunit would make reporting quadratic in the number
+    # of workunits, so they're just marked stale here and re-rendered periodically.
+    self._summaries_stale = True
+
+    for f in self._output_files[workunit.id].values():
+      f.close()
+
+  def render_summaries(self):
+    """Implementation of Reporter callback."""
+    if not self._summaries_stale:
+      return
+    self._summaries_stale = False
+
     # Update the timings.
     def render_timings(timings):
       timings_dict = timings.get_all()
@@ -168,9 +185,6 @@ class HtmlReporter(Reporter):
     self._overwrite('artifact_cache_stats',
                     render_cache_stats(self.run_tracker.artifact_cache_stats))
 
-    for f in self._output_files[workunit.id].values():
-      f.close()
-
   def handle_output(self, workunit, label, s):
     """Implementation of Reporter callback."""
     if os.path.exists(self._html_dir):  # Make sure we're not immediately after a clean-all.
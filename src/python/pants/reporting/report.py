@@ -94,6 +94,11 @@ class Report(object):
     with self._lock:
       self._notify()
 
+  def render_summaries(self):
+    with self._lock:
+      for reporter in self._reporters.values():
+        reporter.render_summaries()
+
   def close(self):
     self._emitter_thread.stop()
     with self._lock:
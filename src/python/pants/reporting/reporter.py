@@ -40,6 +40,13 @@ class Reporter(object):
     """A workunit has finished."""
     pass
 
+  def render_summaries(self):
+    """Bring any summaries of the run so far, e.g., aggregated timings, up to date.
+
+    Called periodically from a background thread, and once more when the run ends.
+    """
+    pass
+
   def handle_log(self, workunit, level, *msg_elements):
     """Handle a message logged by pants code.
 
@@ -6,11 +6,14 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import BaseHTTPServer
+import hashlib
 import itertools
 import json
 import os
 import pkgutil
 import re
+import SocketServer
+import threading
 import urllib
 import urlparse
 from collections import namedtuple
@@ -30,13 +33,100 @@ from pants.util.dirutil import safe_mkdir
 PPP_RE=re.compile("""^lang-.*\.js$""")
 
 
+class RunIndex(object):
+  """An in-memory index of the RunInfos of all pants runs under an info dir.
+
+  The index is brought up to date incrementally on each access: a run's info file is only re-read
+  when it changes, and finished runs, whose info files never change again, are not even stat'ed.
+  """
+
+  # The key RunTracker adds last, once a run is over.
+  _FINISHED_KEY = 'outcome'
+
+  class _Run(namedtuple('_Run', ['stat', 'info'])):
+    """A run's info, and the (mtime, size) of its info file when the info was read."""
+
+  def __init__(self, info_dir):
+    self._info_dir = info_dir
+    self._runs = {}  # run id -> _Run.
+    self._not_runs = set()  # Names under the info dir that are not run dirs, e.g., 'latest'.
+    self._lock = threading.Lock()
+
+  def get(self, run_id):
+    """Returns a copy of the info of the given run, or None if there is no such run.
+
+    :param string run_id: The id of a run, or 'latest' for the latest run.
+    """
+    if run_id == 'latest':
+      run_id = os.path.basename(os.path.realpath(os.path.join(self._info_dir, run_id)))
+    with self._lock:
+      run = self._update(run_id, self._runs.get(run_id))
+      if run is None:
+        self._runs.pop(run_id, None)
+        return None
+      self._runs[run_id] = run
+      return run.info.copy()
+
+  def get_all(self):
+    """Returns a copy of the info of each run that has started, in no particular order."""
+    with self._lock:
+      self._refresh()
+      return [run.info.copy() for run in self._runs.values() if 'timestamp' in run.info]
+
+  def _refresh(self):
+    try:
+      names = set(os.listdir(self._info_dir))
+    except OSError:
+      names = set()
+
+    for run_id in set(self._runs) - names:
+      del self._runs[run_id]
+    self._not_runs &= names
+
+    for name in names - self._not_runs:
+      run = self._runs.get(name)
+      if run is None:
+        path = os.path.join(self._info_dir, name)
+        if os.path.islink(path) or not os.path.isdir(path):
+          self._not_runs.add(name)
+          continue
+      run = self._update(name, run)
+      if run is None:
+        self._runs.pop(name, None)
+      else:
+        self._runs[name] = run
+
+  def _update(self, run_id, run):
+    """Returns the given indexed run, re-reading its info file if it may have changed."""
+    if run is not None and self._FINISHED_KEY in run.info:
+      return run
+    info_file = os.path.join(self._info_dir, run_id, 'info')
+    try:
+      stat = os.stat(info_file)
+    except OSError:
+      return None
+    stat = (stat.st_mtime, stat.st_size)
+    if run is not None and run.stat == stat:
+      return run
+    # RunInfo can only be appended to, so a read racing a write just sees a prefix of the info,
+    # and the write changes the file's size, so it will be read again.
+    return self._Run(stat, RunInfo(info_file).get_as_dict())
+
+
 class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
   """A handler that demultiplexes various pants reporting URLs."""
 
-  def __init__(self, settings, renderer, request, client_address, server):
+  # The most content returned for a single file by one poll; the client polls again for the rest.
+  MAX_POLL_BYTES = 1024 * 1024
+
+  # How long browsers may cache the assets embedded in our package without checking back.
+  ASSETS_MAX_AGE_SECS = 24 * 60 * 60
+
+  def __init__(self, settings, renderer, run_index, request, client_address, server):
     self._settings = settings  # An instance of ReportingServer.Settings.
     self._root = self._settings.root
     self._renderer = renderer
+    self._run_index = run_index
     self._client_address = client_address
     # The underlying handlers for specific URL prefixes.
     self._GET_handlers = [
@@ -149,20 +239,46 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
     self._send_content(self._renderer.render_name('file_content', args), 'text/html')
 
   def _handle_assets(self, relpath, params):
-    """Statically serve assets: js, css etc."""
+    """Statically serve assets: js, css etc.
+
+    Assets are served with an ETag, so browsers can cheaply check whether their copy is current.
+    The assets embedded in our package only change along with pants, so browsers may also cache
+    them for a while without checking.
+    """
     if self._settings.assets_dir:
       abspath = os.path.normpath(os.path.join(self._settings.assets_dir, relpath))
       with open(abspath, 'r') as infile:
         content = infile.read()
+      cache_control = 'no-cache'
     else:
       content = pkgutil.get_data(__name__, os.path.join('assets', relpath))
+      cache_control = 'max-age=%d' % self.ASSETS_MAX_AGE_SECS
+    etag = '"%s"' % hashlib.sha1(content).hexdigest()
+    headers = [('Cache-Control', cache_control), ('ETag', etag)]
+    if self.headers.getheader('If-None-Match') == etag:
+      self.send_response(304)
+      for header in headers:
+        self.send_header(*header)
+      self.end_headers()
+      return
     content_type = mimetypes.guess_type(relpath)[0] or 'text/plain'
-    self._send_content(content, content_type)
+    self._send_content(content, content_type, headers=headers)
 
   def _handle_poll(self, relpath, params):
-    """Handle poll requests for raw file contents."""
+    """Handle poll requests for raw file contents.
+
+    At most MAX_POLL_BYTES of each file are returned, and each file's content is written out as
+    soon as it's read, so that polling a large file neither holds it in memory nor stalls the
+    client.
+    """
     request = json.loads(params.get('q')[0])
-    ret = {}
+    # The response is streamed, so its length isn't known up front: the end of the content is
+    # signalled by closing the connection, as HTTP/1.0 allows.
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.end_headers()
+    self.wfile.write('{')
+    first = True
     # request is a polling request for multiple files. For each file:
     #  - id is some identifier assigned by the client, used to differentiate the results.
     #  - path is the file to poll.
@@ -177,9 +293,31 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
           with open(abspath, 'r') as infile:
             if pos:
               infile.seek(pos)
-            content = infile.read()
-            ret[_id] = content
-    self._send_content(json.dumps(ret), 'application/json')
+            content = infile.read(self.MAX_POLL_BYTES)
+          if len(content) == self.MAX_POLL_BYTES:
+            content = self._utf8_prefix(content)
+          self.wfile.write('%s%s: %s' % ('' if first else ', ', json.dumps(unicode(_id)),
+                                         json.dumps(content)))
+          first = False
+    self.wfile.write('}')
+
+  @staticmethod
+  def _utf8_prefix(content):
+    """Drops any utf-8 sequence cut short at the end of content, so the rest can be decoded."""
+    for i in range(1, min(4, len(content)) + 1):
+      byte = ord(content[-i])
+      if byte & 0xC0 != 0x80:
+        # Not a continuation byte, so it starts the last sequence: keep that only if it's complete.
+        if byte < 0x80:
+          length = 1
+        elif byte >= 0xF0:
+          length = 4
+        elif byte >= 0xE0:
+          length = 3
+        else:
+          length = 2
+        return content if length <= i else content[:-i]
+    return content
 
   def _handle_latest_runid(self, relpath, params):
     """Handle request for the latest run id.
@@ -219,25 +357,13 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
   def _get_run_info_dict(self, run_id):
     """Get the RunInfo for a run, as a dict."""
-    run_info_path = os.path.join(self._settings.info_dir, run_id, 'info')
-    if os.path.exists(run_info_path):
-      # We copy the RunInfo as a dict, so we can add stuff to it to pass to the template.
-      return RunInfo(run_info_path).get_as_dict()
-    else:
-      return None
+    # The index hands out copies, so we can add stuff to them to pass to the template.
+    return self._run_index.get(run_id)
 
   def _get_all_run_infos(self):
     """Find the RunInfos for all runs since the last clean-all."""
-    info_dir = self._settings.info_dir
-    if not os.path.isdir(info_dir):
-      return []
-    paths = [os.path.join(info_dir, x) for x in os.listdir(info_dir)]
-
-    # We copy the RunInfo as a dict, so we can add stuff to it to pass to the template.
-    # We filter only those that have a timestamp, to avoid a race condition with writing
-    # that field.
-    return filter(lambda d: 'timestamp' in d, [RunInfo(os.path.join(p, 'info')).get_as_dict()
-            for p in paths if os.path.isdir(p) and not os.path.islink(p)])
+    # We get only those that have a timestamp, to avoid a race condition with writing that field.
+    return self._run_index.get_all()
 
   def _serve_dir(self, abspath, params):
     """Show a directory listing."""
@@ -264,11 +390,13 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                   'link_path': link_path })
     self._send_content(self._renderer.render_name('base', args), 'text/html')
 
-  def _send_content(self, content, content_type, code=200):
+  def _send_content(self, content, content_type, code=200, headers=None):
     """Send content to client."""
     self.send_response(code)
     self.send_header('Content-Type', content_type)
     self.send_header('Content-Length', str(len(content)))
+    for header in headers or ():
+      self.send_header(*header)
     self.end_headers()
     self.wfile.write(content)
 
@@ -322,6 +450,12 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
     pass
 
 
+class _ThreadedHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """Serves each request in its own thread, so a slow request doesn't stall other clients."""
+
+  daemon_threads = True
+
+
 class ReportingServer(object):
   # Reporting server settings.
   #   info_dir: path to dir containing RunInfo files.
@@ -336,12 +470,13 @@ class ReportingServer(object):
 
   def __init__(self, port, settings):
     renderer = MustacheRenderer(settings.template_dir, __name__)
+    run_index = RunIndex(settings.info_dir)
 
     class MyHandler(PantsHandler):
       def __init__(self, request, client_address, server):
-        PantsHandler.__init__(self, settings, renderer, request, client_address, server)
+        PantsHandler.__init__(self, settings, renderer, run_index, request, client_address, server)
 
-    self._httpd = BaseHTTPServer.HTTPServer(('', port), MyHandler)
+    self._httpd = _ThreadedHTTPServer(('', port), MyHandler)
     self._httpd.timeout = 0.1  # Not the network timeout, but how often handle_request yields.
 
   def server_port(self):
@@ -350,6 +485,11 @@ class ReportingServer(object):
   def start(self):
     self._httpd.serve_forever()
 
+  def shutdown(self):
+    """Stops a server started in another thread."""
+    self._httpd.shutdown()
+    self._httpd.server_close()
+
 
 class ReportingServerManager(object):
   @staticmethod
@@ -0,0 +1,55 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import tempfile
+
+import unittest2 as unittest
+
+from pants.base.address_map_cache import AddressMapCache
+from pants.util.dirutil import safe_open, safe_rmtree
+
+
+class AddressMapCacheTest(unittest.TestCase):
+  def setUp(self):
+    path = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, path)
+    self.cache_path = os.path.join(path, 'address_maps')
+
+  def test_get_requires_matching_key(self):
+    cache = AddressMapCache(self.cache_path)
+    cache.put('a/BUILD', 'key1', b'payload')
+    cache.save()
+
+    cache = AddressMapCache(self.cache_path)
+    self.assertEqual(b'payload', cache.get('a/BUILD', 'key1'))
+    self.assertIsNone(cache.get('a/BUILD', 'key2'))
+    self.assertIsNone(cache.get('b/BUILD', 'key1'))
+
+  def test_uncacheable_recorded(self):
+    cache = AddressMapCache(self.cache_path)
+    cache.put('a/BUILD', 'key1', None)
+    self.assertTrue(cache.contains('a/BUILD', 'key1'))
+    self.assertIsNone(cache.get('a/BUILD', 'key1'))
+    self.assertFalse(cache.contains('a/BUILD', 'key2'))
+
+  def test_save_merges_concurrent_writers(self):
+    cache1 = AddressMapCache(self.cache_path)
+    cache2 = AddressMapCache(self.cache_path)
+    cache1.put('a/BUILD', 'key', b'a')
+    cache2.put('b/BUILD', 'key', b'b')
+    cache1.save()
+    cache2.save()
+
+    cache = AddressMapCache(self.cache_path)
+    self.assertEqual(b'a', cache.get('a/BUILD', 'key'))
+    self.assertEqual(b'b', cache.get('b/BUILD', 'key'))
+
+  def test_corrupt_cache_file_ignored(self):
+    with safe_open(self.cache_path, 'w') as fp:
+      fp.write('garbage')
+    self.assertIsNone(AddressMapCache(self.cache_path).get('a/BUILD', 'key'))
@@ -53,6 +53,7 @@ class BuildFileTest(unittest.TestCase):
     BuildFileTest.makedirs('grandparent/parent/child4')
     BuildFileTest.makedirs('path-that-does-exist')
     BuildFileTest.touch('path-that-does-exist/BUILD.invalid.suffix')
+    BuildFileTest.touch('grandparent/parent/node_modules/BUILD')
 
 
   @classmethod
@@ -166,6 +167,15 @@ class BuildFileTest(unittest.TestCase):
       BuildFileTest.buildfile('grandparent/parent/child2/child3/BUILD'),
       ]), buildfiles)
 
+  def test_ignored_directories_skipped(self):
+    buildfiles = BuildFile.scan_buildfiles(BuildFileTest.root_dir, 'grandparent/parent')
+    self.assertNotIn(BuildFileTest.buildfile('grandparent/parent/node_modules/BUILD'), buildfiles)
+
+    # An ignored directory can still be scanned explicitly.
+    self.assertEquals(
+      OrderedSet([BuildFileTest.buildfile('grandparent/parent/node_modules/BUILD')]),
+      BuildFile.scan_buildfiles(BuildFileTest.root_dir, 'grandparent/parent/node_modules'))
+
   def test_invalid_root_dir_error(self):
     BuildFileTest.touch('BUILD')
     with self.assertRaises(BuildFile.InvalidRootDirError):
@@ -0,0 +1,116 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import tempfile
+import time
+
+import unittest2 as unittest
+
+from pants.base.build_file_index import (BuildFileIndex, get_build_file_index,
+                                         set_build_file_index)
+from pants.util.dirutil import safe_mkdir, safe_rmtree, touch
+
+
+def is_build_file(name):
+  return name.startswith('BUILD')
+
+
+class BuildFileIndexTest(unittest.TestCase):
+  # Far enough in the past that the directories under test are never racily clean.
+  OLD = int(time.time()) - 3600
+
+  def setUp(self):
+    self.root_dir = self.create_dir()
+    self.index_path = os.path.join(self.create_dir(), 'index')
+
+  def create_dir(self):
+    path = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, path)
+    return path
+
+  def touch(self, *relpaths):
+    for relpath in relpaths:
+      path = os.path.join(self.root_dir, relpath)
+      safe_mkdir(os.path.dirname(path))
+      touch(path)
+    self.age()
+
+  def age(self, mtime=OLD):
+    for root, dirs, _ in os.walk(self.root_dir):
+      for name in dirs:
+        os.utime(os.path.join(root, name), (mtime, mtime))
+    os.utime(self.root_dir, (mtime, mtime))
+
+  def scan(self, index, base_path=None):
+    return sorted(index.scan(self.root_dir, is_build_file, base_path))
+
+  def test_scan(self):
+    self.touch('BUILD', 'a/BUILD', 'a/BUILD.extra', 'a/b/BUILD', 'a/b/c.py', 'd/e/BUILD')
+    self.assertEqual(['BUILD', 'a/BUILD', 'a/BUILD.extra', 'a/b/BUILD', 'd/e/BUILD'],
+                     self.scan(BuildFileIndex()))
+    self.assertEqual(['a/b/BUILD'], self.scan(BuildFileIndex(), 'a/b'))
+    self.assertEqual([], self.scan(BuildFileIndex(), 'missing'))
+
+  def test_ignore_patterns(self):
+    self.touch('a/BUILD', 'dist/BUILD', 'a/node_modules/BUILD', 'b/gen/BUILD', 'a/gen/BUILD')
+    self.assertEqual(['a/BUILD', 'a/gen/BUILD', 'b/gen/BUILD'], self.scan(BuildFileIndex()))
+
+    index = BuildFileIndex(ignore_patterns=['b/gen', 'node_*'])
+    self.assertEqual(['a/BUILD', 'a/gen/BUILD', 'dist/BUILD'], self.scan(index))
+
+  def test_symlinked_directories_not_followed(self):
+    self.touch('a/BUILD')
+    os.symlink(os.path.join(self.root_dir, 'a'), os.path.join(self.root_dir, 'b'))
+    self.assertEqual(['a/BUILD'], self.scan(BuildFileIndex()))
+
+  def test_persisted_across_instances(self):
+    self.touch('a/BUILD', 'a/b/BUILD')
+    index = BuildFileIndex(self.index_path)
+    self.scan(index)
+    index.save()
+
+    # Add a BUILD file behind the index's back keeping the directory's stat identical; the cached
+    # listing is used, proving the directory was not re-listed.
+    self.touch('a/BUILD.extra')
+    self.assertEqual(['a/BUILD', 'a/b/BUILD'], self.scan(BuildFileIndex(self.index_path)))
+
+  def test_changed_directory_relisted(self):
+    self.touch('a/BUILD', 'a/b/BUILD')
+    index = BuildFileIndex(self.index_path)
+    self.scan(index)
+    index.save()
+
+    self.touch('a/b/BUILD.extra', 'a/b/c/BUILD')
+    self.age(self.OLD + 60)
+    self.assertEqual(['a/BUILD', 'a/b/BUILD', 'a/b/BUILD.extra', 'a/b/c/BUILD'],
+                     self.scan(BuildFileIndex(self.index_path)))
+
+  def test_racily_clean_directory_not_cached(self):
+    self.touch('a/BUILD')
+    self.age(time.time())
+    index = BuildFileIndex(self.index_path)
+    self.scan(index)
+    index.save()
+    self.assertFalse(os.path.exists(self.index_path))
+
+  def test_corrupt_index_file_ignored(self):
+    self.touch('a/BUILD')
+    with open(self.index_path, 'w') as fp:
+      fp.write('garbage')
+    self.assertEqual(['a/BUILD'], self.scan(BuildFileIndex(self.index_path)))
+
+  def test_set_build_file_index(self):
+    previous = get_build_file_index()
+    index = BuildFileIndex()
+    set_build_file_index(index)
+    try:
+      self.assertIs(index, get_build_file_index())
+      with self.assertRaises(ValueError):
+        set_build_file_index(object())
+    finally:
+      set_build_file_index(previous)
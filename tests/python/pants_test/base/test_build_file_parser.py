@@ -8,6 +8,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
 import os
 from textwrap import dedent
 
+from mock import patch
 import pytest
 
 from pants.backend.jvm.targets.artifact import Artifact
@@ -16,6 +17,8 @@ from pants.backend.jvm.targets.jar_library import JarLibrary
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.backend.jvm.targets.scala_library import ScalaLibrary
 from pants.base.address import BuildFileAddress
+from pants.base.address_map_cache import AddressMapCache
+from pants.base.build_configuration import BuildConfiguration
 from pants.base.build_file import BuildFile
 from pants.base.build_file_aliases import BuildFileAliases
 from pants.base.build_file_parser import BuildFileParser
@@ -345,3 +348,127 @@ class BuildFileParserExposedContextAwareObjectFactoryTest(BaseTest):
     self.assertIsInstance(BuildFileParser.SiblingConflictException(), BuildFileParser.BuildFileParserError)
     self.assertIsInstance(BuildFileParser.ParseError(), BuildFileParser.BuildFileParserError)
     self.assertIsInstance(BuildFileParser.ExecuteError(), BuildFileParser.BuildFileParserError)
+
+
+def impure_rel_path(parse_context):
+  return lambda: parse_context.rel_path
+
+
+def pure_rel_path(parse_context):
+  return lambda: parse_context.rel_path
+pure_rel_path.pure = True
+
+
+class RelPath(object):
+  def __init__(self, rel_path):
+    self.rel_path = rel_path
+
+
+def impure_rel_path_object(parse_context):
+  return RelPath(parse_context.rel_path)
+
+
+def count():
+  BuildFileParserCacheTest.calls += 1
+  return BuildFileParserCacheTest.calls
+# Calls are counted to tell whether a BUILD file was executed, so may be cached like pure ones.
+count.pure = True
+
+
+def unmarked_count():
+  return count()
+
+
+class BuildFileParserCacheTest(BaseTest):
+  # Counts calls to `count()` made by BUILD files executed in this process.
+  calls = 0
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(
+      targets={'fake': ErrorTarget},
+      objects={'count': count, 'unmarked_count': unmarked_count},
+      context_aware_object_factories={'impure': impure_rel_path,
+                                      'impure_object': impure_rel_path_object,
+                                      'pure': pure_rel_path})
+
+  def setUp(self):
+    super(BuildFileParserCacheTest, self).setUp()
+    BuildFileParserCacheTest.calls = 0
+    self.cache_path = os.path.join(self.build_root, '.pants.d', 'address_maps')
+
+  def build_configuration(self):
+    build_configuration = BuildConfiguration()
+    build_configuration.register_aliases(self.alias_groups)
+    return build_configuration
+
+  def parser(self, prefetch_pool=None):
+    return BuildFileParser(self.build_configuration(), self.build_root,
+                           address_map_cache=AddressMapCache(self.cache_path),
+                           prefetch_pool=prefetch_pool)
+
+  def parse(self, relpath):
+    parser = self.parser()
+    address_map = parser.parse_build_file(BuildFile(self.build_root, relpath))
+    parser.save_cache()
+    return dict((address.target_name, proxy.kwargs) for address, proxy in address_map.items())
+
+  def test_cached_address_map_not_executed(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=count(), path=pure())")
+    self.assertEqual({'foo': {'name': 'foo', 'value': 1, 'path': 'a'}}, self.parse('a/BUILD'))
+    self.assertEqual({'foo': {'name': 'foo', 'value': 1, 'path': 'a'}}, self.parse('a/BUILD'))
+    self.assertEqual(1, self.calls)
+
+  def test_changed_build_file_executed(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=count())")
+    self.parse('a/BUILD')
+    self.add_to_build_file('a/BUILD', "\nfake(name='bar', value=count())")
+    self.assertEqual({'foo': {'name': 'foo', 'value': 2}, 'bar': {'name': 'bar', 'value': 3}},
+                     self.parse('a/BUILD'))
+
+  def test_impure_build_file_executed(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=count(), path=impure())")
+    self.parse('a/BUILD')
+    self.assertEqual({'foo': {'name': 'foo', 'value': 2, 'path': 'a'}}, self.parse('a/BUILD'))
+
+  def test_build_file_calling_unmarked_function_executed(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=unmarked_count())")
+    self.parse('a/BUILD')
+    self.assertEqual({'foo': {'name': 'foo', 'value': 2}}, self.parse('a/BUILD'))
+
+  def test_pants_version_in_cache_key(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=count())")
+    self.parse('a/BUILD')
+    with patch('pants.base.build_file_parser.pants_version', return_value='0.0.0-upgraded'):
+      self.assertEqual({'foo': {'name': 'foo', 'value': 2}}, self.parse('a/BUILD'))
+
+  def test_build_file_holding_impure_object_executed(self):
+    self.add_to_build_file('a/BUILD', "fake(name='foo', value=count(), path=impure_object)")
+    _, payload = self.parser()._parse_build_file(BuildFile(self.build_root, 'a/BUILD'))
+    self.assertIsNone(payload)
+    address_map = self.parse('a/BUILD')
+    self.assertEqual(2, address_map['foo']['value'])
+    self.assertEqual('a', address_map['foo']['path'].rel_path)
+
+  def test_importing_build_file_executed(self):
+    self.add_to_build_file('a/BUILD', "import os\nfake(name='foo', value=count())")
+    self.parse('a/BUILD')
+    self.assertEqual({'foo': {'name': 'foo', 'value': 2}}, self.parse('a/BUILD'))
+
+  def test_prefetch(self):
+    for name in ('a', 'b', 'c'):
+      self.add_to_build_file('{0}/BUILD'.format(name), "fake(name='foo', value=count())")
+    self.add_to_build_file('d/BUILD', "fake(name='foo', value=count(), path=impure())")
+    build_files = [BuildFile(self.build_root, name) for name in 'abcd']
+
+    pool = BuildFileParser.create_prefetch_pool(self.build_configuration(), self.build_root, 2)
+    self.addCleanup(pool.terminate)
+    parser = self.parser(prefetch_pool=pool)
+    parser.PREFETCH_BATCH_SIZE = 1
+    parser.prefetch(build_files)
+    address_maps = [parser.parse_build_file(build_file) for build_file in build_files]
+
+    # Only the impure BUILD file had to be executed in this process.
+    self.assertEqual(1, self.calls)
+    self.assertEqual(['foo'] * 4,
+                     [address.target_name for address_map in address_maps for address in address_map])
@@ -10,7 +10,10 @@ import os
 import tempfile
 from contextlib import contextmanager
 
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+import pytest
+
+from pants.base.build_invalidator import (BuildInvalidator, CacheKey, CacheKeyGenerator,
+                                          GLOBAL_CACHE_KEY_GEN_VERSION, LogStore)
 from pants.util.contextutil import temporary_dir
 
 
@@ -58,3 +61,113 @@ def test_env(content=TEST_CONTENT):
 #     assert cache.needs_update(key)
 #     cache.update(key)
 #     assert not cache.needs_update(key)
+
+
+def cache_key(id, hash):
+  return CacheKey(id, hash, 1, [])
+
+
+@pytest.fixture(params=sorted(BuildInvalidator.STORES))
+def store(request):
+  return request.param
+
+
+def test_update_persists(store):
+  with temporary_dir() as d:
+    invalidator = BuildInvalidator(d, store=store)
+    key = cache_key('a.b', 'abc123')
+    assert invalidator.needs_update(key)
+    invalidator.update(key)
+    invalidator.flush()
+    assert not invalidator.needs_update(key)
+
+    reloaded = BuildInvalidator(d, store=store)
+    assert not reloaded.needs_update(key)
+    assert 'abc123' == reloaded.existing_hash('a.b')
+    assert reloaded.needs_update(cache_key('a.b', 'def456'))
+
+
+def test_force_invalidate_persists_without_flush(store):
+  with temporary_dir() as d:
+    invalidator = BuildInvalidator(d, store=store)
+    key = cache_key('a.b', 'abc123')
+    invalidator.update(key)
+    invalidator.flush()
+    invalidator.force_invalidate(key)
+    assert invalidator.needs_update(key)
+    assert BuildInvalidator(d, store=store).needs_update(key)
+
+
+def test_force_invalidate_all(store):
+  with temporary_dir() as d:
+    invalidator = BuildInvalidator(d, store=store)
+    keys = [cache_key('a', '1'), cache_key('b', '2')]
+    for key in keys:
+      invalidator.update(key)
+    invalidator.flush()
+    BuildInvalidator(d, store=store).force_invalidate_all()
+    reloaded = BuildInvalidator(d, store=store)
+    assert all(reloaded.needs_update(key) for key in keys)
+
+
+def test_unknown_store():
+  with temporary_dir() as d:
+    with pytest.raises(ValueError):
+      BuildInvalidator(d, store='bogus')
+
+
+def test_log_store_migrates_file_per_key_layout():
+  with temporary_dir() as d:
+    legacy = BuildInvalidator(d, store='files')
+    key = cache_key('src.java.a', 'abc123')
+    legacy.update(key)
+
+    migrated = BuildInvalidator(d, store='log')
+    assert not migrated.needs_update(key)
+    store_root = os.path.join(d, GLOBAL_CACHE_KEY_GEN_VERSION)
+    assert [LogStore.LOG_NAME, LogStore.LOG_NAME + '.lock'] == sorted(os.listdir(store_root))
+
+
+def test_log_store_drops_hashed_file_names():
+  with temporary_dir() as d:
+    legacy = BuildInvalidator(d, store='files')
+    # Too long for a file name, so the legacy store names its file with a digest of the id.
+    long_key = cache_key('src.java.' + 'a' * 300, 'abc123')
+    legacy.update(long_key)
+
+    migrated = BuildInvalidator(d, store='log')
+    assert migrated.needs_update(long_key)
+    assert migrated.needs_update(cache_key(hashlib.sha1(long_key.id).hexdigest(), 'abc123'))
+    store_root = os.path.join(d, GLOBAL_CACHE_KEY_GEN_VERSION)
+    assert not [name for name in os.listdir(store_root) if name.endswith('.hash')]
+
+
+def test_log_store_ignores_torn_record():
+  with temporary_dir() as d:
+    invalidator = BuildInvalidator(d, store='log')
+    invalidator.update(cache_key('a', '1'))
+    invalidator.flush()
+    log = os.path.join(d, GLOBAL_CACHE_KEY_GEN_VERSION, LogStore.LOG_NAME)
+    with open(log, 'ab') as fd:
+      fd.write(b'2\tb')
+
+    assert BuildInvalidator(d, store='log').needs_update(cache_key('b', '2'))
+    invalidator = BuildInvalidator(d, store='log')
+    invalidator.update(cache_key('c', '3'))
+    invalidator.flush()
+    reloaded = BuildInvalidator(d, store='log')
+    assert not reloaded.needs_update(cache_key('a', '1'))
+    assert not reloaded.needs_update(cache_key('c', '3'))
+
+
+def test_log_store_compacts():
+  with temporary_dir() as d:
+    invalidator = BuildInvalidator(d, store='log')
+    for i in range(LogStore.COMPACTION_SLACK + 10):
+      invalidator.update(cache_key('a', str(i)))
+      invalidator.flush()
+    log = os.path.join(d, GLOBAL_CACHE_KEY_GEN_VERSION, LogStore.LOG_NAME)
+    reloaded = BuildInvalidator(d, store='log')
+    assert not reloaded.needs_update(cache_key('a', str(LogStore.COMPACTION_SLACK + 9)))
+    with open(log, 'rb') as fd:
+      assert 1 == len(fd.readlines())
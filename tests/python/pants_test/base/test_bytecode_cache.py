@@ -0,0 +1,99 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import tempfile
+
+import unittest2 as unittest
+
+from pants.base.build_file import BuildFile
+from pants.base.bytecode_cache import BytecodeCache, get_bytecode_cache, set_bytecode_cache
+from pants.util.dirutil import safe_open, safe_rmtree
+
+
+class BytecodeCacheTest(unittest.TestCase):
+  def setUp(self):
+    path = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, path)
+    self.store = os.path.join(path, 'bytecode')
+
+  def evaluate(self, code):
+    scope = {}
+    exec(code, scope)
+    return scope['x']
+
+  def assert_cached(self, cache, source):
+    # A cached entry is returned without compiling the source.
+    self.assertEqual(1, len(cache._load()))
+    self.assertEqual(42, self.evaluate(cache.compile(source)))
+    self.assertFalse(cache._unsaved)
+
+  def test_persisted_across_instances(self):
+    cache = BytecodeCache(self.store)
+    self.assertEqual(42, self.evaluate(cache.compile(b'x = 42')))
+    cache.save()
+    self.assert_cached(BytecodeCache(self.store), b'x = 42')
+
+  def test_keyed_by_interpreter_identity(self):
+    cache = BytecodeCache(self.store, identity='CPython-2.7.0')
+    cache.compile(b'x = 42')
+    cache.save()
+
+    cache = BytecodeCache(self.store, identity='CPython-2.7.1')
+    cache.compile(b'x = 42')
+    self.assertEqual(set(cache._compiled), cache._unsaved)
+
+  def test_torn_record_dropped(self):
+    cache = BytecodeCache(self.store)
+    cache.compile(b'x = 42')
+    cache.save()
+    with open(self.store, 'ab') as store:
+      store.write(b'\0' * 10)
+
+    cache = BytecodeCache(self.store)
+    cache.compile(b'x = 1')
+    cache.save()
+
+    cache = BytecodeCache(self.store)
+    self.assertEqual(2, len(cache._load()))
+    self.assertEqual(42, self.evaluate(cache.compile(b'x = 42')))
+    self.assertFalse(cache._unsaved)
+
+  def test_foreign_store_replaced(self):
+    with safe_open(self.store, 'wb') as store:
+      store.write(b'garbage that is not a bytecode store')
+    cache = BytecodeCache(self.store)
+    cache.compile(b'x = 42')
+    cache.save()
+    self.assert_cached(BytecodeCache(self.store), b'x = 42')
+
+  def test_compaction(self):
+    cache = BytecodeCache(self.store, max_size=0)
+    cache.compile(b'x = 1')
+    cache.save()
+    cache = BytecodeCache(self.store, max_size=0)
+    cache.compile(b'x = 42')
+    cache.save()
+
+    # Only the entries used by the last process survive compaction.
+    self.assert_cached(BytecodeCache(self.store), b'x = 42')
+
+  def test_build_file_code_uses_registered_cache(self):
+    root = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, root)
+    with safe_open(os.path.join(root, 'BUILD'), 'w') as fp:
+      fp.write('x = 42')
+
+    previous = get_bytecode_cache()
+    cache = BytecodeCache(self.store)
+    set_bytecode_cache(cache)
+    try:
+      self.assertEqual(42, self.evaluate(BuildFile(root, '').code()))
+      self.assertEqual(1, len(cache._compiled))
+    finally:
+      set_bytecode_cache(previous)
+    self.assertEqual([], [name for name in os.listdir(root) if name.endswith('.pyc')])
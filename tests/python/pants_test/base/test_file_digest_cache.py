@@ -0,0 +1,103 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import hashlib
+import os
+import tempfile
+import time
+
+import unittest2 as unittest
+
+from pants.base.file_digest_cache import (FileDigestCache, file_digest, get_file_digest_cache,
+                                          set_file_digest_cache)
+from pants.util.dirutil import safe_open, safe_rmtree
+
+
+class FileDigestCacheTest(unittest.TestCase):
+  # Far enough in the past that the files under test are never racily clean.
+  OLD = int(time.time()) - 3600
+
+  def setUp(self):
+    self.build_root = self.create_dir()
+    self.cache_path = os.path.join(self.create_dir(), 'digests')
+
+  def create_dir(self):
+    path = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, path)
+    return path
+
+  def write(self, relpath, content, mtime=OLD):
+    path = os.path.join(self.build_root, relpath)
+    with safe_open(path, 'w') as fp:
+      fp.write(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+  def test_digest(self):
+    path = self.write('a.txt', 'jake')
+    self.assertEqual(hashlib.sha1('jake').hexdigest(), FileDigestCache(self.cache_path).digest(path))
+
+  def test_persisted_across_instances(self):
+    path = self.write('a.txt', 'jake')
+    cache = FileDigestCache(self.cache_path)
+    cache.digest(path)
+    cache.save()
+
+    # Swap the content behind the cache's back keeping the stat key identical; the cached digest
+    # is returned, proving the file was not re-read.
+    self.write('a.txt', 'fake')
+    self.assertEqual(hashlib.sha1('jake').hexdigest(), FileDigestCache(self.cache_path).digest(path))
+
+  def test_changed_file_rehashed(self):
+    path = self.write('a.txt', 'jake')
+    cache = FileDigestCache(self.cache_path)
+    cache.digest(path)
+    cache.save()
+
+    self.write('a.txt', 'jones', mtime=self.OLD + 60)
+    self.assertEqual(hashlib.sha1('jones').hexdigest(), FileDigestCache(self.cache_path).digest(path))
+
+  def test_racily_clean_file_not_cached(self):
+    path = self.write('a.txt', 'jake', mtime=time.time())
+    cache = FileDigestCache(self.cache_path)
+    cache.digest(path)
+    cache.save()
+    self.assertFalse(os.path.exists(self.cache_path))
+
+  def test_save_merges_concurrent_writers(self):
+    a = self.write('a.txt', 'jake')
+    b = self.write('b.txt', 'jones')
+
+    cache1 = FileDigestCache(self.cache_path)
+    cache2 = FileDigestCache(self.cache_path)
+    cache1.digest(a)
+    cache2.digest(b)
+    cache1.save()
+    cache2.save()
+
+    cache3 = FileDigestCache(self.cache_path)
+    cache3.digest(a)
+    cache3.digest(b)
+    cache3.save()
+    self.assertEqual(set([a, b]), set(cache3._read().keys()))
+
+  def test_corrupt_cache_file_ignored(self):
+    path = self.write('a.txt', 'jake')
+    with safe_open(self.cache_path, 'w') as fp:
+      fp.write('garbage')
+    self.assertEqual(hashlib.sha1('jake').hexdigest(), FileDigestCache(self.cache_path).digest(path))
+
+  def test_file_digest_uses_registered_cache(self):
+    path = self.write('a.txt', 'jake')
+    previous = get_file_digest_cache()
+    cache = FileDigestCache()
+    set_file_digest_cache(cache)
+    try:
+      self.assertEqual(hashlib.sha1('jake').hexdigest(), file_digest(path))
+      self.assertIn(path, cache._load())
+    finally:
+      set_file_digest_cache(previous)
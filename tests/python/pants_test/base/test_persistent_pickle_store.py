@@ -0,0 +1,71 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import tempfile
+
+import unittest2 as unittest
+
+from pants.base.persistent_pickle_store import PersistentPickleStore
+from pants.util.dirutil import safe_rmtree
+
+
+class Store(PersistentPickleStore):
+  def get(self, key):
+    return self._load().get(key)
+
+  def put(self, key, value):
+    self._put(key, value)
+
+
+class PersistentPickleStoreTest(unittest.TestCase):
+  def setUp(self):
+    root = tempfile.mkdtemp()
+    self.addCleanup(safe_rmtree, root)
+    self.path = os.path.join(root, 'store', 'entries')
+
+  def test_saved_entries_loaded(self):
+    store = Store(self.path)
+    store.put('a', 1)
+    store.save()
+    self.assertEqual(1, Store(self.path).get('a'))
+    self.assertEqual(['entries'], os.listdir(os.path.dirname(self.path)))
+
+  def test_save_merges_concurrent_saves(self):
+    first, second = Store(self.path), Store(self.path)
+    first.get('a')
+    second.get('a')
+    first.put('a', 1)
+    second.put('b', 2)
+    first.save()
+    second.save()
+
+    store = Store(self.path)
+    self.assertEqual(1, store.get('a'))
+    self.assertEqual(2, store.get('b'))
+
+  def test_other_version_read_as_empty(self):
+    store = Store(self.path)
+    store.put('a', 1)
+    store.save()
+
+    class NewStore(Store):
+      VERSION = Store.VERSION + 1
+
+    self.assertIsNone(NewStore(self.path).get('a'))
+
+  def test_corrupt_file_read_as_empty(self):
+    os.makedirs(os.path.dirname(self.path))
+    with open(self.path, 'wb') as fp:
+      fp.write(b'garbage')
+    self.assertIsNone(Store(self.path).get('a'))
+
+  def test_in_memory(self):
+    store = Store()
+    store.put('a', 1)
+    store.save()
+    self.assertEqual(1, store.get('a'))
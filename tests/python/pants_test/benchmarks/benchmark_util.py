@@ -0,0 +1,32 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import time
+
+
+def best_of(repeat, func, setup=None):
+  """Returns the fastest wall time, in seconds, of `repeat` calls to func.
+
+  If given, setup is called before each call to func and is not timed.
+  """
+  best = None
+  for _ in range(repeat):
+    if setup:
+      setup()
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def report(label, seconds, units=None, unit_name='op'):
+  """Prints a single benchmark result line, with a per-unit cost if units is given."""
+  line = '{label:<40} {ms:10.1f} ms'.format(label=label, ms=seconds * 1000)
+  if units:
+    line += '  ({us:.1f} us/{unit})'.format(us=seconds * 1000000 / units, unit=unit_name)
+  print(line)
@@ -0,0 +1,50 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import hashlib
+
+from pants.base.build_invalidator import BuildInvalidator, CacheKey
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_rmtree
+from pants_test.benchmarks.benchmark_util import best_of, report
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Compares the BuildInvalidator stores for checking and updating many cache keys.')
+  parser.add_argument('--keys', type=int, default=20000)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  keys = [CacheKey('src.java.com.example.pkg{0}.pkg{0}'.format(i),
+                   hashlib.sha1(str(i)).hexdigest(), 1, [])
+          for i in range(args.keys)]
+
+  for store in sorted(BuildInvalidator.STORES):
+    with temporary_dir() as root:
+      def clean():
+        safe_rmtree(root)
+
+      def cold_run():
+        invalidator = BuildInvalidator(root, store=store)
+        for key in keys:
+          if invalidator.needs_update(key):
+            invalidator.update(key)
+        invalidator.flush()
+      report('{0}: check and update all'.format(store),
+             best_of(args.repeat, cold_run, setup=clean), args.keys, 'key')
+
+      def noop_run():
+        invalidator = BuildInvalidator(root, store=store)
+        for key in keys:
+          invalidator.needs_update(key)
+      report('{0}: no-op check'.format(store), best_of(args.repeat, noop_run), args.keys, 'key')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,85 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import random
+
+from twitter.common.collections import OrderedSet
+
+from pants_test.benchmarks.benchmark_util import best_of, report
+from pants_test.benchmarks.target_ordering_benchmark import create_graph
+
+
+def legacy_closure(build_graph, target):
+  """The full walk Target.closure used to make on every call."""
+  ret = OrderedSet()
+  build_graph.walk_transitive_dependency_graph([target.address], ret.add)
+  return ret
+
+
+def forget_closures(build_graph):
+  build_graph._closure_by_address.clear()
+  build_graph._reachable_by_address.clear()
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times target closures and dependency lookups, memoized and not, as tasks and '
+                  'group task chunking make them.')
+  parser.add_argument('--targets', type=int, default=20000)
+  parser.add_argument('--roots', type=int, default=20,
+                      help='The number of targets from the top of the graph to close over.')
+  parser.add_argument('--lookups', type=int, default=20000,
+                      help='The number of "is X a dependency of Y" lookups to make.')
+  parser.add_argument('--legacy-lookups', type=int, default=20,
+                      help='Time lookups by full walk for just this many of the lookups.')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  build_graph = create_graph(args.targets)
+  targets = build_graph.targets()
+  roots = targets[-args.roots:]
+  rng = random.Random(0)
+  pairs = [(rng.choice(roots), rng.choice(targets)) for _ in range(args.lookups)]
+
+  def legacy():
+    for root in roots:
+      legacy_closure(build_graph, root)
+  report('closure, full walk', best_of(args.repeat, legacy), len(roots), 'root')
+
+  def closures():
+    for root in roots:
+      root.closure()
+  report('closure (cold)', best_of(args.repeat, closures, setup=lambda: forget_closures(build_graph)),
+         len(roots), 'root')
+  report('closure (memoized)', best_of(args.repeat, closures), len(roots), 'root')
+
+  def legacy_lookups():
+    for dependent, dependency in pairs[:args.legacy_lookups]:
+      dependency in legacy_closure(build_graph, dependent)
+  report('lookup, full walk', best_of(1, legacy_lookups), args.legacy_lookups, 'lookup')
+
+  def lookups():
+    for dependent, dependency in pairs:
+      dependent.depends_on(dependency)
+  report('depends_on (cold)', best_of(args.repeat, lookups,
+                                      setup=lambda: forget_closures(build_graph)),
+         len(pairs), 'lookup')
+  report('depends_on (memoized)', best_of(args.repeat, lookups), len(pairs), 'lookup')
+
+  # Injecting a dependency updates the memoized reachability of its dependents in place.  Leaves
+  # are injected onto lower leaves so the graph's topological order needs no repair.
+  leaves = targets[:100]
+  def inject():
+    for dependent, dependency in zip(leaves[1:], leaves):
+      build_graph.inject_dependency(dependent.address, dependency.address)
+      for root in roots:
+        root.depends_on(dependency)
+  report('inject_dependency and re-lookup', best_of(1, inject), len(leaves) - 1, 'injection')
+
+if __name__ == '__main__':
+  main()
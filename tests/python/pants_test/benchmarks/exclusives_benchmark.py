@@ -0,0 +1,62 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+from collections import defaultdict
+
+from pants.base.target import Target
+from pants_test.benchmarks.benchmark_util import best_of, report
+from pants_test.benchmarks.target_ordering_benchmark import create_graph
+
+
+def legacy_propagate(target):
+  """The walk of its whole closure each target used to make to collect its exclusives."""
+  exclusives = defaultdict(set)
+  def add(t):
+    for key in t.declared_exclusives:
+      exclusives[key] |= t.declared_exclusives[key]
+  target.walk(add)
+  return exclusives
+
+
+def forget_exclusives(targets):
+  for target in targets:
+    target.exclusives = None
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times propagating exclusives through a synthetic graph, as check_exclusives '
+                  'does.')
+  parser.add_argument('--targets', type=int, default=10000)
+  parser.add_argument('--every', type=int, default=50,
+                      help='Declare exclusives on every this many targets.')
+  parser.add_argument('--legacy-targets', type=int, default=100,
+                      help='Time the legacy per-target walk for just this many targets.')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  build_graph = create_graph(args.targets)
+  targets = build_graph.targets()
+  for i, target in enumerate(targets[::args.every]):
+    target.declared_exclusives['key{0}'.format(i % 3)].add('value{0}'.format(i % 2))
+
+  def legacy():
+    for target in targets[-args.legacy_targets:]:
+      legacy_propagate(target)
+  report('legacy walk per target', best_of(1, legacy), args.legacy_targets, 'target')
+
+  def propagate():
+    Target.propagate_exclusives(targets)
+  report('propagate_exclusives', best_of(args.repeat, propagate,
+                                         setup=lambda: forget_exclusives(targets)),
+         len(targets), 'target')
+  print('{0} distinct exclusives maps'.format(len(set(id(t.exclusives) for t in targets))))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,73 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import os
+import time
+
+from pants.base.build_root import BuildRoot
+from pants.base.file_digest_cache import FileDigestCache, set_file_digest_cache
+from pants.base.payload import JvmTargetPayload
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_open
+from pants_test.benchmarks.benchmark_util import best_of, report
+
+
+def create_payloads(root, num_targets, sources_per_target, source_size):
+  """Creates a synthetic source tree and returns a JvmTargetPayload for each of its targets."""
+  content = b'x' * source_size
+  old = time.time() - 3600
+  payloads = []
+  for t in range(num_targets):
+    rel_path = os.path.join('src', 'java', 'pkg{0}'.format(t))
+    sources = ['Source{0}.java'.format(s) for s in range(sources_per_target)]
+    for source in sources:
+      path = os.path.join(root, rel_path, source)
+      with safe_open(path, 'wb') as fp:
+        fp.write(content)
+      os.utime(path, (old, old))
+    payloads.append(JvmTargetPayload(sources_rel_path=rel_path, sources=sources))
+  return payloads
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times a no-op payload invalidation pass with and without the FileDigestCache.')
+  parser.add_argument('--targets', type=int, default=2000)
+  parser.add_argument('--sources-per-target', type=int, default=8)
+  parser.add_argument('--source-size', type=int, default=4096)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  with temporary_dir() as root:
+    with BuildRoot().temporary(root):
+      payloads = create_payloads(root, args.targets, args.sources_per_target, args.source_size)
+      num_files = args.targets * args.sources_per_target
+      cache_path = os.path.join(root, '.pants.d', 'file_digests', 'digests.pickle')
+
+      def invalidation_pass():
+        for payload in payloads:
+          payload.invalidation_hash()
+
+      set_file_digest_cache(None)
+      report('uncached', best_of(args.repeat, invalidation_pass), num_files, 'file')
+
+      # Prime the persistent cache, then simulate fresh runs that load it from disk.
+      primer = FileDigestCache(cache_path)
+      set_file_digest_cache(primer)
+      invalidation_pass()
+      primer.save()
+
+      def fresh_run():
+        set_file_digest_cache(FileDigestCache(cache_path))
+        invalidation_pass()
+      report('cached (incl. index load)', best_of(args.repeat, fresh_run), num_files, 'file')
+      set_file_digest_cache(None)
+
+
+if __name__ == '__main__':
+  main()
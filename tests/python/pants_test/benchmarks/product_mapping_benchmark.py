@@ -0,0 +1,82 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import os
+
+from pants.goal.products import Products
+from pants_test.benchmarks.benchmark_util import best_of, report
+
+
+def create_jar_dependencies(num_binaries, num_jars, conf='default'):
+  """Maps jars for each binary the way IvyUtils.mapjars does for the jar_dependencies product."""
+  jardepmap = Products().require('jar_dependencies')
+  for binary in range(num_binaries):
+    target = 'binary{0}'.format(binary)
+    for jar in range(num_jars):
+      org, name = 'org{0}'.format(jar % 50), 'name{0}'.format(jar)
+      confdir = os.path.join('/mapped', target, org, name, conf)
+      f = '{0}-{1}-1.0.jar'.format(org, name)
+      jardepmap.add(org, confdir).append(f)
+      jardepmap.add((org, name), confdir).append(f)
+      jardepmap.add(target, confdir).append(f)
+      jardepmap.add((target, conf), confdir).append(f)
+      jardepmap.add((org, name, conf), confdir).append(f)
+  return jardepmap
+
+
+def legacy_keys_for(jardepmap, basedir, product):
+  """The scan keys_for used to make."""
+  keys = set()
+  for key, mappings in jardepmap.by_target.items():
+    for mapped in mappings.get(basedir, []):
+      if product == mapped:
+        keys.add(key)
+        break
+  return keys
+
+
+def map_dependencies(jardepmap, binaries, keys_for, conf='default'):
+  """Looks up the keys of every jar of every binary, as JvmBinaryTask._mapped_dependencies does."""
+  for binary in binaries:
+    for basedir, jars in jardepmap.get((binary, conf)).items():
+      for jar in jars:
+        keys_for(jardepmap, basedir, jar)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times building the jar_dependencies product mapping and looking up the keys '
+                  'of every mapped jar, as bundling jvm binaries does.')
+  parser.add_argument('--binaries', type=int, default=500)
+  parser.add_argument('--jars', type=int, default=300, help='The number of jars per binary.')
+  parser.add_argument('--legacy-binaries', type=int, default=5,
+                      help='Time the quadratic legacy scan for just this many binaries.')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  mappings = args.binaries * args.jars
+  report('build mapping', best_of(args.repeat,
+                                  lambda: create_jar_dependencies(args.binaries, args.jars)),
+         mappings, 'jar')
+  jardepmap = create_jar_dependencies(args.binaries, args.jars)
+  binaries = ['binary{0}'.format(i) for i in range(args.binaries)]
+
+  def indexed():
+    map_dependencies(jardepmap, binaries,
+                     lambda mapping, basedir, jar: mapping.keys_for(basedir, jar))
+  report('keys_for, all binaries', best_of(args.repeat, indexed), mappings, 'jar')
+
+  if args.legacy_binaries:
+    def legacy():
+      map_dependencies(jardepmap, binaries[:args.legacy_binaries], legacy_keys_for)
+    report('legacy scan, {0} binaries'.format(args.legacy_binaries), best_of(1, legacy),
+           args.legacy_binaries * args.jars, 'jar')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,56 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import os
+
+from pants.goal.run_tracker import RunTracker
+from pants.reporting.html_reporter import HtmlReporter
+from pants.reporting.report import Report
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_mkdir
+from pants_test.benchmarks.benchmark_util import best_of, report
+
+
+def run(root, num_workunits, labels_per_task):
+  """Runs num_workunits workunits, grouped under tasks, reporting them to html as pants does."""
+  info_dir = os.path.join(root, 'info')
+  html_dir = os.path.join(root, 'html')
+  safe_mkdir(html_dir)
+
+  run_tracker = RunTracker(info_dir)
+  run_report = Report()
+  settings = HtmlReporter.Settings(log_level=Report.INFO, html_dir=html_dir, template_dir=None)
+  run_report.add_reporter('html', HtmlReporter(run_tracker, settings))
+  run_tracker.start(run_report)
+  for i in range(num_workunits // labels_per_task):
+    with run_tracker.new_workunit('task{0}'.format(i % 50)):
+      for j in range(labels_per_task - 1):
+        with run_tracker.new_workunit('work{0}'.format(j)):
+          pass
+  run_tracker.end()
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times the reporting overhead of running workunits, from starting them through '
+                  'writing the html report, timings and summaries at the end of the run.')
+  parser.add_argument('--workunits', type=int, default=20000)
+  parser.add_argument('--labels-per-task', type=int, default=10,
+                      help='The number of workunits, including the task itself, per task.')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  with temporary_dir() as root:
+    def reporting():
+      with temporary_dir(root_dir=root) as run_root:
+        run(run_root, args.workunits, args.labels_per_task)
+    report('run with html reporting', best_of(args.repeat, reporting), args.workunits, 'workunit')
+
+
+if __name__ == '__main__':
+  main()
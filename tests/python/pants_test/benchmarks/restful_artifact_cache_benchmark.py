@@ -0,0 +1,65 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import os
+
+from pants.base.build_invalidator import CacheKey
+from pants.cache.restful_artifact_cache import RESTfulArtifactCache
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_open, safe_rmtree
+from pants_test.benchmarks.benchmark_util import best_of, report
+from pants_test.cache.cache_server import cache_server
+from pants_test.testutils.mock_logger import MockLogger
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times checking for and fetching artifacts from a RESTful artifact cache served '
+                  'locally with added latency.')
+  parser.add_argument('--artifacts', type=int, default=200,
+                      help='The number of artifacts to check for, half of which are cached.')
+  parser.add_argument('--files', type=int, default=50, help='The number of files per artifact.')
+  parser.add_argument('--latency-ms', type=float, default=5, help='The latency added per request.')
+  parser.add_argument('--max-connections', type=int, default=16)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  keys = [CacheKey('target%d' % i, 'hash', 1, []) for i in range(args.artifacts)]
+  with temporary_dir() as cache_root:
+    with cache_server(cache_root, latency=args.latency_ms / 1000) as server:
+      with temporary_dir() as artifact_root:
+        classes = os.path.join(artifact_root, 'classes')
+        for i in range(args.files):
+          with safe_open(os.path.join(classes, 'Class%d.class' % i), 'w') as fp:
+            fp.write(os.urandom(2048))
+
+        cache = RESTfulArtifactCache(MockLogger(), artifact_root, server.url,
+                                     max_connections=args.max_connections)
+        for key in keys[::2]:
+          cache.insert(key, [classes])
+
+        def one_at_a_time():
+          [cache.has(key) for key in keys]
+        report('has, one at a time', best_of(args.repeat, one_at_a_time), len(keys), 'key')
+
+        def batched():
+          cache.has_many(keys)
+        report('has_many', best_of(args.repeat, batched), len(keys), 'key')
+
+        def fetch():
+          for key in keys[::2]:
+            cache.use_cached_files(key)
+        connections = server.connections
+        report('use_cached_files', best_of(args.repeat, fetch, setup=lambda: safe_rmtree(classes)),
+               len(keys[::2]), 'artifact')
+        print('{0} connections opened for {1} fetches'.format(server.connections - connections,
+                                                              args.repeat * len(keys[::2])))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import argparse
+import random
+
+from pants.base.address import SyntheticAddress
+from pants.base.build_graph import BuildGraph, sort_targets
+from pants.base.target import Target
+from pants_test.benchmarks.benchmark_util import best_of, report
+
+
+def create_graph(num_targets, layer_width=100, fan_out=3, seed=0):
+  """Creates a layered synthetic graph where each target depends on targets in the layer below."""
+  rng = random.Random(seed)
+  build_graph = BuildGraph(address_mapper=None)
+  previous_layer = []
+  layer = []
+  for i in range(num_targets):
+    address = SyntheticAddress.parse('src/layer{0}:t{1}'.format(i // layer_width, i))
+    target = Target(name=address.target_name, address=address, build_graph=build_graph)
+    dependencies = rng.sample(previous_layer, min(fan_out, len(previous_layer)))
+    build_graph.inject_target(target, dependencies=[dep.address for dep in dependencies])
+    layer.append(target)
+    if len(layer) == layer_width:
+      previous_layer, layer = layer, []
+  return build_graph
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Times building a graph and ordering target subsets topologically, as the cache '
+                  'manager does.')
+  parser.add_argument('--sizes', default='1000,10000,50000',
+                      help='Comma separated graph sizes to benchmark.')
+  parser.add_argument('--legacy-max', type=int, default=10000,
+                      help='Skip the quadratic legacy ordering for graphs larger than this.')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  for size in map(int, args.sizes.split(',')):
+    report('{0}: build graph'.format(size), best_of(args.repeat, lambda: create_graph(size)), size,
+           'target')
+    build_graph = create_graph(size)
+    targets = build_graph.targets()
+    subset = targets[::2]
+
+    if size <= args.legacy_max:
+      def legacy():
+        filter(subset.__contains__, reversed(sort_targets(subset)))
+      report('{0}: legacy list filter'.format(size), best_of(args.repeat, legacy), size, 'target')
+
+    def cold():
+      build_graph._ordered_closure_by_roots.clear()
+      build_graph.ordered_closure(subset)
+    report('{0}: ordered_closure (cold)'.format(size), best_of(args.repeat, cold), size, 'target')
+
+    def warm():
+      build_graph.ordered_closure(subset)
+    report('{0}: ordered_closure (cached)'.format(size), best_of(args.repeat, warm), size, 'target')
+
+    def ordered_subset():
+      build_graph.ordered_subset(subset)
+    report('{0}: ordered_subset'.format(size), best_of(args.repeat, ordered_subset), size, 'target')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,144 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from contextlib import contextmanager
+import os
+import SimpleHTTPServer
+import socket
+import SocketServer
+from threading import Lock, Thread
+import time
+
+from pants.util.dirutil import safe_mkdir
+
+
+class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+  """A very trivial RESTful artifact cache server handler that serves files under the cwd.
+
+  Connections are kept alive, and each request is delayed by the server's `latency` to stand in
+  for a remote cache.
+  """
+
+  protocol_version = 'HTTP/1.1'
+
+  # Send each response in one go; written piecemeal, delayed ACKs stall kept-alive connections.
+  wbufsize = -1
+  disable_nagle_algorithm = True
+
+  def setup(self):
+    SimpleHTTPServer.SimpleHTTPRequestHandler.setup(self)
+    with self.server.lock:
+      self.server.connections += 1
+      self.server.open_sockets.add(self.connection)
+
+  def finish(self):
+    SimpleHTTPServer.SimpleHTTPRequestHandler.finish(self)
+    with self.server.lock:
+      self.server.open_sockets.discard(self.connection)
+
+  def log_message(self, *args):
+    pass
+
+  def parse_request(self):
+    if not SimpleHTTPServer.SimpleHTTPRequestHandler.parse_request(self):
+      return False
+    with self.server.lock:
+      self.server.requests += 1
+    if self.server.latency:
+      time.sleep(self.server.latency)
+    return True
+
+  def send_error(self, code, message=None):
+    # Unlike the base class, keep the connection alive after a miss as a real cache server would.
+    self.send_response(code, message)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def do_PUT(self):
+    path = self.translate_path(self.path)
+    content_length = int(self.headers.getheader('content-length'))
+    content = self.rfile.read(content_length)
+    safe_mkdir(os.path.dirname(path))
+    with open(path, 'wb') as outfile:
+      outfile.write(content)
+    self.send_response(200)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def do_DELETE(self):
+    path = self.translate_path(self.path)
+    if os.path.exists(path):
+      os.unlink(path)
+      self.send_response(200)
+      self.send_header('Content-Length', '0')
+      self.end_headers()
+    else:
+      self.send_error(404, 'File not found')
+
+
+class CacheServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+  """A threaded stand-in for a RESTful artifact cache server that counts connections and requests."""
+
+  daemon_threads = True
+  allow_reuse_address = True
+  # Clients open many connections at once; with the default backlog of 5 some would be dropped.
+  request_queue_size = 128
+
+  def __init__(self, latency=0):
+    """
+    :param float latency: The delay in seconds added to each request.
+    """
+    SocketServer.TCPServer.__init__(self, ('localhost', 0), SimpleRESTHandler)
+    self.latency = latency
+    self.lock = Lock()
+    self.connections = 0
+    self.requests = 0
+    self.open_sockets = set()
+
+  def handle_error(self, request, client_address):
+    # Clients dropping kept-alive connections are expected and not worth a stack trace.
+    pass
+
+  def close_connections(self):
+    """Closes the connections clients are keeping alive, so the threads serving them exit."""
+    with self.lock:
+      sockets = list(self.open_sockets)
+    for sock in sockets:
+      try:
+        sock.shutdown(socket.SHUT_RDWR)
+      except socket.error:
+        pass
+
+  @property
+  def url(self):
+    return 'http://localhost:%d' % self.server_address[1]
+
+
+@contextmanager
+def cache_server(root, latency=0):
+  """Serves the directory `root` as a RESTful artifact cache for the duration of the context.
+
+  SimpleHTTPRequestHandler serves from the cwd, so the cwd is changed to `root` while serving.
+
+  :param string root: The directory to serve.
+  :param float latency: The delay in seconds added to each request.
+  :returns: The running CacheServer.
+  """
+  cwd = os.getcwd()
+  os.chdir(root)
+  server = CacheServer(latency=latency)
+  thread = Thread(target=server.serve_forever)
+  thread.daemon = True
+  thread.start()
+  try:
+    yield server
+  finally:
+    server.shutdown()
+    thread.join()
+    server.close_connections()
+    server.server_close()
+    os.chdir(cwd)
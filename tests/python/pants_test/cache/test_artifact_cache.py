@@ -5,19 +5,20 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
-import SimpleHTTPServer
-import SocketServer
+from io import BytesIO
 import os
 import unittest2 as unittest
-from threading import Thread
 
 from pants.base.build_invalidator import CacheKey
+from pants.cache.artifact import TarballArtifact
 from pants.cache.cache_setup import create_artifact_cache, select_best_url
 from pants.cache.combined_artifact_cache import CombinedArtifactCache
+from pants.cache.content_addressed_artifact_cache import ContentAddressedArtifactCache
 from pants.cache.local_artifact_cache import LocalArtifactCache
 from pants.cache.restful_artifact_cache import RESTfulArtifactCache
-from pants.util.contextutil import pushd, temporary_dir, temporary_file
-from pants.util.dirutil import safe_mkdir
+from pants.util.contextutil import temporary_dir, temporary_file
+from pants.util.dirutil import safe_open, safe_rmtree
+from pants_test.cache.cache_server import cache_server
 from pants_test.testutils.mock_logger import MockLogger
 
 
@@ -29,35 +30,6 @@ class MockPinger(object):
     return map(lambda host: (host, self._hosts_to_times.get(host, 9999)), hosts)
 
 
-# A very trivial server that serves files under the cwd.
-class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
-  def __init__(self, request, client_address, server):
-    # The base class implements GET and HEAD.
-    SimpleHTTPServer.SimpleHTTPRequestHandler.__init__(self, request, client_address, server)
-
-  def do_HEAD(self):
-    return SimpleHTTPServer.SimpleHTTPRequestHandler.do_HEAD(self)
-
-  def do_PUT(self):
-    path = self.translate_path(self.path)
-    content_length = int(self.headers.getheader('content-length'))
-    content = self.rfile.read(content_length)
-    safe_mkdir(os.path.dirname(path))
-    with open(path, 'wb') as outfile:
-      outfile.write(content)
-    self.send_response(200)
-    self.end_headers()
-
-  def do_DELETE(self):
-    path = self.translate_path(self.path)
-    if os.path.exists(path):
-      os.unlink(path)
-      self.send_response(200)
-    else:
-      self.send_error(404, 'File not found')
-    self.end_headers()
-
-
 TEST_CONTENT1 = 'muppet'
 TEST_CONTENT2 = 'kermit'
 
@@ -82,6 +54,10 @@ class TestArtifactCache(unittest.TestCase):
       check(RESTfulArtifactCache, 'http://localhost/bar')
       check(CombinedArtifactCache, [cachedir, 'http://localhost/bar'])
 
+      cache = create_artifact_cache(MockLogger(), artifact_root, cachedir, 'TestTask', 'testing',
+                                    local_layout='content', local_max_size=1024)
+      self.assertTrue(isinstance(cache, ContentAddressedArtifactCache))
+
 
   def test_local_cache(self):
     with temporary_dir() as artifact_root:
@@ -90,25 +66,101 @@ class TestArtifactCache(unittest.TestCase):
         self.do_test_artifact_cache(artifact_cache)
 
 
-  def test_restful_cache(self):
-    httpd = None
-    httpd_thread = None
-    try:
+  def test_content_addressed_cache(self):
+    with temporary_dir() as artifact_root:
       with temporary_dir() as cache_root:
-        with pushd(cache_root):  # SimpleRESTHandler serves from the cwd.
-          httpd = SocketServer.TCPServer(('localhost', 0), SimpleRESTHandler)
-          port = httpd.server_address[1]
-          httpd_thread = Thread(target=httpd.serve_forever)
-          httpd_thread.start()
-          with temporary_dir() as artifact_root:
-            artifact_cache = RESTfulArtifactCache(MockLogger(), artifact_root,
-                                                  'http://localhost:%d' % port)
-            self.do_test_artifact_cache(artifact_cache)
-    finally:
-      if httpd:
-        httpd.shutdown()
-      if httpd_thread:
-        httpd_thread.join()
+        artifact_cache = ContentAddressedArtifactCache(MockLogger(), artifact_root, cache_root)
+        self.do_test_artifact_cache(artifact_cache)
+
+
+  def test_restful_cache(self):
+    with temporary_dir() as cache_root:
+      with cache_server(cache_root) as server:
+        with temporary_dir() as artifact_root:
+          artifact_cache = RESTfulArtifactCache(MockLogger(), artifact_root, server.url)
+          self.do_test_artifact_cache(artifact_cache)
+          # Every request went over the one kept-alive connection.
+          self.assertEquals(1, server.connections)
+
+  def test_restful_cache_streams_directories(self):
+    with temporary_dir() as cache_root:
+      with cache_server(cache_root) as server:
+        with temporary_dir() as artifact_root:
+          artifact_cache = RESTfulArtifactCache(MockLogger(), artifact_root, server.url)
+          classes = os.path.join(artifact_root, 'classes')
+          for name in ('a', 'b/c'):
+            with safe_open(os.path.join(classes, name), 'w') as fp:
+              fp.write(name)
+          key = CacheKey('muppet_key', 'fake_hash', 42, [])
+          artifact_cache.insert(key, [classes])
+          safe_rmtree(classes)
+
+          artifact = artifact_cache.use_cached_files(key)
+          self.assertEquals(set([os.path.join(classes, 'a'), os.path.join(classes, 'b', 'c')]),
+                            set(path for path in artifact.get_paths() if os.path.isfile(path)))
+          with open(os.path.join(classes, 'b', 'c')) as fp:
+            self.assertEquals('b/c', fp.read())
+
+  def test_truncated_stream_extracts_nothing(self):
+    with temporary_dir() as artifact_root:
+      classes = os.path.join(artifact_root, 'classes')
+      for name in ('a', 'b'):
+        with safe_open(os.path.join(classes, name), 'w') as fp:
+          fp.write(name * 10000)
+      with temporary_file() as tarball:
+        TarballArtifact(artifact_root, tarball.name, compress=False).collect([classes])
+        content = tarball.read()
+      safe_rmtree(classes)
+
+      # Cut the tarball off part way through the second file.
+      artifact = TarballArtifact(artifact_root, BytesIO(content[:len(content) // 2]),
+                                 compress=False)
+      with self.assertRaises(Exception):
+        artifact.extract_stream()
+      self.assertEquals([], os.listdir(artifact_root))
+
+      artifact = TarballArtifact(artifact_root, BytesIO(content), compress=False)
+      artifact.extract_stream()
+      self.assertEquals(['a', 'b'], sorted(os.listdir(classes)))
+      with open(os.path.join(classes, 'b')) as fp:
+        self.assertEquals('b' * 10000, fp.read())
+
+  def test_has_many(self):
+    keys = [CacheKey('key%d' % i, 'fake_hash', 42, []) for i in range(20)]
+    with temporary_dir() as cache_root:
+      with cache_server(cache_root, latency=0.05) as server:
+        with temporary_dir() as artifact_root:
+          with temporary_file(artifact_root) as f:
+            f.write(TEST_CONTENT1)
+            f.close()
+            remote_cache = RESTfulArtifactCache(MockLogger(), artifact_root, server.url,
+                                                max_connections=10)
+            for key in keys[::2]:
+              remote_cache.insert(key, [f.name])
+            self.assertEquals([True, False] * 10, remote_cache.has_many(keys))
+            self.assertTrue(server.connections <= 10)
+
+            # A local cache in front of the remote one only defers the keys it is missing.
+            with temporary_dir() as local_root:
+              local_cache = LocalArtifactCache(MockLogger(), artifact_root, local_root)
+              local_cache.insert(keys[1], [f.name])
+              combined = CombinedArtifactCache([local_cache, remote_cache])
+              self.assertEquals([True] * 2 + [True, False] * 9, combined.has_many(keys))
+
+  def test_has_many_unreachable(self):
+    keys = [CacheKey('key%d' % i, 'fake_hash', 42, []) for i in range(3)]
+    with temporary_dir() as cache_root:
+      with cache_server(cache_root) as server:
+        url = server.url
+    with temporary_dir() as artifact_root:
+      # Nothing listens at the url any more, so each check fails and is reported as a miss.
+      remote_cache = RESTfulArtifactCache(MockLogger(), artifact_root, url)
+      self.assertEquals([False], remote_cache.has_many(keys[:1]))
+      self.assertEquals([False] * 3, remote_cache.has_many(keys))
+      with temporary_dir() as local_root:
+        local_cache = LocalArtifactCache(MockLogger(), artifact_root, local_root)
+        combined = CombinedArtifactCache([local_cache, remote_cache])
+        self.assertFalse(combined.has(keys[0]))
 
 
   def do_test_artifact_cache(self, artifact_cache):
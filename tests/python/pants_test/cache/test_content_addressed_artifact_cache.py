@@ -0,0 +1,141 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+
+import unittest2 as unittest
+
+from pants.base.build_invalidator import CacheKey
+from pants.cache.content_addressed_artifact_cache import ContentAddressedArtifactCache
+from pants.util.dirutil import safe_mkdir, safe_mkdtemp, safe_open, safe_rmtree
+from pants_test.testutils.mock_logger import MockLogger
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 1000.0
+
+  def time(self):
+    self.now += 1
+    return self.now
+
+
+class ContentAddressedArtifactCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.artifact_root = safe_mkdtemp()
+    self.cache_root = safe_mkdtemp()
+    self.clock = FakeClock()
+
+  def tearDown(self):
+    safe_rmtree(self.artifact_root)
+    safe_rmtree(self.cache_root)
+
+  def cache(self, max_size=None):
+    return ContentAddressedArtifactCache(MockLogger(), self.artifact_root, self.cache_root,
+                                         max_size=max_size, clock=self.clock)
+
+  def write(self, relpath, content):
+    path = os.path.join(self.artifact_root, relpath)
+    with safe_open(path, 'w') as fp:
+      fp.write(content)
+    return path
+
+  def read(self, relpath):
+    with open(os.path.join(self.artifact_root, relpath)) as fp:
+      return fp.read()
+
+  def objects(self):
+    return [name for _, _, names in os.walk(os.path.join(self.cache_root, 'objects'))
+            for name in names]
+
+  def key(self, id):
+    return CacheKey(id, '{0}_hash'.format(id), 1, [])
+
+  def test_identical_files_stored_once(self):
+    cache = self.cache()
+    cache.insert(self.key('a'), [self.write('a/Foo.class', 'foo'), self.write('a/Bar.class', 'bar')])
+    cache.insert(self.key('b'), [self.write('b/Foo.class', 'foo')])
+    self.assertEqual(2, len(self.objects()))
+    self.assertEqual(6, cache.size)
+
+  def test_directories_restored_by_copy(self):
+    cache = self.cache()
+    self.write('classes/com/Foo.class', 'foo')
+    safe_mkdir(os.path.join(self.artifact_root, 'classes', 'empty'))
+    cache.insert(self.key('a'), [os.path.join(self.artifact_root, 'classes')])
+
+    self.write('classes/com/Foo.class', 'stomped')
+    os.rmdir(os.path.join(self.artifact_root, 'classes', 'empty'))
+    artifact = cache.use_cached_files(self.key('a'))
+
+    self.assertEqual([os.path.join(self.artifact_root, 'classes', 'com', 'Foo.class')],
+                     list(artifact.get_paths()))
+    self.assertEqual('foo', self.read('classes/com/Foo.class'))
+    self.assertTrue(os.path.isdir(os.path.join(self.artifact_root, 'classes', 'empty')))
+    self.assertEqual(1, os.stat(os.path.join(self.artifact_root, 'classes/com/Foo.class')).st_nlink)
+
+  def test_restored_files_rewritable_in_place(self):
+    cache = self.cache()
+    cache.insert(self.key('a'), [self.write('a/Foo.class', 'foo')])
+    cache.insert(self.key('b'), [self.write('b/Foo.class', 'foo')])
+    self.assertTrue(cache.use_cached_files(self.key('a')))
+
+    # Compilers truncate and rewrite their outputs, which must neither fail nor reach the store.
+    self.write('a/Foo.class', 'rewritten')
+    self.assertTrue(cache.use_cached_files(self.key('b')))
+    self.assertEqual('foo', self.read('b/Foo.class'))
+    self.assertEqual('rewritten', self.read('a/Foo.class'))
+
+  def test_lru_eviction(self):
+    cache = self.cache(max_size=25)
+    cache.insert(self.key('a'), [self.write('a', 'a' * 10)])
+    cache.insert(self.key('b'), [self.write('b', 'b' * 10)])
+    # Using a makes b the least recently used.
+    self.assertTrue(cache.use_cached_files(self.key('a')))
+    cache.insert(self.key('c'), [self.write('c', 'c' * 10)])
+
+    self.assertTrue(cache.has(self.key('a')))
+    self.assertFalse(cache.has(self.key('b')))
+    self.assertTrue(cache.has(self.key('c')))
+    self.assertEqual(2, len(self.objects()))
+    self.assertEqual(20, cache.size)
+
+  def test_shared_objects_survive_eviction(self):
+    cache = self.cache(max_size=15)
+    cache.insert(self.key('a'), [self.write('a', 'x' * 10)])
+    cache.insert(self.key('b'), [self.write('b', 'x' * 10), self.write('c', 'y' * 10)])
+
+    self.assertFalse(cache.has(self.key('a')))
+    self.assertFalse(cache.has(self.key('b')))
+    self.assertEqual(0, cache.size)
+    self.assertEqual([], self.objects())
+
+  def test_index_shared_across_instances(self):
+    self.cache().insert(self.key('a'), [self.write('a', 'a' * 10)])
+    cache = self.cache(max_size=15)
+    cache.insert(self.key('b'), [self.write('b', 'b' * 10)])
+    self.assertFalse(cache.has(self.key('a')))
+    self.assertTrue(cache.has(self.key('b')))
+
+  def test_prune(self):
+    cache = self.cache()
+    cache.insert(self.key('a'), [self.write('a', 'a')])
+    self.clock.now += 2 * 60 * 60
+    cache.insert(self.key('b'), [self.write('b', 'b')])
+    cache.prune(1)
+    self.assertFalse(cache.has(self.key('a')))
+    self.assertTrue(cache.has(self.key('b')))
+    self.assertEqual(1, len(self.objects()))
+
+  def test_missing_object_is_a_miss(self):
+    cache = self.cache()
+    cache.insert(self.key('a'), [self.write('a', 'a')])
+    for root, _, names in os.walk(os.path.join(self.cache_root, 'objects')):
+      for name in names:
+        os.unlink(os.path.join(root, name))
+    self.assertFalse(cache.use_cached_files(self.key('a')))
+    self.assertFalse(cache.has(self.key('a')))
@@ -0,0 +1,60 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+
+import unittest2 as unittest
+
+from pants.goal.aggregated_timings import AggregatedTimings
+from pants.util.dirutil import safe_mkdtemp, safe_rmtree
+
+
+class AggregatedTimingsTest(unittest.TestCase):
+  def setUp(self):
+    self.root = safe_mkdtemp()
+    self.path = os.path.join(self.root, 'timings')
+
+  def tearDown(self):
+    safe_rmtree(self.root)
+
+  def read(self, path):
+    with open(path) as fp:
+      return fp.read()
+
+  def test_timings_written_on_flush(self):
+    timings = AggregatedTimings(self.path)
+    timings.add_timing('main:compile', 1.5)
+    timings.add_timing('main:compile:javac', 1, is_tool=True)
+    timings.add_timing('main:compile', 1)
+    self.assertFalse(os.path.exists(self.path))
+
+    timings.flush()
+    self.assertEqual('main:compile: 2.5\nmain:compile:javac: 1.0\n', self.read(self.path))
+    self.assertEqual([{'label': 'main:compile', 'timing': 2.5, 'is_tool': False},
+                      {'label': 'main:compile:javac', 'timing': 1, 'is_tool': True}],
+                     timings.get_all())
+
+  def test_events_logged(self):
+    timings = AggregatedTimings(self.path)
+    timings.add_timing('main:compile', 1.5)
+    timings.add_timing('main:compile:javac', 1, is_tool=True)
+    timings.close()
+    self.assertEqual('main:compile\t1.500000\t0\nmain:compile:javac\t1.000000\t1\n',
+                     self.read(timings.events_path))
+
+    # Timings added once closed are only aggregated in memory.
+    timings.add_timing('main:jar', 1)
+    timings.flush()
+    self.assertEqual(2, len(self.read(timings.events_path).splitlines()))
+    self.assertEqual(3, len(timings.get_all()))
+
+  def test_clean_all(self):
+    timings = AggregatedTimings(self.path)
+    os.rmdir(os.path.dirname(self.path))
+    timings.add_timing('main:clean-all', 1)
+    timings.close()
+    self.assertFalse(os.path.exists(os.path.dirname(self.path)))
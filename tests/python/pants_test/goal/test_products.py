@@ -0,0 +1,65 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import unittest2 as unittest
+
+from pants.goal.products import Products
+
+
+class ProductMappingTest(unittest.TestCase):
+  def setUp(self):
+    self.mapping = Products().require('jar_dependencies')
+
+  def test_keys_for(self):
+    self.mapping.add('a', '/base', ['foo.jar', 'bar.jar'])
+    self.mapping.add('b', '/base').append('foo.jar')
+    self.mapping['c']['/other'].extend(['foo.jar'])
+
+    self.assertEqual(set(['a', 'b']), self.mapping.keys_for('/base', 'foo.jar'))
+    self.assertEqual(set(['a']), self.mapping.keys_for('/base', 'bar.jar'))
+    self.assertEqual(set(['c']), self.mapping.keys_for('/other', 'foo.jar'))
+    self.assertEqual(set(), self.mapping.keys_for('/other', 'bar.jar'))
+
+  def test_keys_for_follows_removals(self):
+    products = self.mapping.add('a', '/base')
+    products.extend(['foo.jar', 'bar.jar', 'foo.jar'])
+    products.remove('foo.jar')
+    self.assertEqual(set(['a']), self.mapping.keys_for('/base', 'foo.jar'))
+
+    products.pop()
+    del products[0]
+    self.assertEqual(set(), self.mapping.keys_for('/base', 'foo.jar'))
+    self.assertEqual(set(), self.mapping.keys_for('/base', 'bar.jar'))
+
+    products[:] = ['baz.jar']
+    self.assertEqual(set(['a']), self.mapping.keys_for('/base', 'baz.jar'))
+
+    self.mapping['a']['/base'] = ['qux.jar']
+    self.assertEqual(set(), self.mapping.keys_for('/base', 'baz.jar'))
+    self.assertEqual(set(['a']), self.mapping.keys_for('/base', 'qux.jar'))
+    self.assertEqual(['qux.jar'], self.mapping.get('a')['/base'])
+
+  def test_paths_interned(self):
+    self.mapping.add('a', '/base', [''.join(['foo', '.jar'])])
+    self.mapping.add('b', '/base', [''.join(['foo', '.jar'])])
+    self.assertIs(self.mapping['a']['/base'][0], self.mapping['b']['/base'][0])
+
+  def test_unhashable_products(self):
+    self.mapping.add('a', '/base', [['not', 'hashable']])
+    self.mapping.add('b', '/base', ['foo.jar'])
+    self.assertEqual(set(['a']), self.mapping.keys_for('/base', ['not', 'hashable']))
+    self.assertEqual(set(['b']), self.mapping.keys_for('/base', 'foo.jar'))
+
+  def test_mapping_interface(self):
+    self.assertTrue(self.mapping.empty())
+    self.mapping.add('a', '/base', ['foo.jar'])
+    self.assertFalse(self.mapping.empty())
+    self.assertTrue(self.mapping.has('a'))
+    self.assertFalse(self.mapping.has('b'))
+    self.assertIsNone(self.mapping.get('b'))
+    self.assertEqual([], self.mapping['b']['/base'])
+    self.assertEqual({'/base': ['foo.jar']}, dict(self.mapping.get('a')))
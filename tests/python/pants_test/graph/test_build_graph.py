@@ -15,7 +15,7 @@ from pants.base.address_lookup_error import AddressLookupError
 from pants.base.build_configuration import BuildConfiguration
 from pants.base.build_file import BuildFile
 from pants.base.build_file_parser import BuildFileParser
-from pants.base.build_graph import BuildGraph
+from pants.base.build_graph import BuildGraph, CycleException, sort_targets
 from pants.base.build_root import BuildRoot
 from pants.base.target import Target
 from pants.util.contextutil import pushd, temporary_dir
@@ -187,6 +187,43 @@ class BuildGraphTest(BaseTest):
     d = self.make_target('d', dependencies=[a, c])
     self.assertEquals([d, a, c, b], d.closure())
 
+  def test_target_closure_tracks_mutations(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c', dependencies=[b])
+    d = self.make_target('d')
+    self.assertEquals([c, b, a], c.closure())
+    self.assertTrue(c.depends_on(a))
+    self.assertFalse(c.depends_on(d))
+    self.assertFalse(a.depends_on(c))
+
+    # Closures are handed out fresh, so mutating one leaves the memoized closure alone.
+    c.closure().add(d)
+    self.assertEquals([c, b, a], c.closure())
+
+    self.build_graph.inject_dependency(a.address, d.address)
+    self.assertEquals([c, b, a, d], c.closure())
+    self.assertTrue(c.depends_on(d))
+    self.assertTrue(b.depends_on(d))
+    self.assertEquals([d], d.closure())
+
+  def test_depends_on_dependency_injected_before_target(self):
+    a = self.make_target('a')
+    self.build_graph.inject_dependency(a.address, SyntheticAddress.parse('b'))
+    self.assertFalse(self.build_graph.depends_on(a.address, SyntheticAddress.parse('b')))
+    b = self.make_target('b')
+    self.assertTrue(a.depends_on(b))
+    self.assertEquals([a, b], a.closure())
+
+  def test_depends_on_with_cycle(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    self.assertFalse(a.depends_on(b))
+    self.build_graph.inject_dependency(a.address, b.address)
+    self.assertTrue(a.depends_on(b))
+    self.assertTrue(b.depends_on(a))
+    self.assertEquals([a, b], a.closure())
+
   def test_target_walk(self):
     def assertWalk(expected, target):
       results = []
@@ -202,6 +239,74 @@ class BuildGraphTest(BaseTest):
     d = self.make_target('d', dependencies=[a, c])
     assertWalk([d, a, c, b], d)
 
+  def test_ordered_closure(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c', dependencies=[b])
+    d = self.make_target('d', dependencies=[c, a])
+    e = self.make_target('e', dependencies=[d])
+
+    self.assertEquals([a, b, c, d, e], self.build_graph.ordered_closure([e]))
+    self.assertEquals([a, b, c], self.build_graph.ordered_closure([c, a]))
+    self.assertEquals([b, d], self.build_graph.ordered_subset([d, b]))
+    self.assertEquals([e, d, c, b, a], self.build_graph.sorted_targets())
+
+  def test_ordered_closure_tracks_mutations(self):
+    a = self.make_target('a')
+    b = self.make_target('b')
+    self.assertEquals([b], self.build_graph.ordered_closure([b]))
+
+    self.build_graph.inject_dependency(b.address, a.address)
+    self.assertEquals([a, b], self.build_graph.ordered_closure([b]))
+
+    self.build_graph.inject_dependency(a.address, b.address)
+    with pytest.raises(CycleException):
+      self.build_graph.ordered_closure([b])
+
+  def test_inject_dependency_maintains_order(self):
+    # Inject in an order that forces the maintained topological order to be repaired.
+    targets = dict((name, self.make_target(name)) for name in 'abcdef')
+    for dependent, dependency in ['ab', 'cd', 'ef', 'bc', 'fa']:
+      self.build_graph.inject_dependency(targets[dependent].address, targets[dependency].address)
+
+    self.assertEquals([targets[name] for name in 'dcbafe'],
+                      self.build_graph.ordered_closure([targets['e']]))
+    self.assertEquals(sort_targets(self.build_graph.targets())[::-1],
+                      self.build_graph.ordered_subset(self.build_graph.targets()))
+
+  def test_inject_dependency_detects_cycle(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c', dependencies=[b])
+    d = self.make_target('d')
+
+    self.build_graph.inject_dependency(a.address, c.address)
+    with pytest.raises(CycleException) as e:
+      self.build_graph.ordered_closure([c])
+    self.assertIn(' ->\n\t'.join(t.address.spec for t in [a, c, b, a]), str(e.value))
+    with pytest.raises(CycleException):
+      self.build_graph.sorted_targets()
+
+    # The rest of the graph can still be ordered.
+    e = self.make_target('e', dependencies=[d])
+    self.assertEquals([d, e], self.build_graph.ordered_subset([e, d]))
+
+  def test_dependency_injected_before_target(self):
+    a = self.make_target('a')
+    self.build_graph.inject_dependency(a.address, SyntheticAddress.parse('b'))
+    b = self.make_target('b')
+    c = self.make_target('c', dependencies=[a])
+    self.assertEquals([b, a, c], self.build_graph.ordered_closure([c]))
+
+  def test_ordered_closure_deep_graph(self):
+    # Deeper than the default recursion limit.
+    targets = [self.make_target('deep:0')]
+    for i in range(1, 2000):
+      targets.append(self.make_target('deep:{0}'.format(i), dependencies=[targets[-1]]))
+    self.assertEquals(targets, self.build_graph.ordered_closure([targets[-1]]))
+    self.assertTrue(targets[-1].depends_on(targets[0]))
+    self.assertEquals(list(reversed(targets)), sort_targets([targets[-1]]))
+
   def test_lookup_exception(self):
     """
     There is code that depends on the fact that TransitiveLookupError is a subclass
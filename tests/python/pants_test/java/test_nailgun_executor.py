@@ -0,0 +1,298 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from contextlib import closing, contextmanager
+import os
+import socket
+import subprocess
+import sys
+from threading import Thread
+import time
+
+from mock import patch
+from twitter.common.lang import Compatibility
+import unittest2 as unittest
+
+from pants.java.distribution.distribution import Distribution
+from pants.java.nailgun_executor import NailgunExecutor
+from pants.util.dirutil import chmod_plus_x, safe_mkdtemp, safe_open, safe_rmtree
+
+
+StringIO = Compatibility.StringIO
+
+
+class NailgunExecutorRegistryTest(unittest.TestCase):
+  def setUp(self):
+    self.workdir_root = safe_mkdtemp()
+
+  def tearDown(self):
+    safe_rmtree(self.workdir_root)
+
+  def workdir(self, name='ng'):
+    return os.path.join(self.workdir_root, name)
+
+  def register(self, workdir, pid, port, exe='/usr/bin/java'):
+    with safe_open(os.path.join(workdir, 'endpoint'), 'w') as fp:
+      fp.write(NailgunExecutor.Endpoint(exe, 'fingerprint', pid, port).serialize())
+
+  @contextmanager
+  def listening(self):
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as server:
+      server.bind(('localhost', 0))
+      server.listen(1)
+      yield server.getsockname()[1]
+
+  @contextmanager
+  def process(self, *args):
+    proc = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'] + list(args))
+    try:
+      yield proc
+    finally:
+      if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+  def test_endpoint_round_trip(self):
+    endpoint = NailgunExecutor.Endpoint('/opt/odd:path/java', 'fingerprint', 1, 2)
+    self.assertEqual(endpoint, NailgunExecutor.Endpoint.parse(endpoint.serialize()))
+
+  def test_find_live_server(self):
+    with self.listening() as port:
+      self.register(self.workdir(), os.getpid(), port)
+      endpoint = NailgunExecutor._find(self.workdir())
+      self.assertEqual(NailgunExecutor.Endpoint('/usr/bin/java', 'fingerprint', os.getpid(), port),
+                       endpoint)
+
+  def test_find_ignores_dead_servers(self):
+    self.assertIsNone(NailgunExecutor._find(self.workdir()))
+
+    with self.listening() as port:
+      pass
+    self.register(self.workdir(), os.getpid(), port)
+    self.assertIsNone(NailgunExecutor._find(self.workdir()))
+
+    with self.process() as proc:
+      pass
+    with self.listening() as port:
+      self.register(self.workdir(), proc.pid, port)
+      self.assertIsNone(NailgunExecutor._find(self.workdir()))
+
+  def test_killall_registered(self):
+    owned_workdir, reused_workdir = self.workdir('owned'), self.workdir('reused')
+    with self.process(NailgunExecutor.create_owner_arg(owned_workdir)) as owned:
+      # A registered pid since reused by some other process must be left alone.
+      with self.process() as other:
+        self.register(owned_workdir, owned.pid, 1)
+        self.register(reused_workdir, other.pid, 1)
+
+        self.assertTrue(NailgunExecutor.killall(workdir_root=self.workdir_root))
+        owned.wait()
+        self.assertIsNone(other.poll())
+
+
+# A java that stands in for a nailgun server; its nails just report the server's pid, after sleeping
+# for the seconds given as their first arg if any. The Classpath nail instead reports the entries
+# added by the builtin ng-cp nail.
+FAKE_NAILGUN_JAVA = """#!{python}
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+
+def read_chunk(conn):
+  header = b''
+  while len(header) < 5:
+    header += conn.recv(5 - len(header))
+  length, command = struct.unpack(b'>Ic', header)
+  payload = b''
+  while len(payload) < length:
+    payload += conn.recv(length - len(payload))
+  return command, payload
+
+
+def send_chunk(conn, command, payload):
+  conn.sendall(struct.pack(b'>Ic', len(payload), command) + payload)
+
+
+extended = []
+
+
+def serve(conn):
+  try:
+    args = []
+    command, payload = read_chunk(conn)
+    while command != b'C':
+      if command == b'A':
+        args.append(payload)
+      command, payload = read_chunk(conn)
+    if payload == b'ng-cp':
+      extended.extend(args)
+    elif payload == b'Classpath':
+      send_chunk(conn, b'1', b','.join(extended))
+    else:
+      if args:
+        time.sleep(float(args[0]))
+      send_chunk(conn, b'1', str(os.getpid()).encode('ascii'))
+    send_chunk(conn, b'X', b'0')
+  except Exception:
+    pass
+  finally:
+    conn.close()
+
+
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+server.bind(('127.0.0.1', 0))
+server.listen(16)
+sys.stdout.write('NGServer started on 127.0.0.1, port %d.\\n' % server.getsockname()[1])
+sys.stdout.flush()
+while True:
+  conn, _ = server.accept()
+  thread = threading.Thread(target=serve, args=(conn,))
+  thread.daemon = True
+  thread.start()
+"""
+
+
+class NailgunExecutorPoolTest(unittest.TestCase):
+  def setUp(self):
+    root = safe_mkdtemp()
+    jre = os.path.join(root, 'jre')
+    with safe_open(os.path.join(jre, 'java'), 'w') as fp:
+      fp.write(FAKE_NAILGUN_JAVA.format(python=sys.executable))
+    chmod_plus_x(os.path.join(jre, 'java'))
+    self.distribution = Distribution(bin_path=jre)
+
+    self.root = root
+    self.workdir_root = os.path.join(root, 'ng')
+
+  def tearDown(self):
+    # The servers are found through their endpoints under the workdir root, so kill them first.
+    NailgunExecutor.killall(workdir_root=self.workdir_root)
+    safe_rmtree(self.root)
+
+  def executor(self, **kwargs):
+    return NailgunExecutor(os.path.join(self.workdir_root, 'Tool'), ['nailgun.jar'],
+                           distribution=self.distribution, ins=None, **kwargs)
+
+  def run_main(self, executor, main, classpath=None, jvm_options=None, args=None):
+    runner = executor.runner(classpath or ['tool.jar'], main, jvm_options=jvm_options, args=args)
+    out = StringIO()
+    self.assertEqual(0, runner.run(stdout=out, stderr=StringIO()))
+    return out.getvalue()
+
+  def run_nail(self, executor, sleep=None, classpath=None, jvm_options=None):
+    """Runs a nail, returning the pid of the server that ran it."""
+    return int(self.run_main(executor, 'Nail', classpath=classpath, jvm_options=jvm_options,
+                             args=[str(sleep)] if sleep else []))
+
+  def jar(self, name, content):
+    path = os.path.join(self.root, name)
+    with safe_open(path, 'w') as fp:
+      fp.write(content)
+    return path
+
+  def run_nails_concurrently(self, executor, count, **kwargs):
+    pids = []
+    threads = [Thread(target=lambda: pids.append(self.run_nail(executor, sleep=0.5, **kwargs)))
+               for _ in range(count)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(count, len(pids))
+    return pids
+
+  def test_server_reused(self):
+    executor = self.executor()
+    self.assertEqual(self.run_nail(executor), self.run_nail(executor))
+
+  def test_pool_runs_nails_on_separate_servers(self):
+    executor = self.executor(pool_size=2)
+    pids = self.run_nails_concurrently(executor, 2)
+    self.assertEqual(2, len(set(pids)))
+    # The warm servers are leased again.
+    self.assertEqual(set(pids), set(self.run_nails_concurrently(executor, 2)))
+
+  def test_pool_capped_by_memory(self):
+    executor = self.executor(pool_size=3, max_memory_mb=1024)
+    pids = self.run_nails_concurrently(executor, 3, jvm_options=['-Xmx512m'])
+    self.assertEqual(2, len(set(pids)))
+
+  def test_memory_cap_shared_across_pools(self):
+    other = NailgunExecutor(os.path.join(self.workdir_root, 'Other'), ['nailgun.jar'],
+                            distribution=self.distribution, ins=None)
+    self.run_nail(other, jvm_options=['-Xmx512m'])
+
+    executor = self.executor(pool_size=3, max_memory_mb=1024)
+    pids = self.run_nails_concurrently(executor, 3, jvm_options=['-Xmx512m'])
+    self.assertEqual(1, len(set(pids)))
+
+  def test_idle_servers_evicted(self):
+    executor = self.executor(pool_size=2, idle_timeout_secs=60)
+    pid = self.run_nail(executor)
+    self.assertEqual(pid, self.run_nail(executor))
+
+    registry = os.path.join(self.workdir_root, 'Tool', 'endpoint')
+    an_hour_ago = time.time() - 60 * 60
+    os.utime(registry, (an_hour_ago, an_hour_ago))
+    self.assertNotEqual(pid, self.run_nail(executor))
+
+  def test_max_heap_mb(self):
+    self.assertEqual(None, NailgunExecutor._max_heap_mb(['-Xms1g']))
+    self.assertEqual(1024, NailgunExecutor._max_heap_mb(['-Xmx2g', '-Xmx1G']))
+    self.assertEqual(512, NailgunExecutor._max_heap_mb(['-Xmx524288k']))
+
+  def test_classpath_digested_once_per_run(self):
+    executor = self.executor(pool_size=2)
+    with patch.object(NailgunExecutor, '_digest_classpath',
+                      wraps=NailgunExecutor._digest_classpath) as digest_classpath:
+      self.run_nail(executor)
+      self.assertEqual(1, digest_classpath.call_count)
+
+  def test_unchanged_directory_not_walked_again(self):
+    classes = os.path.join(self.root, 'classes')
+    self.jar('classes/com/A.class', 'a')
+    digest = NailgunExecutor._digest_entry(classes)
+    with patch('pants.java.nailgun_executor.os.walk', wraps=os.walk) as walk:
+      self.assertEqual(digest, NailgunExecutor._digest_entry(classes))
+      self.assertFalse(walk.called)
+
+      # Ensure the directory's mtime moves even on filesystems with coarse timestamps.
+      self.jar('classes/com/B.class', 'b')
+      an_hour_ago = time.time() - 60 * 60
+      os.utime(os.path.join(classes, 'com'), (an_hour_ago, an_hour_ago))
+      self.assertNotEqual(digest, NailgunExecutor._digest_entry(classes))
+      self.assertTrue(walk.called)
+
+  def test_rebuilt_jar_restarts_server(self):
+    executor = self.executor()
+    tool = self.jar('tool.jar', 'v1')
+    pid = self.run_nail(executor, classpath=[tool])
+    self.assertEqual(pid, self.run_nail(executor, classpath=[tool]))
+
+    self.jar('tool.jar', 'v2')
+    self.assertNotEqual(pid, self.run_nail(executor, classpath=[tool]))
+
+  def test_appended_entry_extends_server(self):
+    executor = self.executor()
+    tool, plugin = self.jar('tool.jar', 'tool'), self.jar('plugin.jar', 'plugin')
+    pid = self.run_nail(executor, classpath=[tool])
+
+    self.assertEqual(pid, self.run_nail(executor, classpath=[tool, plugin]))
+    self.assertEqual(plugin, self.run_main(executor, 'Classpath', classpath=[tool, plugin]))
+    # Dropping the appended entry needs a fresh server.
+    self.assertNotEqual(pid, self.run_nail(executor, classpath=[tool]))
+
+  def test_changed_jvm_args_restart_server(self):
+    executor = self.executor()
+    tool, plugin = self.jar('tool.jar', 'tool'), self.jar('plugin.jar', 'plugin')
+    pid = self.run_nail(executor, classpath=[tool])
+    self.assertNotEqual(pid, self.run_nail(executor, classpath=[tool, plugin],
+                                           jvm_options=['-Xmx1g']))
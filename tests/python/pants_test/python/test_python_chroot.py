@@ -0,0 +1,113 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import time
+
+from mock import patch
+
+from pants.backend.core.targets.resources import Resources
+from pants.backend.python.python_chroot import PythonChroot
+from pants.backend.python.targets.python_library import PythonLibrary
+from pants.base.source_root import SourceRoot
+from pants.util.dirutil import safe_rmtree
+from pants_test.base_test import BaseTest
+
+
+class PythonChrootTest(BaseTest):
+  def setUp(self):
+    super(PythonChrootTest, self).setUp()
+    SourceRoot.register(os.path.join(self.build_root, 'src/python'), PythonLibrary, Resources)
+    self.create_file('src/python/lib/__init__.py')
+    self.create_file('src/python/lib/lib.py', 'VALUE = 42\n')
+    self.create_file('src/python/lib/data.txt', 'data')
+    resources = self.make_target('src/python/lib:data', Resources, sources=['data.txt'])
+    self.library = self.make_target('src/python/lib', PythonLibrary,
+                                    sources=['__init__.py', 'lib.py'],
+                                    resource_targets=['src/python/lib:data'])
+    self.assertEqual([resources], self.library.resources)
+    # The layer cache outlives the test's build root, so start from no layers for the library.
+    self.library_dir = os.path.join(PythonChroot(targets=[])._layer_cache_root, self.library.id)
+    safe_rmtree(self.library_dir)
+
+  def dump_library(self):
+    chroot = PythonChroot(targets=[self.library])
+    chroot._dump_library(self.library)
+    return chroot
+
+  def chroot_files(self, chroot):
+    return dict((os.path.relpath(os.path.join(root, f), chroot.path()),
+                 os.stat(os.path.join(root, f)).st_ino)
+                for root, _, files in os.walk(chroot.path()) for f in files)
+
+  def test_layer_reused(self):
+    chroot = self.dump_library()
+    files = self.chroot_files(chroot)
+    self.assertEqual(set(['lib/__init__.py', 'lib/__init__.pyc', 'lib/lib.py', 'lib/lib.pyc',
+                          'lib/data.txt']),
+                     set(files))
+    self.assertEqual(set(['lib/__init__.py', 'lib/__init__.pyc', 'lib/lib.py', 'lib/lib.pyc']),
+                     chroot.builder.chroot().get('source'))
+    self.assertEqual(set(['lib/data.txt']), chroot.builder.chroot().get('resource'))
+    # Sources are copied into the layer, not linked, so editing them can't change the layer.
+    self.assertNotEqual(os.stat(os.path.join(self.build_root, 'src/python/lib/lib.py')).st_ino,
+                        files['lib/lib.py'])
+
+    # An unchanged library is dumped by linking the same layer files again.
+    self.assertEqual(files, self.chroot_files(self.dump_library()))
+
+  def test_changed_library_gets_new_layer(self):
+    self.dump_library()
+    self.create_file('src/python/lib/lib.py', 'VALUE = 43\n')
+    self.library.mark_invalidation_hash_dirty()
+    chroot = self.dump_library()
+    with open(os.path.join(chroot.path(), 'lib/lib.py')) as fp:
+      self.assertEqual('VALUE = 43\n', fp.read())
+
+  def layers(self):
+    return os.listdir(self.library_dir)
+
+  def test_recently_used_layer_kept(self):
+    self.dump_library()
+    old_layer, = self.layers()
+    self.create_file('src/python/lib/lib.py', 'VALUE = 43\n')
+    self.library.mark_invalidation_hash_dirty()
+    self.dump_library()
+    # Another run may still be linking from the superseded layer.
+    self.assertIn(old_layer, self.layers())
+    self.assertEqual(2, len(self.layers()))
+
+  def test_unused_layer_pruned(self):
+    self.dump_library()
+    old_layer, = self.layers()
+    long_ago = time.time() - PythonChroot._LAYER_PRUNE_AGE_SECS - 60
+    os.utime(os.path.join(self.library_dir, old_layer), (long_ago, long_ago))
+    self.create_file('src/python/lib/lib.py', 'VALUE = 43\n')
+    self.library.mark_invalidation_hash_dirty()
+    self.dump_library()
+    new_layer, = self.layers()
+    self.assertNotEqual(old_layer, new_layer)
+
+  def test_layer_pruned_while_linking_cached_again(self):
+    self.dump_library()
+    library_layer = PythonChroot._library_layer
+    calls = []
+
+    def pruned_after_lookup(chroot, library):
+      # Another run prunes the layer after it is looked up but before it is linked from.
+      layer, files = library_layer(chroot, library)
+      if not calls:
+        safe_rmtree(os.path.dirname(layer))
+      calls.append(layer)
+      return layer, files
+
+    with patch.object(PythonChroot, '_library_layer', autospec=True,
+                      side_effect=pruned_after_lookup):
+      chroot = self.dump_library()
+    self.assertEqual(2, len(calls))
+    with open(os.path.join(chroot.path(), 'lib/lib.py')) as fp:
+      self.assertEqual('VALUE = 42\n', fp.read())
@@ -0,0 +1,189 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+
+from mock import patch
+from pex.interpreter import PythonInterpreter
+from pex.pex_builder import PEXBuilder
+
+from pants.backend.python.python_requirement import PythonRequirement
+from pants.backend.python.targets.python_library import PythonLibrary
+from pants.backend.python.targets.python_tests import PythonTests
+from pants.backend.python.tasks.python_task import PythonTask
+from pants.backend.python.test_builder import PythonTestBuilder
+from pants.base.build_environment import get_buildroot
+from pants.base.source_root import SourceRoot
+from pants.util.dirutil import safe_mkdtemp, safe_open, safe_rmtree
+from pants_test.tasks.test_base import TaskTest, prepare_task
+
+
+class CountingPythonTask(PythonTask):
+  @classmethod
+  def setup_parser(cls, option_group, args, mkflag):
+    super(CountingPythonTask, cls).setup_parser(option_group, args, mkflag)
+    # Stand-ins for the global options python tasks consult.
+    option_group.add_option(mkflag('interpreter'), dest='interpreter', action='append', default=[])
+    option_group.add_option(mkflag('read'), dest='read_from_artifact_cache', default=True)
+    option_group.add_option(mkflag('write'), dest='write_to_artifact_cache', default=True)
+
+  def __init__(self, *args, **kwargs):
+    super(CountingPythonTask, self).__init__(*args, **kwargs)
+    self.setup_artifact_cache_from_config()
+    self.builds = 0
+
+  def pex(self, targets, **kwargs):
+    def build(path):
+      self.builds += 1
+      with safe_open(path, 'w') as fp:
+        fp.write('pex')
+    return self.cached_pex(targets, 'test.pex', self.interpreter, build, **kwargs)
+
+  def execute(self):
+    pass
+
+
+class StandInChroot(object):
+  """Stands in for a PythonChroot, whose test requirements can't be resolved here.
+
+  Like a PythonChroot it deletes its builder's path when it is collected.
+  """
+
+  def __init__(self, targets, builder, **kwargs):
+    self._targets = targets
+    self._builder = builder
+
+  def path(self):
+    return self._builder.path()
+
+  def dump(self):
+    for target in self._targets:
+      for source in target.sources_relative_to_source_root():
+        self._builder.add_source(os.path.join(get_buildroot(), target.target_base, source), source)
+    return self._builder
+
+  def __del__(self):
+    safe_rmtree(self.path())
+
+
+class StandInPEX(object):
+  """Stands in for a PEX, recording whether each one run was a frozen PEX chroot."""
+
+  ran = []
+
+  def __init__(self, path, interpreter=None):
+    self._path = path
+
+  def run(self, args, **kwargs):
+    self.ran.append(os.path.isfile(os.path.join(self._path, 'PEX-INFO')))
+    return 0
+
+
+class PythonTaskTest(TaskTest):
+  def setUp(self):
+    super(PythonTaskTest, self).setUp()
+    SourceRoot.register(os.path.join(self.build_root, 'src/python'), PythonLibrary)
+    self.create_file('src/python/lib/lib.py', 'VALUE = 42\n')
+    self.create_file('src/python/app/app.py', 'from lib.lib import VALUE\n')
+    self.lib = self.make_target('src/python/lib', PythonLibrary, sources=['lib.py'])
+    self.app = self.make_target('src/python/app', PythonLibrary, sources=['app.py'],
+                                dependencies=[self.lib])
+
+    # Setting up the interpreter cache may need to fetch setuptools, so just use this interpreter.
+    interpreter_cache = patch('pants.backend.python.tasks.python_task.PythonInterpreterCache')
+    interpreter_cache.start().return_value.select_interpreter.return_value = [
+      PythonInterpreter.get()]
+    self.addCleanup(interpreter_cache.stop)
+
+    self.artifact_cache = safe_mkdtemp()
+
+  def tearDown(self):
+    safe_rmtree(self.artifact_cache)
+    super(PythonTaskTest, self).tearDown()
+
+  def task(self, artifact_cache=False):
+    config = '[DEFAULT]\npants_workdir: {0}\n'.format(os.path.join(self.build_root, '.pants.d'))
+    if artifact_cache:
+      config += ('read_artifact_caches: ["{0}"]\nwrite_artifact_caches: ["{0}"]\n'
+                 .format(self.artifact_cache))
+    return prepare_task(CountingPythonTask, config=config, build_graph=self.build_graph)
+
+  def test_pex_reused(self):
+    pex = self.task().pex([self.app])
+    task = self.task()
+    self.assertEqual(pex, task.pex([self.app]))
+    self.assertEqual(0, task.builds)
+
+  def test_dependency_change_rebuilds_pex(self):
+    pex = self.task().pex([self.app])
+    self.create_file('src/python/lib/lib.py', 'VALUE = 4242\n')
+    self.lib.mark_invalidation_hash_dirty()
+    self.app.mark_invalidation_hash_dirty()
+    task = self.task()
+    self.assertNotEqual(pex, task.pex([self.app]))
+    self.assertEqual(1, task.builds)
+
+  def test_pex_keyed_by_requirements_and_platforms(self):
+    task = self.task()
+    pexes = set([task.pex([self.app]),
+                 task.pex([self.app], extra_requirements=[PythonRequirement('pytest')]),
+                 task.pex([self.app], platforms=['linux-x86_64', 'macosx-10.4-x86_64'])])
+    self.assertEqual(3, len(pexes))
+    self.assertEqual(3, task.builds)
+
+  def test_pex_shared_through_artifact_cache(self):
+    task = self.task(artifact_cache=True)
+    pex = task.pex([self.app, self.lib])
+    # Wait for the PEX to be written to the artifact cache in the background.
+    task.context.run_tracker.background_worker_pool().shutdown()
+    safe_rmtree(os.path.join(self.build_root, '.pants.d'))
+
+    task = self.task(artifact_cache=True)
+    self.assertEqual(pex, task.pex([self.app, self.lib]))
+    self.assertEqual(0, task.builds)
+    with open(pex) as fp:
+      self.assertEqual('pex', fp.read())
+
+
+class PythonTestBuilderTest(PythonTaskTest):
+  def setUp(self):
+    super(PythonTestBuilderTest, self).setUp()
+    SourceRoot.register(os.path.join(self.build_root, 'tests/python'), PythonTests)
+    self.create_file('tests/python/app/test_app.py', 'def test_app():\n  pass\n')
+    self.tests = self.make_target('tests/python/app', PythonTests, sources=['test_app.py'],
+                                  dependencies=[self.app])
+
+    for name, stand_in in (('PythonChroot', StandInChroot), ('PEX', StandInPEX)):
+      patcher = patch('pants.backend.python.test_builder.%s' % name, stand_in)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    # The stand-in PEX doesn't need setuptools, which may not bootstrap from this interpreter.
+    patcher = patch.object(PEXBuilder, '_prepare_bootstrap')
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    StandInPEX.ran = []
+
+  def run_tests(self, pex_provider=None):
+    builder = PythonTestBuilder([self.tests], [], interpreter=PythonInterpreter.get(),
+                                pex_provider=pex_provider)
+    self.assertEqual(0, builder.run())
+    self.assertEqual([True], StandInPEX.ran)
+    StandInPEX.ran = []
+
+  def test_run_fresh_pex(self):
+    self.run_tests()
+
+  def test_run_cached_pex(self):
+    task = self.task()
+
+    def pex_provider(targets, extra_requirements, build):
+      return task.cached_pex(targets, 'pytest.pex', task.interpreter, build,
+                             platforms=('current',), extra_requirements=extra_requirements)
+
+    self.run_tests(pex_provider)
+    # The second run reuses the PEX the first built.
+    self.run_tests(pex_provider)
@@ -0,0 +1,59 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+
+import unittest2 as unittest
+
+from pants.base.workunit import WorkUnit
+from pants.goal.run_tracker import RunTracker
+from pants.reporting.html_reporter import HtmlReporter
+from pants.reporting.report import Report
+from pants.util.dirutil import safe_mkdir, safe_mkdtemp, safe_rmtree
+
+
+class HtmlReporterTest(unittest.TestCase):
+  def setUp(self):
+    self.root = safe_mkdtemp()
+    self.html_dir = os.path.join(self.root, 'html')
+    safe_mkdir(self.html_dir)
+    self.run_tracker = RunTracker(os.path.join(self.root, 'info'))
+    settings = HtmlReporter.Settings(log_level=Report.INFO, html_dir=self.html_dir,
+                                     template_dir=None)
+    self.report = Report()
+    self.report.add_reporter('html', HtmlReporter(self.run_tracker, settings))
+    self.report.open()
+
+  def tearDown(self):
+    safe_rmtree(self.root)
+
+  def run_workunit(self, name):
+    workunit = WorkUnit(run_tracker=self.run_tracker, parent=None, name=name)
+    workunit.start()
+    self.report.start_workunit(workunit)
+    workunit.set_outcome(WorkUnit.SUCCESS)
+    self.report.end_workunit(workunit)
+    workunit.end()
+
+  def read(self, name):
+    with open(os.path.join(self.html_dir, name)) as fp:
+      return fp.read()
+
+  def test_summaries_rendered_on_demand(self):
+    self.run_workunit('compile')
+    self.run_workunit('jar')
+    self.assertFalse(os.path.exists(os.path.join(self.html_dir, 'cumulative_timings')))
+
+    self.report.render_summaries()
+    timings = self.read('cumulative_timings')
+    self.assertIn('compile', timings)
+    self.assertIn('jar', timings)
+    self.assertIn('No artifact cache use.', self.read('artifact_cache_stats'))
+
+    self.run_workunit('bundle')
+    self.report.close()
+    self.assertIn('bundle', self.read('self_timings'))
@@ -0,0 +1,127 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import json
+import os
+from threading import Thread
+import urllib
+import urllib2
+
+from mock import patch
+import unittest2 as unittest
+
+from pants.base.run_info import RunInfo
+from pants.reporting.reporting_server import PantsHandler, ReportingServer, RunIndex
+from pants.util.dirutil import safe_mkdtemp, safe_open, safe_rmtree
+
+
+class ReportingServerTestBase(unittest.TestCase):
+  def setUp(self):
+    self.root = safe_mkdtemp()
+    self.info_dir = os.path.join(self.root, 'runs')
+
+  def tearDown(self):
+    safe_rmtree(self.root)
+
+  def add_info(self, run_id, **info):
+    with safe_open(os.path.join(self.info_dir, run_id, 'info'), 'a') as fp:
+      for key, value in sorted(info.items()):
+        fp.write('%s: %s\n' % (key, value))
+
+
+class RunIndexTest(ReportingServerTestBase):
+  def test_runs_indexed_incrementally(self):
+    self.add_info('run1', id='run1', timestamp=1, outcome='SUCCESS')
+    self.add_info('run2', id='run2', timestamp=2)
+    self.add_info('run3', id='run3')
+    index = RunIndex(self.info_dir)
+    self.assertEqual(['run1', 'run2'], sorted(info['id'] for info in index.get_all()))
+
+    self.add_info('run2', outcome='FAILURE')
+    self.add_info('run3', timestamp=3)
+    with patch('pants.reporting.reporting_server.RunInfo', wraps=RunInfo) as run_info:
+      infos = sorted(index.get_all(), key=lambda info: info['id'])
+      # Only the info of the runs in progress is re-read.
+      self.assertEqual(2, run_info.call_count)
+    self.assertEqual([('run1', 'SUCCESS'), ('run2', 'FAILURE'), ('run3', None)],
+                     [(info['id'], info.get('outcome')) for info in infos])
+
+    with patch('pants.reporting.reporting_server.RunInfo', wraps=RunInfo) as run_info:
+      index.get_all()
+      self.assertEqual(0, run_info.call_count)
+
+  def test_get(self):
+    self.add_info('run1', id='run1', timestamp=1)
+    self.add_info('run2', id='run2', timestamp=2)
+    os.symlink(os.path.join(self.info_dir, 'run2'), os.path.join(self.info_dir, 'latest'))
+    index = RunIndex(self.info_dir)
+    self.assertEqual(['run1', 'run2'], sorted(info['id'] for info in index.get_all()))
+    self.assertEqual('run2', index.get('latest')['id'])
+    self.assertEqual('run1', index.get('run1')['id'])
+    self.assertIsNone(index.get('run3'))
+
+    # Runs handed out are copies.
+    index.get('run1')['timestamp_text'] = 'now'
+    self.assertNotIn('timestamp_text', index.get('run1'))
+
+  def test_removed_runs_dropped(self):
+    self.add_info('run1', id='run1', timestamp=1)
+    index = RunIndex(self.info_dir)
+    self.assertEqual(1, len(index.get_all()))
+    os.unlink(os.path.join(self.info_dir, 'run1', 'info'))
+    os.rmdir(os.path.join(self.info_dir, 'run1'))
+    self.assertEqual([], index.get_all())
+    self.assertIsNone(index.get('run1'))
+
+
+class ReportingServerTest(ReportingServerTestBase):
+  def setUp(self):
+    super(ReportingServerTest, self).setUp()
+    settings = ReportingServer.Settings(info_dir=self.info_dir, template_dir=None,
+                                        assets_dir=None, root=self.root, allowed_clients=['ALL'])
+    server = ReportingServer(0, settings)
+    thread = Thread(target=server.start)
+    thread.daemon = True
+    thread.start()
+    self.addCleanup(server.shutdown)
+    self.url = 'http://localhost:%d' % server.server_port()
+
+  def get(self, path, headers=None):
+    return urllib2.urlopen(urllib2.Request(self.url + path, headers=headers or {}))
+
+  def poll(self, *polls):
+    query = urllib.urlencode({'q': json.dumps([dict(id=path, path=path, pos=pos)
+                                               for path, pos in polls])})
+    return json.load(self.get('/poll?' + query))
+
+  def test_poll(self):
+    with safe_open(os.path.join(self.root, 'report', 'build.html'), 'w') as fp:
+      fp.write('0123456789')
+    self.assertEqual({'report/build.html': '3456789'},
+                     self.poll(('report/build.html', 3), ('report/missing.html', 0)))
+
+  def test_poll_capped(self):
+    with safe_open(os.path.join(self.root, 'build.html'), 'wb') as fp:
+      fp.write(b'abc\xe2\x82\xac')  # A euro sign straddles the cap.
+    with patch.object(PantsHandler, 'MAX_POLL_BYTES', 5):
+      self.assertEqual({'build.html': 'abc'}, self.poll(('build.html', 0)))
+      self.assertEqual({'build.html': '€'}, self.poll(('build.html', 3)))
+
+  def test_assets_cached(self):
+    response = self.get('/assets/css/pants.css')
+    etag = response.info().getheader('ETag')
+    self.assertEqual('max-age=86400', response.info().getheader('Cache-Control'))
+    self.assertTrue(response.read())
+
+    with self.assertRaises(urllib2.HTTPError) as error:
+      self.get('/assets/css/pants.css', headers={'If-None-Match': etag})
+    self.assertEqual(304, error.exception.code)
+
+  def test_runs(self):
+    self.add_info('pants_run_1', id='pants_run_1', timestamp=1)
+    self.assertIn('pants_run_1', self.get('/runs/').read())
+    self.assertEqual('none', self.get('/latestrunid').read())
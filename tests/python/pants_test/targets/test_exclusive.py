@@ -6,10 +6,22 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 from pants.backend.core.tasks.check_exclusives import CheckExclusives
+from pants.base.target import Target
 from pants.util.contextutil import temporary_dir
 from pants_test.base_test import BaseTest
 
 
+class ProvidingTarget(Target):
+  """Walks along with the targets it provides, like a python library providing binaries."""
+
+  def __init__(self, provides=None, *args, **kwargs):
+    super(ProvidingTarget, self).__init__(*args, **kwargs)
+    self.provides = provides or []
+
+  def extra_walk_targets(self):
+    return self.provides
+
+
 class ExclusivesTargetTest(BaseTest):
   """Test exclusives propagation in the dependency graph"""
 
@@ -28,6 +40,35 @@ class ExclusivesTargetTest(BaseTest):
     e_excl = e.get_all_exclusives()
     self.assertEquals(e_excl['a'], set(['1', '2']))
 
+  def test_propagation_shares_equal_exclusives(self):
+    a, b, c, d, e = self.setup_targets()
+    f = self.make_target(':f', dependencies=[d])
+    g = self.make_target(':g', dependencies=[b], exclusives={'a': '1'})
+    Target.propagate_exclusives([e, f, g])
+
+    self.assertEquals({'a': set(['1']), 'b': set(['1'])}, f.get_all_exclusives())
+    self.assertIs(d.get_all_exclusives(), a.get_all_exclusives())
+    self.assertIs(f.get_all_exclusives(), d.get_all_exclusives())
+    self.assertIs(g.get_all_exclusives(), b.get_all_exclusives())
+    self.assertEquals({'a': set(['1', '2']), 'b': set(['1']), 'c': set(['1'])},
+                      e.get_all_exclusives())
+
+  def test_propagation_from_extra_walk_targets(self):
+    a, b, c, d, e = self.setup_targets()
+    provided = self.make_target(':provided', dependencies=[c])
+    providing = self.make_target(':providing', ProvidingTarget, dependencies=[d],
+                                 provides=[provided])
+    self.assertEquals({'a': set(['1', '2']), 'b': set(['1'])}, providing.get_all_exclusives())
+    self.assertEquals({'a': set(['2'])}, provided.get_all_exclusives())
+
+  def test_propagation_from_extra_walk_target_depending_on_walker(self):
+    a, b, c, d, e = self.setup_targets()
+    providing = self.make_target(':providing', ProvidingTarget, dependencies=[a])
+    provided = self.make_target(':provided', dependencies=[providing, c])
+    providing.provides = [provided]
+    self.assertEquals({'a': set(['1', '2']), 'b': set(['1'])}, providing.get_all_exclusives())
+    self.assertEquals({'a': set(['1', '2']), 'b': set(['1'])}, provided.get_all_exclusives())
+
   def test_partitioning(self):
     # Target e has conflicts; in this test, we want to check that partitioning
     # of valid targets works to prevent conflicts in chunks, so we only use a-d.
@@ -10,6 +10,7 @@ import tempfile
 
 from pants.base.build_invalidator import CacheKey, CacheKeyGenerator
 from pants.base.cache_manager import InvalidationCacheManager, InvalidationCheck, VersionedTarget
+from pants.base.payload import ResourcesPayload
 from pants_test.base_test import BaseTest
 
 
@@ -123,3 +124,29 @@ class InvalidationCacheManagerTest(BaseTest):
     self.assertEquals(1, len(partitioned[0].targets))
     self.assertEquals(3, len(partitioned[1].targets))
     self.assertEquals(1, len(partitioned[2].targets))
+
+  def test_parallel_fingerprinting_matches_serial(self):
+    def make_resources(name, dependencies):
+      self.create_files(name, ['a.txt', 'b.txt'])
+      return self.make_target(':{0}'.format(name),
+                              dependencies=dependencies,
+                              payload=ResourcesPayload(name, ['a.txt', 'b.txt']))
+    a = make_resources('a', [])
+    b = make_resources('b', [a])
+    c = make_resources('c', [a])
+    d = make_resources('d', [b, c])
+    targets = [d, c, b, a]
+
+    def cache_keys(invalidate_dependents, fingerprint_workers):
+      for target in targets:
+        target.mark_invalidation_hash_dirty()
+      cache_manager = InvalidationCacheManager(CacheKeyGenerator(),
+                                               self._dir,
+                                               invalidate_dependents,
+                                               fingerprint_workers=fingerprint_workers)
+      return [vt.cache_key for vt in cache_manager._sort_and_validate_targets(targets)]
+
+    for invalidate_dependents in (True, False):
+      serial_keys = cache_keys(invalidate_dependents, fingerprint_workers=1)
+      self.assertEquals(['.a', '.b', '.c', '.d'], sorted(key.id for key in serial_keys))
+      self.assertEquals(serial_keys, cache_keys(invalidate_dependents, fingerprint_workers=4))
@@ -5,9 +5,12 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+from io import StringIO
 import shutil
 import tempfile
 
+from mock import patch
+
 from pants.backend.core.tasks.check_exclusives import CheckExclusives
 from pants.base.exceptions import TaskError
 
@@ -40,6 +43,22 @@ class CheckExclusivesTest(BaseTest):
     except TaskError:
       pass
 
+  def test_check_exclusives_warns_for_every_target(self):
+    a = self.make_target(':a', exclusives={'a': '1'})
+    c = self.make_target(':c', exclusives={'a': '2'})
+    e = self.make_target(':e', dependencies=[a, c])
+    f = self.make_target(':f', dependencies=[e])
+
+    context = self.context(target_roots=[f], options={'exclusives_error_on_collision': False})
+    check_exclusives_task = CheckExclusives(context, self.workdir)
+    with patch('sys.stdout', new_callable=StringIO) as stdout:
+      check_exclusives_task.execute()
+    # e and f share their colliding exclusives map, but each is warned about.
+    self.assertIs(e.get_all_exclusives(), f.get_all_exclusives())
+    warnings = stdout.getvalue()
+    self.assertIn('target %s has' % e.address.reference(), warnings)
+    self.assertIn('target %s has' % f.address.reference(), warnings)
+
   def test_classpath_compatibility(self):
     # test the compatibility checks for different exclusive groups.
     a = self.make_target(':a', exclusives={'a': '1', 'b': '1'})
@@ -0,0 +1,149 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+import os
+import sys
+
+import unittest2 as unittest
+
+from pants.backend.codegen.tasks.codegen_runner import CodegenRunner
+from pants.base.exceptions import TaskError
+from pants.util.dirutil import safe_mkdtemp, safe_open, safe_rmtree
+
+
+# A compiler that copies its source to <outdir>/<source name>.out, logging when it starts and ends
+# and failing for sources containing 'error'.
+FAKE_COMPILER = """
+import os
+import sys
+import time
+
+outdir, source, log = sys.argv[1:]
+with open(log, 'a') as fp:
+  fp.write('start %s %f\\n' % (source, time.time()))
+with open(source) as fp:
+  content = fp.read()
+time.sleep(0.2)
+with open(log, 'a') as fp:
+  fp.write('end %s %f\\n' % (source, time.time()))
+if 'error' in content:
+  sys.exit(1)
+with open(os.path.join(outdir, os.path.basename(source) + '.out'), 'w') as fp:
+  fp.write(content)
+"""
+
+
+class CodegenRunnerTest(unittest.TestCase):
+  def setUp(self):
+    self.root = safe_mkdtemp()
+    self.compiler = self.write('compiler.py', FAKE_COMPILER)
+    self.log = os.path.join(self.root, 'log')
+    self.output_dir = os.path.join(self.root, 'out')
+
+  def tearDown(self):
+    safe_rmtree(self.root)
+
+  def write(self, relpath, content):
+    path = os.path.join(self.root, relpath)
+    with safe_open(path, 'w') as fp:
+      fp.write(content)
+    return path
+
+  def read_output(self, name):
+    with open(os.path.join(self.output_dir, name + '.out')) as fp:
+      return fp.read()
+
+  def runner(self, concurrency=4, includes=None):
+    return CodegenRunner(os.path.join(self.root, 'sessions'), compiler_version='1.0',
+                         concurrency=concurrency, includes=includes)
+
+  def generate(self, runner, sources):
+    def create_cmd(source, outdir):
+      return [sys.executable, self.compiler, outdir, source, self.log]
+    return runner.generate(sources, create_cmd, self.output_dir)
+
+  def gendirs(self):
+    sessions = os.path.join(self.root, 'sessions')
+    return [os.path.join(source_dir, key) for source_dir in os.listdir(sessions)
+            for key in os.listdir(os.path.join(sessions, source_dir))]
+
+  def intervals(self):
+    starts = {}
+    intervals = []
+    with open(self.log) as fp:
+      for line in fp:
+        event, source, timestamp = line.split()
+        if event == 'start':
+          starts[source] = float(timestamp)
+        else:
+          intervals.append((starts.pop(source), float(timestamp)))
+    return intervals
+
+  def test_generated_outputs_merged(self):
+    a, b = self.write('a.idl', 'a'), self.write('b.idl', 'b')
+    self.assertEqual([a, b], self.generate(self.runner(), [a, b]))
+    self.assertEqual('a', self.read_output('a.idl'))
+    self.assertEqual('b', self.read_output('b.idl'))
+
+  def test_unchanged_sources_not_generated_again(self):
+    a, b = self.write('a.idl', 'a'), self.write('b.idl', 'b')
+    self.generate(self.runner(), [a, b])
+    self.assertEqual([], self.generate(self.runner(), [a, b]))
+
+    self.write('b.idl', 'b2')
+    self.assertEqual([b], self.generate(self.runner(), [a, b]))
+    self.assertEqual('b2', self.read_output('b.idl'))
+
+  def test_superseded_keys_pruned(self):
+    a, b = self.write('a.idl', 'a'), self.write('b.idl', 'b')
+    self.generate(self.runner(), [a, b])
+    self.write('b.idl', 'b2')
+    self.generate(self.runner(), [a, b])
+    self.assertEqual(2, len(self.gendirs()))
+
+    # A version generated before and since pruned is generated again.
+    self.write('b.idl', 'b')
+    self.assertEqual([b], self.generate(self.runner(), [a, b]))
+    self.assertEqual('b', self.read_output('b.idl'))
+    self.assertEqual(2, len(self.gendirs()))
+
+  def test_changed_include_generates_includer(self):
+    a, b = self.write('a.idl', 'a'), self.write('b.idl', 'b')
+    included = self.write('included.idl', 'included')
+    runner = self.runner(includes=lambda source: [included] if source == a else [])
+    self.generate(runner, [a, b])
+
+    self.write('included.idl', 'changed')
+    self.assertEqual([a], self.generate(runner, [a, b]))
+
+  def test_compiler_version_in_key(self):
+    a = self.write('a.idl', 'a')
+    self.generate(self.runner(), [a])
+    runner = CodegenRunner(os.path.join(self.root, 'sessions'), compiler_version='2.0',
+                           concurrency=1)
+    self.assertEqual([a], self.generate(runner, [a]))
+
+  def test_failure(self):
+    a, b = self.write('a.idl', 'a'), self.write('b.idl', 'error')
+    with self.assertRaises(TaskError):
+      self.generate(self.runner(), [a, b])
+    self.assertFalse(os.path.exists(self.output_dir))
+
+    # The failed source is generated again, the one that succeeded is not.
+    self.write('b.idl', 'b')
+    self.assertEqual([b], self.generate(self.runner(), [a, b]))
+    self.assertEqual(2, len(self.gendirs()))
+
+  def test_concurrency_bounded(self):
+    sources = [self.write('%d.idl' % i, str(i)) for i in range(6)]
+    self.generate(self.runner(concurrency=2), sources)
+
+    intervals = self.intervals()
+    self.assertEqual(6, len(intervals))
+    max_running = max(sum(1 for start, end in intervals if start <= instant < end)
+                      for instant, _ in intervals)
+    self.assertEqual(2, max_running)
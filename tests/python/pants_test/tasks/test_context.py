@@ -41,3 +41,13 @@ class ContextTest(BaseTest):
     g = self.make_target('g', dependencies=[a, c, d])
     context = self.context(target_roots=[g])
     self.assertEquals([g, a, c, b, d], context.targets())
+
+  def test_ordered_targets(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c', dependencies=[b])
+    d = self.make_target('d', dependencies=[c, a])
+    f = self.make_target('f', dependencies=[a])
+    context = self.context(target_roots=[f, d])
+    self.assertEquals([a, b, c, d, f], context.ordered_targets())
+    self.assertEquals([b, d], context.ordered_targets(lambda t: t in set([d, b])))
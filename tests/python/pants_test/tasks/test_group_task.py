@@ -6,6 +6,7 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import itertools, uuid
+import threading
 
 from pants.backend.core.tasks.check_exclusives import ExclusivesMapping
 from pants.backend.core.tasks.group_task import GroupMember, GroupIterator, GroupTask
@@ -102,25 +103,36 @@ class BaseGroupTaskTest(BaseTest):
   def create_targets(self):
     """Creates targets and returns the target roots for this GroupTask"""
 
+  def group_config(self, group_name):
+    """Returns the config for the GroupTask named `group_name`."""
+    return ''
+
   def setUp(self):
     super(BaseGroupTaskTest, self).setUp()
-    self._context = self.context(target_roots=self.create_targets())
+    # NB: GroupTask has a cache of tasks by name... use a distinct name
+    group_name = 'jvm-compile-%s' % uuid.uuid4().hex
+    self._context = self.context(config=self.group_config(group_name),
+                                 target_roots=self.create_targets())
 
     exclusives_mapping = ExclusivesMapping(self._context)
     exclusives_mapping._populate_target_maps(self._context.targets())
     self._context.products.safe_create_data('exclusives_groups', lambda: exclusives_mapping)
 
     self.recorded_actions = []
-    # NB: GroupTask has a cache of tasks by name... use a distinct name
-    self.group_task = GroupTask.named('jvm-compile-%s' % uuid.uuid4().hex,
-                                      ['classes_by_target', 'classes_by_source'])
+    self.group_task = GroupTask.named(group_name, ['classes_by_target', 'classes_by_source'])
     self.group_task.add_member(self.group_member('javac', lambda t: t.is_java))
     self.group_task.add_member(self.group_member('scalac', lambda t: t.is_scala))
 
     self.task = self.group_task(self._context, workdir='/not/real')
     self.task.prepare(round_manager=RoundManager(self._context))
+    self.execute_task()
+
+  def execute_task(self):
     self.task.execute()
 
+  def executing_chunk(self, tag, targets):
+    """Called as a group member starts executing a chunk."""
+
   def construct_action(self, tag):
     return 'construct', tag, self._context
 
@@ -158,6 +170,7 @@ class BaseGroupTaskTest(BaseTest):
         self.recorded_actions.append(self.pre_execute_action(name))
 
       def execute_chunk(me, targets):
+        self.executing_chunk(name, targets)
         self.recorded_actions.append(self.execute_chunk_action(name, targets))
 
       def post_execute(me):
@@ -273,3 +286,79 @@ class TransitiveGroupTaskTest(BaseGroupTaskTest):
     # expecting construct/prepare for java/scalac, then pre-execute/prepare_execute for
     # javac/scalac: ignore 8 Finally, compare the remaining items.
     self.assertEqual(expected_execute_actions, recorded[8:])
+
+
+class ChunkDependenciesTest(BaseTest):
+  def test_chunk_dependencies(self):
+    a = self.make_target('src/java:a', JavaLibrary)
+    b = self.make_target('src/scala:b', ScalaLibrary)
+    c = self.make_target('src/java:c', JavaLibrary, dependencies=[a, b])
+    d = self.make_target('src/deps:d', Dependencies, dependencies=[c])
+    e = self.make_target('src/scala:e', ScalaLibrary, dependencies=[d])
+    f = self.make_target('src/java:f', JavaLibrary)
+
+    ordered_chunks = [('javac', [a]), ('scalac', [b]), ('javac', [c]), ('scalac', [e]),
+                      ('javac', [f])]
+    self.assertEqual([set(), set(), set([0, 1]), set([0, 1, 2]), set([2])],
+                     GroupTask.chunk_dependencies(ordered_chunks))
+
+
+class ConcurrentGroupTaskTestBase(BaseGroupTaskTest):
+  def group_config(self, group_name):
+    return '[%s]\nparallelism: 2\n' % group_name
+
+  def create_targets(self):
+    self.a = self.make_target('src/java:a', JavaLibrary)
+    self.b = self.make_target('src/scala:b', ScalaLibrary)
+    self.c = self.make_target('src/java:c', JavaLibrary, dependencies=[self.a, self.b])
+    self.d = self.make_target('src/scala:d', ScalaLibrary, dependencies=[self.c])
+    return [self.d]
+
+  def executed_chunks(self):
+    return [action[2] for action in self.recorded_actions if action[0] == 'execute_chunk']
+
+
+class ConcurrentGroupTaskTest(ConcurrentGroupTaskTestBase):
+  def setUp(self):
+    self.started = {}
+    self.overlapped = []
+    super(ConcurrentGroupTaskTest, self).setUp()
+
+  def create_targets(self):
+    roots = super(ConcurrentGroupTaskTest, self).create_targets()
+    self.started = {self.a: threading.Event(), self.b: threading.Event()}
+    return roots
+
+  def executing_chunk(self, tag, targets):
+    # The chunks of a and b are independent: each waits to see the other start.
+    for target in targets:
+      if target in self.started:
+        self.started[target].set()
+        other = self.b if target == self.a else self.a
+        self.overlapped.append(self.started[other].wait(10))
+
+  def test_independent_chunks_execute_concurrently(self):
+    self.assertEqual([True, True], self.overlapped)
+
+  def test_dependent_chunks_wait(self):
+    executed = self.executed_chunks()
+    self.assertEqual(set([(self.a,), (self.b,)]), set(map(tuple, executed[:2])))
+    self.assertEqual([[self.c], [self.d]], executed[2:])
+    self.assertEqual([self.post_execute_action('javac'), self.post_execute_action('scalac')],
+                     self.recorded_actions[-2:])
+
+
+class FailingConcurrentGroupTaskTest(ConcurrentGroupTaskTestBase):
+  class ChunkFailed(Exception):
+    pass
+
+  def execute_task(self):
+    with self.assertRaises(self.ChunkFailed):
+      self.task.execute()
+
+  def executing_chunk(self, tag, targets):
+    if self.b in targets:
+      raise self.ChunkFailed()
+
+  def test_dependents_not_executed(self):
+    self.assertEqual([[self.a]], self.executed_chunks())
@@ -6,13 +6,21 @@ from __future__ import (nested_scopes, generators, division, absolute_import, wi
                         print_function, unicode_literals)
 
 import logging
+import os
 from textwrap import dedent
+from threading import Event, Thread
 import xml.etree.ElementTree as ET
 
+from mock import Mock, patch
+
 from pants.backend.core.register import build_file_aliases as register_core
 from pants.backend.jvm.ivy_utils import IvyUtils
 from pants.backend.jvm.register import build_file_aliases as register_jvm
-from pants.util.contextutil import temporary_file_path
+from pants.goal.products import Products
+from pants.ivy.bootstrapper import Bootstrapper
+from pants.ivy.ivy import Ivy
+from pants.util.contextutil import temporary_dir, temporary_file_path
+from pants.util.dirutil import safe_mkdtemp, safe_open, safe_rmtree
 from pants_test.base_test import BaseTest
 from pants_test.base.context_utils import create_config
 
@@ -90,3 +98,182 @@ class IvyUtilsGenerateIvyTest(IvyUtilsTestBase):
 
   def assert_attributes(self, elem, **kwargs):
     self.assertEqual(dict(**kwargs), dict(elem.attrib))
+
+
+class IvyUtilsModuleLockTest(IvyUtilsTestBase):
+  def setUp(self):
+    super(IvyUtilsModuleLockTest, self).setUp()
+    self.add_to_build_file('src/java', dedent("""
+        jar_library(name='a', jars=[jar('org1', 'name1', 'rev1')])
+        jar_library(name='b', jars=[jar('org2', 'name2', 'rev2')])
+    """))
+
+  def ivy_settings(self, lock_strategy):
+    return self.create_file('ivysettings-%s.xml' % lock_strategy, dedent("""
+        <ivysettings>
+          <caches default="default" lockStrategy="%s">
+            <cache name="default"/>
+          </caches>
+        </ivysettings>
+    """ % lock_strategy))
+
+  def exec_ivy_concurrently(self, first_spec, second_spec, lock_strategy='artifact-lock'):
+    """Returns whether an ivy run of the first spec could start while one of the second ran."""
+    ivy = Mock(spec=Ivy, ivy_settings=self.ivy_settings(lock_strategy))
+    first_running, second_running = Event(), Event()
+    overlapped = []
+
+    class RendezvousIvyUtils(IvyUtils):
+      def _run_ivy(self, ivy, ivyxml, confs, args, workunit_factory, workunit_name,
+                   symlink_ivyxml=False):
+        mine, other = ((first_running, second_running) if self is first
+                       else (second_running, first_running))
+        mine.set()
+        other.wait(2)
+        overlapped.append(other.is_set())
+
+    def utils():
+      return RendezvousIvyUtils(create_config(), self.create_options(), logging.Logger('test'))
+    first, second = utils(), utils()
+
+    with temporary_dir() as workdir:
+      def exec_ivy(ivy_utils, spec):
+        ivy_utils.exec_ivy(os.path.join(workdir, spec.replace(':', '_')), [self.target(spec)], [],
+                           ivy=ivy)
+      threads = [Thread(target=exec_ivy, args=(first, first_spec)),
+                 Thread(target=exec_ivy, args=(second, second_spec))]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+    return all(overlapped)
+
+  def test_different_modules_run_concurrently(self):
+    self.assertTrue(self.exec_ivy_concurrently('src/java:a', 'src/java:b'))
+
+  def test_same_module_runs_serially(self):
+    self.assertFalse(self.exec_ivy_concurrently('src/java:a', 'src/java:a'))
+
+  def test_unlocked_cache_runs_serially(self):
+    self.assertFalse(self.exec_ivy_concurrently('src/java:a', 'src/java:b',
+                                                lock_strategy='no-lock'))
+
+  def test_cache_locks_artifacts(self):
+    self.assertTrue(IvyUtils.cache_locks_artifacts(self.ivy_settings('artifact-lock')))
+    self.assertFalse(IvyUtils.cache_locks_artifacts(self.ivy_settings('no-lock')))
+    self.assertFalse(IvyUtils.cache_locks_artifacts(None))
+
+
+class FakeRetrieveIvyUtils(IvyUtils):
+  """Stands in for ivy by retrieving a jar for each configuration each dependency is mapped to."""
+
+  def __init__(self, mapto_dir, *args, **kwargs):
+    super(FakeRetrieveIvyUtils, self).__init__(*args, **kwargs)
+    self._mapto_dir = mapto_dir
+    self.runs = []
+
+  def mapto_dir(self):
+    return self._mapto_dir
+
+  def _run_ivy(self, ivy, ivyxml, confs, args, workunit_factory, workunit_name,
+               symlink_ivyxml=False):
+    self.runs.append(confs)
+    pattern = args[args.index('-retrieve') + 1]
+    for dependency in ET.parse(ivyxml).getroot().findall('dependencies/dependency'):
+      for conf in dependency.findall('conf'):
+        path = (pattern.replace('[conf]', conf.get('name'))
+                       .replace('[organisation]', dependency.get('org'))
+                       .replace('[artifact]', dependency.get('name'))
+                       .replace('[revision]', dependency.get('rev'))
+                       .replace('(-[classifier])', '')
+                       .replace('[ext]', 'jar'))
+        with safe_open(path, 'w') as fp:
+          fp.write(ivyxml)
+
+
+class IvyUtilsMapjarsBatchedTest(IvyUtilsTestBase):
+  def setUp(self):
+    super(IvyUtilsMapjarsBatchedTest, self).setUp()
+
+    self.add_to_build_file('3rdparty', dedent("""
+        jar_library(name='common', jars=[jar('org1', 'common', '1.0')])
+        jar_library(name='common2', jars=[jar('org1', 'common', '2.0')])
+        jar_library(name='other', jars=[jar('org2', 'other', '1.0')])
+        jar_library(name='dynamic', jars=[jar('org3', 'dynamic', 'latest.release')])
+    """))
+    self.add_to_build_file('src/java', dedent("""
+        java_library(name='a', sources=[], dependencies=['3rdparty:common', '3rdparty:other'])
+        java_library(name='b', sources=[], dependencies=['3rdparty:common'],
+                     configurations=['default', 'sources'])
+        java_library(name='c', sources=[], dependencies=['3rdparty:common2'])
+        java_library(name='d', sources=[], dependencies=['3rdparty:dynamic'])
+    """))
+
+    self.mapto_dir = safe_mkdtemp()
+
+    default_ivy = patch.object(Bootstrapper, 'default_ivy', return_value=Mock(spec=Ivy, ivy_settings=None))
+    default_ivy.start()
+    self.addCleanup(default_ivy.stop)
+
+  def tearDown(self):
+    safe_rmtree(self.mapto_dir)
+    super(IvyUtilsMapjarsBatchedTest, self).tearDown()
+
+  def ivy_utils(self):
+    return FakeRetrieveIvyUtils(self.mapto_dir, create_config(), self.create_options(),
+                                logging.Logger('test'))
+
+  def mapjars(self, ivy_utils, *specs):
+    genmap = Products().require('jar_dependencies')
+    ivy_utils.mapjars_batched(genmap, [self.target(spec) for spec in specs], executor=None)
+    return genmap
+
+  def mapped(self, genmap, spec, conf='default'):
+    return sorted(os.path.relpath(os.path.join(basedir, jar), self.mapto_dir)
+                  for basedir, jars in (genmap.get((self.target(spec), conf)) or {}).items()
+                  for jar in jars)
+
+  def test_compatible_targets_retrieved_together(self):
+    ivy_utils = self.ivy_utils()
+    genmap = self.mapjars(ivy_utils, 'src/java:a', 'src/java:b')
+
+    self.assertEqual([['t0_default', 't1_default', 't1_sources']], ivy_utils.runs)
+    a, b = self.target('src/java:a').id, self.target('src/java:b').id
+    self.assertEqual([os.path.join(a, 'org1/common/default/org1-common-1.0.jar'),
+                      os.path.join(a, 'org2/other/default/org2-other-1.0.jar')],
+                     self.mapped(genmap, 'src/java:a'))
+    self.assertEqual([os.path.join(b, 'org1/common/default/org1-common-1.0.jar')],
+                     self.mapped(genmap, 'src/java:b'))
+    # The jars only declare a default conf, so nothing is mapped for b's sources.
+    self.assertEqual([], self.mapped(genmap, 'src/java:b', conf='sources'))
+
+  def test_conflicting_revisions_retrieved_separately(self):
+    ivy_utils = self.ivy_utils()
+    genmap = self.mapjars(ivy_utils, 'src/java:a', 'src/java:c')
+
+    self.assertEqual([['t0_default'], ['t0_default']], ivy_utils.runs)
+    c = self.target('src/java:c').id
+    self.assertEqual([os.path.join(c, 'org1/common/default/org1-common-2.0.jar')],
+                     self.mapped(genmap, 'src/java:c'))
+
+  def test_unchanged_targets_skip_ivy(self):
+    self.mapjars(self.ivy_utils(), 'src/java:a', 'src/java:b', 'src/java:d')
+
+    ivy_utils = self.ivy_utils()
+    genmap = self.mapjars(ivy_utils, 'src/java:a', 'src/java:b', 'src/java:d')
+    # Only d, whose jar has a dynamic revision, is resolved again.
+    self.assertEqual([['t0_default']], ivy_utils.runs)
+    a = self.target('src/java:a').id
+    self.assertEqual([os.path.join(a, 'org1/common/default/org1-common-1.0.jar'),
+                      os.path.join(a, 'org2/other/default/org2-other-1.0.jar')],
+                     self.mapped(genmap, 'src/java:a'))
+
+  def test_missing_jar_invalidates_manifest(self):
+    self.mapjars(self.ivy_utils(), 'src/java:a')
+    os.unlink(os.path.join(self.mapto_dir, self.target('src/java:a').id,
+                           'org2/other/default/org2-other-1.0.jar'))
+
+    ivy_utils = self.ivy_utils()
+    genmap = self.mapjars(ivy_utils, 'src/java:a')
+    self.assertEqual([['t0_default']], ivy_utils.runs)
+    self.assertEqual(2, len(self.mapped(genmap, 'src/java:a')))
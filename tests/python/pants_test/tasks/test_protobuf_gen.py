@@ -5,11 +5,16 @@
 from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
                         print_function, unicode_literals)
 
+import os
+from zipfile import ZipFile, ZipInfo
+
 import unittest2 as unittest
 import pytest
 
-from pants.backend.codegen.tasks.protobuf_gen import calculate_genfiles
-from pants.util.contextutil import temporary_file
+from pants.backend.codegen.tasks.protobuf_gen import (calculate_genfiles, find_imports,
+                                                      JarExtractionIndex)
+from pants.util.contextutil import temporary_dir, temporary_file
+from pants.util.dirutil import safe_mkdtemp, safe_open, safe_rmtree
 
 
 class ProtobufGenCalculateGenfilesTestBase(unittest.TestCase):
@@ -232,3 +237,78 @@ def test_whitespace_insensitivity(self):
       'com/example/foo/bar/FooOrBuilder.java'
       'com/example/foo/bar/FooBar.java',
       'com/example/foo/bar/FooBarOrBuilder.java')
+
+
+class FindImportsTest(unittest.TestCase):
+  def test_find_imports(self):
+    with temporary_dir() as root:
+      def write(relpath, content=''):
+        path = os.path.join(root, relpath)
+        with safe_open(path, 'w') as fp:
+          fp.write(content)
+        return path
+
+      a = write('a/com/a.proto')
+      b = write('b/com/b.proto')
+      source = write('src/c.proto', """
+        import "com/a.proto";
+        import public "com/b.proto";
+        import "google/protobuf/descriptor.proto";
+      """)
+      bases = [os.path.join(root, base) for base in ('a', 'b')]
+      self.assertEqual(set([a, b]), find_imports(bases, source))
+
+
+class JarExtractionIndexTest(unittest.TestCase):
+  def setUp(self):
+    self.root = safe_mkdtemp()
+    self.workdir = os.path.join(self.root, 'extracted')
+
+  def tearDown(self):
+    safe_rmtree(self.root)
+
+  def write_jar(self, name, content, mtime=None):
+    path = os.path.join(self.root, name)
+    with ZipFile(path, 'w') as jar:
+      jar.writestr(ZipInfo('com/a.proto', date_time=(2014, 1, 1, 0, 0, 0)), content)
+    if mtime:
+      os.utime(path, (mtime, mtime))
+    return path
+
+  def read(self, outdir):
+    with open(os.path.join(outdir, 'com', 'a.proto')) as fp:
+      return fp.read()
+
+  def test_extract(self):
+    jar = self.write_jar('a.jar', 'a')
+    outdir, extracted = JarExtractionIndex(self.workdir).extract(jar)
+    self.assertTrue(extracted)
+    self.assertEqual('a', self.read(outdir))
+
+  def test_unchanged_jar_not_read(self):
+    jar = self.write_jar('a.jar', 'a', mtime=1000)
+    index = JarExtractionIndex(self.workdir)
+    outdir, _ = index.extract(jar)
+    index.save()
+
+    # Stomp the jar without changing its size or mtime: the index answers without reading it.
+    self.write_jar('a.jar', 'b', mtime=1000)
+    self.assertEqual((outdir, False), JarExtractionIndex(self.workdir).extract(jar))
+
+  def test_changed_jar_extracted_again(self):
+    jar = self.write_jar('a.jar', 'a', mtime=1000)
+    index = JarExtractionIndex(self.workdir)
+    outdir, _ = index.extract(jar)
+    index.save()
+
+    self.write_jar('a.jar', 'b', mtime=2000)
+    index = JarExtractionIndex(self.workdir)
+    changed_outdir, extracted = index.extract(jar)
+    self.assertTrue(extracted)
+    self.assertNotEqual(outdir, changed_outdir)
+    self.assertEqual('b', self.read(changed_outdir))
+
+  def test_identical_jars_share_extraction(self):
+    outdir, _ = JarExtractionIndex(self.workdir).extract(self.write_jar('a.jar', 'a', mtime=1000))
+    copy = self.write_jar('copy.jar', 'a', mtime=1000)
+    self.assertEqual((outdir, False), JarExtractionIndex(self.workdir).extract(copy))
@@ -0,0 +1,70 @@
+# coding=utf-8
+# Copyright 2014 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (nested_scopes, generators, division, absolute_import, with_statement,
+                        print_function, unicode_literals)
+
+from mock import Mock
+
+from pants.backend.core.tasks.task import Task
+from pants.util.dirutil import safe_mkdtemp, safe_rmtree
+from pants_test.base_test import BaseTest
+
+
+class FakeArtifactCache(object):
+  def __init__(self, cached):
+    self.cached = set(cached)
+    self.probes = []
+    self.fetches = []
+
+  def has_many(self, cache_keys):
+    self.probes.append(list(cache_keys))
+    return [cache_key in self.cached for cache_key in cache_keys]
+
+  def use_cached_files(self, cache_key):
+    self.fetches.append(cache_key)
+    return cache_key in self.cached
+
+
+class NoopTask(Task):
+  def execute(self):
+    pass
+
+
+class CheckArtifactCacheTest(BaseTest):
+  def setUp(self):
+    super(CheckArtifactCacheTest, self).setUp()
+    self.workdir = safe_mkdtemp()
+
+  def tearDown(self):
+    safe_rmtree(self.workdir)
+    super(CheckArtifactCacheTest, self).tearDown()
+
+  def versioned_target_set(self, cache_key):
+    vts = Mock(cache_key=cache_key)
+    vts.versioned_targets = [vts]
+    return vts
+
+  def test_only_cached_artifacts_fetched(self):
+    vts = [self.versioned_target_set(key) for key in ('a', 'b', 'c')]
+    artifact_cache = FakeArtifactCache(['a', 'c'])
+    task = NoopTask(self.context(), self.workdir)
+    task.get_artifact_cache = lambda: artifact_cache
+
+    cached, uncached = task.check_artifact_cache(vts)
+    self.assertEqual([vts[0], vts[2]], cached)
+    self.assertEqual([vts[1]], uncached)
+    # All the keys are probed for at once, and only those found are fetched.
+    self.assertEqual([['a', 'b', 'c']], artifact_cache.probes)
+    self.assertEqual(['a', 'c'], sorted(artifact_cache.fetches))
+    self.assertFalse(vts[1].update.called)
+
+  def test_nothing_fetched_on_all_misses(self):
+    vts = [self.versioned_target_set(key) for key in ('a', 'b')]
+    artifact_cache = FakeArtifactCache([])
+    task = NoopTask(self.context(), self.workdir)
+    task.get_artifact_cache = lambda: artifact_cache
+
+    self.assertEqual(([], vts), task.check_artifact_cache(vts))
+    self.assertEqual([], artifact_cache.fetches)